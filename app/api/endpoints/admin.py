@@ -0,0 +1,96 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from app.core.common.security import verify_admin_token
+from app.core.common.profiler import request_profiler
+from app.core.common.content_cache import content_cache
+from app.core.clients import upstream_clients
+from app.core.common.dedup import near_duplicate_filter
+from app.schemas.common.base import BaseResponse
+from app.schemas.llm import ContentCachePurgeResponse
+
+router = APIRouter(dependencies=[Depends(verify_admin_token)]) # 管理接口，需要 X-Admin-Token 请求头
+
+@router.get(
+    "/profiles",
+    response_model=BaseResponse[List[dict]],
+    summary="列出请求性能分析结果",
+    description="返回最近保存的请求性能分析结果（请求路径、触发方式、耗时、样本数），最新的在前。"
+)
+async def list_profiles():
+    """
+    列出请求性能分析结果。
+    """
+    return BaseResponse(data=request_profiler.list_profiles())
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="下载请求性能分析结果",
+    description="以折叠栈格式下载分析结果，可直接用 flamegraph.pl 或 speedscope 生成火焰图。"
+)
+async def get_profile(profile_id: str):
+    """
+    下载请求性能分析结果。
+    - **profile_id**: 分析结果ID，即被分析请求的响应头 X-Profile-Id。
+    """
+    path = request_profiler.path_for(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"{profile_id}.collapsed")
+
+@router.get(
+    "/content_cache/stats",
+    response_model=BaseResponse[dict],
+    summary="获取网页内容缓存统计",
+    description="返回网页内容缓存的命中、未命中、淘汰次数以及内存和磁盘占用字节数。"
+)
+async def get_content_cache_stats():
+    """
+    获取网页内容缓存统计。
+    """
+    return BaseResponse(data=content_cache.stats())
+
+@router.delete(
+    "/content_cache",
+    response_model=BaseResponse[ContentCachePurgeResponse],
+    summary="清除网页内容缓存",
+    description="按URL或站点（host）清除已缓存的网页内容。"
+)
+async def purge_content_cache(url: Optional[str] = None, host: Optional[str] = None):
+    """
+    清除网页内容缓存。
+    - **url**: 要清除的网址。
+    - **host**: 要清除的站点，该站点下所有网址的缓存都会被清除。
+    """
+    if not url and not host:
+        raise HTTPException(status_code=400, detail="url or host is required")
+    purged = 0
+    if url:
+        purged += await content_cache.purge_url(url)
+    if host:
+        purged += await content_cache.purge_host(host)
+    return BaseResponse(data=ContentCachePurgeResponse(purged=purged))
+
+@router.get(
+    "/upstream/stats",
+    response_model=BaseResponse[dict],
+    summary="获取上游连接池统计",
+    description="返回 SerpAPI/JinaAI 与 Azure OpenAI 共享连接池的连接数、活跃连接数和空闲连接数。"
+)
+async def get_upstream_stats():
+    """
+    获取上游连接池统计。
+    """
+    return BaseResponse(data=upstream_clients.stats())
+
+@router.get(
+    "/dedup/stats",
+    response_model=BaseResponse[dict],
+    summary="获取近重复内容去除统计",
+    description="返回累计去除的近重复文档数、段落数以及节省的字节数。"
+)
+async def get_dedup_stats():
+    """
+    获取近重复内容去除统计。
+    """
+    return BaseResponse(data=near_duplicate_filter.stats())
@@ -1,3 +1,4 @@
+from contextlib import aclosing
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi_injector import Injected # 导入Injected
 from app.core.common.security import get_current_user
@@ -6,6 +7,7 @@ from app.schemas.common.base import BaseResponse
 from app.services.websummary import WebSummarizerService # 导入 WebSummarizerService
 from app.services.llm import LLMService
 from app.core.common.logger import logger
+from app.core.common.sse import sse_response
 
 router = APIRouter() # 用于需要认证的接口
 public_router = APIRouter() # 用于不需要认证的接口
@@ -14,7 +16,7 @@ public_router = APIRouter() # 用于不需要认证的接口
     "/chat",
     response_model=BaseResponse[ChatResponse],
     summary="与大模型进行对话",
-    description="发送消息给Azure OpenAI大模型并获取回复。"
+    description="发送消息给Azure OpenAI大模型并获取回复。stream为true时以Server-Sent Events逐段返回（token事件），最后返回done事件。"
 )
 async def chat_with_llm(
     request: ChatRequest,
@@ -26,6 +28,13 @@ async def chat_with_llm(
     - **request**: 包含对话消息的请求体。
     - **llm_service**: LLM服务依赖。
     """
+    if request.stream:
+        async def events():
+            async with aclosing(llm_service.chat_stream(request)) as deltas:
+                async for delta in deltas:
+                    yield "token", {"content": delta}
+            yield "done", {}
+        return sse_response(events())
     try:
         response_content = await llm_service.chat(request)
         return BaseResponse(data=ChatResponse(response=response_content))
@@ -40,6 +49,7 @@ async def chat_with_llm(
     response_model=BaseResponse[SummarizeResponse],
     summary="根据网址和问题总结内容",
     description="在指定网址内搜索问题，提取内容，并使用Azure OpenAI大模型进行总结。"
+                "stream为true时以Server-Sent Events返回各阶段进度（stage事件）、总结内容（token事件）和done事件。"
 )
 async def summarize_urls_with_query(
     request: SummarizeRequest,
@@ -51,6 +61,8 @@ async def summarize_urls_with_query(
     - **request**: 包含网址列表和问题的请求体。
     - **web_summarizer_service**: 网页总结服务依赖。
     """
+    if request.stream:
+        return sse_response(web_summarizer_service.process_request_stream(request.urls, request.query))
     try:
         summary_content = await web_summarizer_service.process_request(request.urls, request.query)
         return BaseResponse(data=SummarizeResponse(summary=summary_content))
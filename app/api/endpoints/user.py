@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from fastapi_injector import Injected
 
-from app.schemas.user import UserCreate, UserResponse
-from app.schemas.common.base import BaseResponse
+from app.schemas.user import UserBulkCreateResponse, UserCreate, UserResponse
+from app.schemas.common.base import BaseResponse, EnvelopeResponse, attributes_of
 from app.services.user import UserService
+from app.core.config import settings
+from app.core.common.pagination import InvalidCursorError
 
 router = APIRouter()
 
@@ -24,7 +30,46 @@ async def create_user(user: UserCreate, user_service: UserService = Injected(Use
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     created_user = await user_service.create_user(user=user)
-    return BaseResponse(data=created_user)
+    return EnvelopeResponse(created_user, UserResponse, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/bulk",
+    response_model=BaseResponse[UserBulkCreateResponse],
+    summary="批量创建用户",
+    description="一次创建多个用户，逐条返回创建结果；邮箱已注册或在请求中重复的条目标记为 conflict，不影响其他条目。"
+)
+async def bulk_create_users(
+    users: list[UserCreate] = Body(..., max_length=settings.USER_BULK_MAX_ITEMS),
+    user_service: UserService = Injected(UserService)
+):
+    """
+    批量创建用户。
+    - **users**: 用户创建请求体列表。
+    - **user_service**: 用户服务依赖。
+    """
+    result = await user_service.bulk_create_users(users)
+    return EnvelopeResponse(result, trusted=True) # 结果由服务端构造，无需再次校验
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="导出所有用户",
+    description="以 NDJSON 格式（每行一个JSON对象）流式导出所有用户，按ID升序，内存占用与用户总数无关。",
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def export_users(user_service: UserService = Injected(UserService)):
+    """
+    流式导出所有用户。
+    - **user_service**: 用户服务依赖。
+    """
+    async def lines() -> AsyncIterator[bytes]:
+        async for rows in user_service.export_users(settings.USER_EXPORT_CHUNK_SIZE):
+            yield "".join(
+                json.dumps({"id": row.id, "email": row.email, "is_active": row.is_active}) + "\n"
+                for row in rows
+            ).encode()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get(
     "/{user_id}",
@@ -41,20 +86,34 @@ async def read_user(user_id: int, user_service: UserService = Injected(UserServi
     db_user = await user_service.get_user(user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return BaseResponse(data=db_user)
+    return EnvelopeResponse(db_user, UserResponse)
 
 @router.get(
     "/",
     response_model=BaseResponse[list[UserResponse]],
     summary="获取用户列表",
-    description="获取所有用户的列表，支持分页。"
+    description="按ID升序分页获取用户列表。还有下一页时，响应头 X-Next-Cursor 中返回下一页的游标，作为 cursor 参数传入即可继续获取。"
 )
-async def read_users(skip: int = 0, limit: int = 100, user_service: UserService = Injected(UserService)):
+async def read_users(
+    cursor: str | None = Query(None, description="上一页返回的游标，为空时从第一页开始"),
+    limit: int = Query(100, ge=1, le=settings.USER_PAGE_MAX_LIMIT, description="返回的最大记录数"),
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过的记录数（OFFSET 分页，页数越深越慢，请改用 cursor）"),
+    user_service: UserService = Injected(UserService)
+):
     """
     获取用户列表。
-    - **skip**: 跳过的记录数。
+    - **cursor**: 上一页返回的游标。
     - **limit**: 返回的最大记录数。
+    - **skip**: 跳过的记录数，已弃用，仅在未提供 cursor 时生效。
     - **user_service**: 用户服务依赖。
     """
-    users = await user_service.get_users(skip=skip, limit=limit)
-    return BaseResponse(data=users)
+    # 用户数据直接来自数据库，按 UserResponse 的字段读取后跳过校验直接序列化
+    if skip and not cursor:
+        users = await user_service.get_users(skip=skip, limit=limit)
+        return EnvelopeResponse(attributes_of(users, UserResponse), trusted=True)
+    try:
+        users, next_cursor = await user_service.get_users_page(cursor=cursor, limit=limit)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return EnvelopeResponse(attributes_of(users, UserResponse), trusted=True, headers=headers)
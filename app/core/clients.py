@@ -0,0 +1,135 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.common.logger import logger
+
+if TYPE_CHECKING:
+    # httpx 和 openai 导入耗时较长（合计约0.5秒），只在首次创建客户端时导入
+    import httpx
+    from openai import AsyncAzureOpenAI
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class UpstreamClients:
+    """
+    进程内共享的上游异步客户端（SerpAPI/JinaAI 使用的 httpx 客户端，以及 Azure OpenAI 客户端）。
+    首次使用时创建（配置了 UPSTREAM_WARMUP 时在启动阶段创建并预热连接），关闭时统一释放，所有请求复用同一连接池，
+    避免每个请求重新进行 TCP/TLS 握手以及连接泄漏。
+    """
+    def __init__(self):
+        self._http: "httpx.AsyncClient | None" = None
+        self._openai_http: "httpx.AsyncClient | None" = None
+        self._openai: "AsyncAzureOpenAI | None" = None
+
+    def _build_http_client(self, timeout: float | None) -> "httpx.AsyncClient":
+        import httpx
+
+        http2 = settings.UPSTREAM_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("UPSTREAM_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1.")
+            http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        """
+        SerpAPI 和 JinaAI 共用的 httpx 客户端，首次访问时创建。
+        """
+        if self._http is None:
+            self._http = self._build_http_client(settings.UPSTREAM_TIMEOUT_SECONDS)
+        return self._http
+
+    @property
+    def openai(self) -> "AsyncAzureOpenAI":
+        """
+        Azure OpenAI 异步客户端，首次访问时创建，使用独立的连接池。
+        """
+        if self._openai is None:
+            settings.require("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT_NAME")
+            from openai import AsyncAzureOpenAI
+
+            # 超时由 openai 客户端按请求控制
+            self._openai_http = self._build_http_client(None)
+            self._openai = AsyncAzureOpenAI(
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_version=settings.AZURE_OPENAI_API_VERSION,
+                http_client=self._openai_http
+            )
+        return self._openai
+
+    async def start(self):
+        """
+        配置了 UPSTREAM_WARMUP 时提前创建客户端并建立到各上游的连接；否则不做任何事，客户端在首次使用时创建。
+        """
+        if settings.UPSTREAM_WARMUP:
+            await self.warm_up()
+
+    async def warm_up(self):
+        """
+        向各上游发送一次 HEAD 请求以建立连接并完成TLS握手，失败不影响启动。
+        """
+        import httpx
+
+        async def touch(client: httpx.AsyncClient, url: str):
+            try:
+                await client.head(url, timeout=5)
+            except httpx.HTTPError as e:
+                logger.warning(f"Upstream warm-up failed for {url}: {e}")
+
+        self.openai
+        await asyncio.gather(
+            touch(self.http, settings.SERPAPI_URL),
+            touch(self.http, settings.JINAAI_BASE_URL),
+            touch(self._openai_http, settings.AZURE_OPENAI_ENDPOINT),
+        )
+
+    async def close(self):
+        """
+        关闭所有客户端并释放连接。
+        """
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+            self._openai_http = None
+
+    @staticmethod
+    def _pool_stats(client: "httpx.AsyncClient | None") -> dict:
+        # httpx 未公开连接池对象，这里通过 transport 读取 httpcore 连接池的连接状态
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "max_connections": settings.UPSTREAM_MAX_CONNECTIONS,
+        }
+
+    def stats(self) -> dict:
+        """
+        返回两个连接池当前的连接数、活跃连接数和空闲连接数。
+        """
+        return {
+            "http": self._pool_stats(self._http),
+            "openai": self._pool_stats(self._openai_http),
+        }
+
+upstream_clients = UpstreamClients()
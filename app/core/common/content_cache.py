@@ -0,0 +1,241 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.core.config import settings
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL作为缓存键：协议和主机转小写、去掉默认端口和片段、查询参数排序、去掉路径末尾的斜杠。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+def url_host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+class ContentCache:
+    """
+    网页提取内容的两级缓存。
+    内存层为按字节数限制的 LRU；磁盘层为 SQLite 文件，同样按总字节数淘汰最久未访问的条目，
+    重启后仍然有效。所有条目在 ttl 秒后过期。磁盘操作在单线程执行器中串行执行，不阻塞事件循环。
+    """
+    def __init__(self, path: str, ttl: float, max_memory_bytes: int, max_disk_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._conn: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="content-cache")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    # ---- 内存层 ----
+
+    def _memory_get(self, key: str, now: float) -> str | None:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, content, size = entry
+        if expires_at <= now:
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return content
+
+    def _memory_set(self, key: str, content: str, size: int, expires_at: float):
+        if size > self.max_memory_bytes:
+            return
+        self._memory_pop(key)
+        self._memory[key] = (expires_at, content, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.memory_evictions += 1
+
+    def _memory_pop(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    # ---- 磁盘层（仅在执行器线程中调用） ----
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if not self.path:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_cache ("
+                "url TEXT PRIMARY KEY, host TEXT NOT NULL, content TEXT NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_page_cache_host ON page_cache (host)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_page_cache_last_access ON page_cache (last_access)")
+            self._conn.execute("DELETE FROM page_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_cache").fetchone()[0]
+        return self._conn
+
+    def _disk_get(self, key: str, now: float) -> tuple[str, float] | None:
+        conn = self._connect()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT content, size, expires_at FROM page_cache WHERE url = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        content, size, expires_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM page_cache WHERE url = ?", (key,))
+            conn.commit()
+            self._disk_bytes -= size
+            return None
+        conn.execute("UPDATE page_cache SET last_access = ? WHERE url = ?", (now, key))
+        conn.commit()
+        return content, expires_at
+
+    def _disk_set(self, key: str, content: str, size: int, expires_at: float, now: float):
+        conn = self._connect()
+        if conn is None or size > self.max_disk_bytes:
+            return
+        old = conn.execute("SELECT size FROM page_cache WHERE url = ?", (key,)).fetchone()
+        if old is not None:
+            self._disk_bytes -= old[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO page_cache (url, host, content, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, url_host(key), content, size, expires_at, now)
+        )
+        self._disk_bytes += size
+        while self._disk_bytes > self.max_disk_bytes:
+            victims = conn.execute(
+                "SELECT url, size FROM page_cache ORDER BY last_access LIMIT 32"
+            ).fetchall()
+            if not victims:
+                break
+            for url, victim_size in victims:
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                conn.execute("DELETE FROM page_cache WHERE url = ?", (url,))
+                self._disk_bytes -= victim_size
+                self.disk_evictions += 1
+        conn.commit()
+
+    def _disk_delete(self, where: str, value: str) -> int:
+        conn = self._connect()
+        if conn is None:
+            return 0
+        removed, removed_bytes = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM page_cache WHERE {where} = ?", (value,)
+        ).fetchone()
+        conn.execute(f"DELETE FROM page_cache WHERE {where} = ?", (value,))
+        conn.commit()
+        self._disk_bytes -= removed_bytes
+        return removed
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---- 公共接口 ----
+
+    async def get(self, url: str) -> str | None:
+        """
+        依次查询内存层和磁盘层，磁盘命中时回填内存层。
+        """
+        key = normalize_url(url)
+        now = time.time()
+        content = self._memory_get(key, now)
+        if content is not None:
+            self.memory_hits += 1
+            return content
+        found = await self._run(self._disk_get, key, now)
+        if found is None:
+            self.misses += 1
+            return None
+        content, expires_at = found
+        self.disk_hits += 1
+        self._memory_set(key, content, len(content.encode()), expires_at)
+        return content
+
+    async def set(self, url: str, content: str):
+        """
+        写入两级缓存。
+        """
+        key = normalize_url(url)
+        now = time.time()
+        expires_at = now + self.ttl
+        size = len(content.encode())
+        self._memory_set(key, content, size, expires_at)
+        await self._run(self._disk_set, key, content, size, expires_at, now)
+
+    async def purge_url(self, url: str) -> int:
+        """
+        删除单个URL的缓存，返回删除的条目数。
+        """
+        key = normalize_url(url)
+        removed = 1 if key in self._memory else 0
+        self._memory_pop(key)
+        return max(removed, await self._run(self._disk_delete, "url", key))
+
+    async def purge_host(self, host: str) -> int:
+        """
+        删除某个站点下所有URL的缓存，返回删除的条目数。
+        """
+        host = host.lower()
+        keys = [key for key in self._memory if url_host(key) == host]
+        for key in keys:
+            self._memory_pop(key)
+        return max(len(keys), await self._run(self._disk_delete, "host", host))
+
+    def stats(self) -> dict:
+        """
+        返回命中、未命中、淘汰计数以及两级缓存的条目数和字节数。
+        """
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        await self._run(self._close)
+
+content_cache = ContentCache(
+    path=settings.CONTENT_CACHE_PATH,
+    ttl=settings.CONTENT_CACHE_TTL_SECONDS,
+    max_memory_bytes=settings.CONTENT_CACHE_MEMORY_BYTES,
+    max_disk_bytes=settings.CONTENT_CACHE_DISK_BYTES,
+)
@@ -0,0 +1,175 @@
+import re
+import struct
+import threading
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.core.common.relevance import tokenize
+
+_BITS = 64
+_MASK = (1 << _BITS) - 1
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SHINGLE_SIZE = 3
+# 第 i 张表把每个字节映射为其第 i 位（从高位起）的值，用于 bytes.translate
+_BIT_TABLES = [bytes((value >> (7 - bit)) & 1 for value in range(256)) for bit in range(8)]
+
+def _bit_weights(text: str) -> List[int] | None:
+    """
+    计算文本 SimHash 的逐位权重：每个词三元组的哈希值在某位为 1 时该位加 1，否则减 1。
+    哈希值打包为字节串后，借助逐字节的转换表统计每一位为 1 的次数，避免在 Python 中对每个三元组逐位循环。
+    检索词少于三元组长度时返回 None，这类短文本只做精确去重。
+    """
+    terms = tokenize(text)
+    if len(terms) < _SHINGLE_SIZE:
+        return None
+    # 指纹只在同一进程的单次过滤中相互比较，可以直接使用内置的字符串哈希
+    hashes = [value & _MASK for value in map(hash, zip(terms, terms[1:], terms[2:]))]
+    packed = struct.pack(f">{len(hashes)}Q", *hashes)
+    ones = [0] * _BITS
+    for bit, table in enumerate(_BIT_TABLES):
+        flags = packed.translate(table)
+        for position in range(_BITS // 8):
+            ones[position * 8 + bit] = flags[position::8].count(1)
+    return [2 * one - len(hashes) for one in ones]
+
+def _fingerprint(weights: List[int]) -> int:
+    fingerprint = 0
+    for weight in weights:
+        fingerprint = (fingerprint << 1) | (weight > 0)
+    return fingerprint
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+class _FingerprintIndex:
+    """
+    按汉明距离查找相近指纹的索引。
+    将 64 位指纹分为 max_distance + 1 段，距离不超过 max_distance 的两个指纹至少有一段完全相同，
+    因此只需比较共享某一段的候选指纹，插入和查询的期望耗时为常数。
+    """
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width, extra = divmod(_BITS, bands)
+        self.bands: List[Tuple[int, int]] = []
+        shift = _BITS
+        for band in range(bands):
+            size = width + (1 if band < extra else 0)
+            shift -= size
+            self.bands.append((shift, (1 << size) - 1))
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.comparisons = 0 # 实际比较过的候选指纹数
+
+    def _keys(self, fingerprint: int):
+        for band, (shift, mask) in enumerate(self.bands):
+            yield band, (fingerprint >> shift) & mask
+
+    def find(self, fingerprint: int) -> bool:
+        for key in self._keys(fingerprint):
+            for candidate in self.buckets.get(key, ()):
+                self.comparisons += 1
+                if (candidate ^ fingerprint).bit_count() <= self.max_distance:
+                    return True
+        return False
+
+    def add(self, fingerprint: int):
+        for key in self._keys(fingerprint):
+            self.buckets[key].append(fingerprint)
+
+class NearDuplicateFilter:
+    """
+    基于 SimHash 的近重复内容过滤。
+    先去掉与已保留文档近似重复的整篇文档（镜像、不同版本的同一页面），
+    再在剩余文档中去掉与之前出现过的段落近似重复的段落（分页、转载的重复片段）。
+    每个词只参与一次哈希，整体耗时与提取内容的总长度成线性关系。
+    filter 可以在多个线程中同时调用：索引在每次调用内创建，累计计数在调用结束时加锁合并。
+    """
+    def __init__(self, similarity_threshold: float):
+        self.similarity_threshold = similarity_threshold
+        self.max_distance = int((1 - similarity_threshold) * _BITS)
+        self.documents_removed = 0
+        self.passages_removed = 0
+        self.bytes_in = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def filter(self, documents: List[str]) -> List[str]:
+        """
+        返回去除近重复文档和段落后的文档列表，保持原有顺序。
+        """
+        return self.filter_with_stats(documents)[0]
+
+    def filter_with_stats(self, documents: List[str]) -> Tuple[List[str], dict]:
+        """
+        与 filter 相同，同时返回本次调用去除的文档数、段落数、节省的字节数和比较过的候选指纹数。
+        """
+        counts = {"documents_removed": 0, "passages_removed": 0, "bytes_in": 0, "bytes_saved": 0}
+        parsed = []
+        for document in documents:
+            passages = []
+            document_weights = [0] * _BITS
+            for paragraph in _PARAGRAPH_BREAK.split(document):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                weights = _bit_weights(paragraph)
+                if weights is not None:
+                    # 文档的位权重等于各段落位权重之和，无需再次哈希
+                    document_weights = [a + b for a, b in zip(document_weights, weights)]
+                passages.append((paragraph, weights))
+            parsed.append((document, passages, _fingerprint(document_weights)))
+
+        document_index = _FingerprintIndex(self.max_distance)
+        passage_index = _FingerprintIndex(self.max_distance)
+        seen_exact = set()
+        results = []
+        for document, passages, fingerprint in parsed:
+            size = len(document.encode())
+            counts["bytes_in"] += size
+            if any(weights is not None for _, weights in passages):
+                if document_index.find(fingerprint):
+                    counts["documents_removed"] += 1
+                    counts["bytes_saved"] += size
+                    continue
+                document_index.add(fingerprint)
+
+            kept = []
+            for paragraph, weights in passages:
+                exact = _normalize(paragraph)
+                duplicate = exact in seen_exact
+                if not duplicate and weights is not None:
+                    passage_fingerprint = _fingerprint(weights)
+                    duplicate = passage_index.find(passage_fingerprint)
+                    if not duplicate:
+                        passage_index.add(passage_fingerprint)
+                if duplicate:
+                    counts["passages_removed"] += 1
+                    counts["bytes_saved"] += len(paragraph.encode())
+                    continue
+                seen_exact.add(exact)
+                kept.append(paragraph)
+            if kept:
+                results.append("\n\n".join(kept))
+
+        with self._lock:
+            self.documents_removed += counts["documents_removed"]
+            self.passages_removed += counts["passages_removed"]
+            self.bytes_in += counts["bytes_in"]
+            self.bytes_saved += counts["bytes_saved"]
+        counts["comparisons"] = document_index.comparisons + passage_index.comparisons
+        return results, counts
+
+    def stats(self) -> dict:
+        """
+        返回累计去除的文档数、段落数，以及输入字节数和节省的字节数。
+        """
+        return {
+            "similarity_threshold": self.similarity_threshold,
+            "documents_removed": self.documents_removed,
+            "passages_removed": self.passages_removed,
+            "bytes_in": self.bytes_in,
+            "bytes_saved": self.bytes_saved,
+        }
+
+near_duplicate_filter = NearDuplicateFilter(similarity_threshold=settings.DEDUP_SIMILARITY_THRESHOLD)
@@ -1,9 +1,128 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import settings
+
+pwd_context = None # 首次哈希时创建，避免导入 passlib 拖慢启动
+
+def get_pwd_context():
+    """
+    返回密码哈希上下文，首次调用时导入 passlib 并创建。
+    """
+    global pwd_context
+    if pwd_context is None:
+        from passlib.context import CryptContext
+        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return pwd_context
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+class HashingOverloadedError(RuntimeError):
+    """
+    等待中的哈希任务已达上限时抛出，调用方应返回 503 并让客户端稍后重试。
+    """
+
+class HashingPool:
+    """
+    在线程池或进程池中执行 bcrypt 计算，避免阻塞事件循环。
+    同时执行的哈希数量由 max_workers 限制，排队数量超过 max_pending 时直接拒绝。
+    """
+    def __init__(self, max_workers: int, max_pending: int, executor_type: str = "thread"):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unsupported hashing executor type: {executor_type}")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor_type = executor_type
+        self._executor: Executor | None = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hashing")
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        在池中执行 func(*args) 并等待结果。
+        in_flight 在池中的任务结束时才减少，而不是在等待方返回时：等待方被取消后，已开始执行的任务仍占用工作线程，
+        必须继续计入上限；尚未开始的任务会随等待方一起取消。
+        """
+        if self.in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise HashingOverloadedError("Too many concurrent password hashing requests")
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        future = self._get_executor().submit(func, *args)
+        # 先于 wrap_future 注册，保证等待方恢复执行之前计数已经更新
+        future.add_done_callback(lambda finished: loop.is_closed() or loop.call_soon_threadsafe(self._job_done, finished))
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future: Future):
+        self.in_flight -= 1
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    async def map(self, func, items: list) -> list:
+        """
+        在池中对每个元素执行 func(item)，按输入顺序返回结果。
+        同时提交的任务数不超过 max_workers，批量任务不会占满排队名额而导致其他请求被拒绝。
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run_one(item):
+            async with semaphore:
+                return await self.run(func, item)
+
+        return await asyncio.gather(*(run_one(item) for item in items))
+
+    def stats(self) -> dict:
+        """
+        返回执行中、排队中的任务数以及完成、失败、拒绝的计数。
+        """
+        return {
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.max_workers),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hashing_pool = HashingPool(
+    max_workers=settings.HASHING_MAX_WORKERS,
+    max_pending=settings.HASHING_MAX_PENDING,
+    executor_type=settings.HASHING_EXECUTOR,
+)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """
+    在哈希池中校验密码，不阻塞事件循环。
+    """
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    """
+    在哈希池中计算密码哈希，不阻塞事件循环。
+    """
+    return await hashing_pool.run(get_password_hash, password)
@@ -3,71 +3,177 @@ import sys
 import asyncio
 import threading
 import traceback
+from collections import deque
 
+from app.core.config import settings
 from app.crud.log import LogCRUD
 from app.schemas.log import LogCreate
 from app.core.database import AsyncSessionLocal # 导入AsyncSessionLocal
 
 class DatabaseHandler(logging.Handler):
+    """
+    批量写入数据库的日志处理器。
+    emit 只把格式化后的记录放入有界内存队列，由单个后台任务按数量或时间阈值
+    以多行INSERT的方式批量写入 logs 表；队列已满时丢弃新记录并计数。
+    """
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        max_queue_size: int = settings.LOG_QUEUE_SIZE,
+        batch_size: int = settings.LOG_BATCH_SIZE,
+        flush_interval: float = settings.LOG_FLUSH_INTERVAL,
+    ):
+        super().__init__()
+        self.session_factory = session_factory
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        # 计数器，仅用于监控，允许在多线程下存在少量误差
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
     def emit(self, record):
-        # 在单独的线程中运行异步数据库操作
-        def _run_async_db_log():
-            async def _log_to_db():
-                async with AsyncSessionLocal() as db:
-                    try:
-                        log_crud = LogCRUD(db)
-                        log_entry = LogCreate(
-                            level=record.levelname,
-                            message=self.format(record), # 使用格式化后的消息
-                            pathname=record.pathname,
-                            lineno=record.lineno,
-                            funcname=record.funcName,
-                            exc_info=self.format_exception(record.exc_info) if record.exc_info else None,
-                            stack_info=record.stack_info
-                        )
-                        await log_crud.create_log(log_entry)
-                    except Exception as e:
-                        # 如果日志记录到数据库失败，则打印到控制台
-                        print(f"Failed to log to database: {e}", file=sys.stderr)
-                        traceback.print_exc(file=sys.stderr)
+        try:
+            self.enqueue({
+                "level": record.levelname,
+                "message": self.format(record), # 使用格式化后的消息
+                "pathname": record.pathname,
+                "lineno": record.lineno,
+                "funcname": record.funcName,
+                "exc_info": self.format_exception(record.exc_info) if record.exc_info else None,
+                "stack_info": record.stack_info
+            })
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, entry: dict) -> bool:
+        """
+        将一条日志（LogCreate 的字段字典）放入队列，可在任意线程中调用。
+        队列已满时丢弃该条日志并返回 False。
+        """
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return False
+        self._queue.append(entry)
+        if len(self._queue) >= self.batch_size:
+            self._notify()
+        return True
 
-            # 确保在新的事件循环中运行异步函数
-            # 如果当前线程没有事件循环，则创建一个
+    def _notify(self):
+        """
+        唤醒后台刷新任务。
+        """
+        if self._wakeup is None or self._loop is None:
+            return
+        if threading.get_ident() == self._loop_thread_id:
+            self._wakeup.set()
+        else:
             try:
-                loop = asyncio.get_event_loop()
+                self._loop.call_soon_threadsafe(self._wakeup.set)
             except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            if loop.is_running():
-                # 如果事件循环正在运行，则使用run_coroutine_threadsafe
-                # 这通常发生在FastAPI的主线程中
-                asyncio.run_coroutine_threadsafe(_log_to_db(), loop)
-            else:
-                # 如果事件循环没有运行，则直接运行
-                loop.run_until_complete(_log_to_db())
+                # 事件循环已关闭，剩余日志由 stop() 负责刷新
+                pass
+
+    def start(self):
+        """
+        在当前运行的事件循环中启动后台刷新任务，应在应用启动时调用。
+        """
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """
+        停止后台任务并将队列中剩余的日志全部写入数据库，应在应用关闭时调用。
+        """
+        if self._task is None:
+            await self.drain()
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._wakeup = None
+        self._loop = None
+        self._loop_thread_id = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.drain()
+        await self.drain()
+
+    async def drain(self):
+        """
+        按批次写出队列中当前所有的日志。
+        """
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: list[dict]):
+        try:
+            async with self.session_factory() as db:
+                log_crud = LogCRUD(db)
+                await log_crud.create_logs([LogCreate(**entry) for entry in batch])
+            self.written += len(batch)
+        except Exception as e:
+            # 如果日志记录到数据库失败，则打印到控制台
+            self.failed += len(batch)
+            print(f"Failed to log {len(batch)} records to database: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
 
-        # 启动一个新线程来执行数据库日志记录
-        thread = threading.Thread(target=_run_async_db_log)
-        thread.start()
+    def stats(self) -> dict:
+        """
+        返回队列深度以及写入、失败、丢弃的计数。
+        """
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
 
     def format_exception(self, exc_info):
         if exc_info:
             return ''.join(traceback.format_exception(*exc_info))
         return None
 
-def setup_logging():
-    db_handler = DatabaseHandler()
-    db_handler.setLevel(logging.WARNING) # 设置数据库处理器只记录ERROR及以上级别的日志
+db_handler = DatabaseHandler()
+db_handler.setLevel(logging.WARNING) # 设置数据库处理器只记录WARNING及以上级别的日志
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            db_handler # 添加自定义的数据库处理器
-        ]
-    )
+def setup_logging():
+    """
+    配置根日志记录器（控制台输出和数据库处理器），由应用入口调用一次；重复调用不会重复添加处理器。
+    """
+    root = logging.getLogger()
+    if db_handler not in root.handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.StreamHandler(sys.stdout),
+                db_handler # 添加自定义的数据库处理器
+            ]
+        )
     return logging.getLogger(__name__)
 
-logger = setup_logging()
+# 只获取日志记录器，不在导入时配置处理器
+logger = logging.getLogger(__name__)
@@ -1,49 +1,209 @@
+import logging
+import random
 import time
 import traceback
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from app.core.common.logger import logger
-from app.crud.log import LogCRUD
-from app.schemas.log import LogCreate
-from app.core.database import AsyncSessionLocal # 导入AsyncSessionLocal
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.common.logger import logger, db_handler
+from app.core.common.profiler import RequestProfiler, request_profiler
+from app.core.common.metrics import (
+    http_requests_total, http_request_duration_seconds, http_requests_in_progress, rate_limit_rejections_total
+)
+from app.core.common.ratelimit import (
+    AdmissionRejected, ConcurrencyLimiter, TokenBucketLimiter,
+    admission_limiters, ip_rate_limiter, retry_after_header, user_rate_limiter
+)
+from app.core.common.security import token_subject
+from app.core.scopes import request_scope
 
-class LogMiddleware(BaseHTTPMiddleware):
+class LogMiddleware:
     """
-    自定义日志中间件，用于记录HTTP请求和捕获未处理的异常。
+    自定义日志中间件（纯ASGI实现），用于记录HTTP请求耗时和捕获未处理的异常。
+    不经过 BaseHTTPMiddleware，不额外创建任务也不包装响应流，流式响应可以正常透传。
+    需要性能分析的请求（见 RequestProfiler）在这里开始和结束采样，响应头 X-Profile-Id 返回分析结果的ID。
     """
-    async def dispatch(self, request: Request, call_next):
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = settings.LOG_REQUEST_SAMPLE_RATE,
+        profiler: RequestProfiler = request_profiler
+    ):
         """
-        处理传入的HTTP请求，记录请求信息，并捕获异常。
-        - **request**: Starlette Request 对象。
-        - **call_next**: 下一个中间件或路由处理函数。
+        - **app**: 下一个ASGI应用。
+        - **sample_rate**: 记录请求日志的采样率（0~1），异常和5xx响应始终记录。
+        - **profiler**: 按需进行请求性能分析的分析器。
         """
-        start_time = time.time()
-        response = Response("Internal Server Error", status_code=500) # 默认响应，以防发生错误
+        self.app = app
+        self.sample_rate = sample_rate
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500 # 默认状态码，以防在响应开始前发生错误
+        trigger = self.profiler.trigger_for(scope)
+        profile = self.profiler.start(scope, trigger) if trigger else None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile is not None:
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            # 捕获并记录异常到数据库
-            # 在中间件中获取新的异步会话，以确保日志记录的独立性
-            async with AsyncSessionLocal() as db:
-                try:
-                    log_crud = LogCRUD(db)
-                    log_entry = LogCreate(
-                        level="ERROR",
-                        message=f"Unhandled exception: {e}",
-                        pathname=request.url.path,
-                        lineno=0, # 中间件中难以获取精确行号
-                        funcname="dispatch",
-                        exc_info=traceback.format_exc(),
-                        stack_info=None # 堆栈信息通常包含在exc_info中
-                    )
-                    await log_crud.create_log(log_entry) # 异步调用创建日志
-                    logger.error(f"Unhandled exception during request to {request.url.path}: {e}", exc_info=True)
-                except Exception as log_e:
-                    logger.error(f"Failed to log exception to database: {log_e}", exc_info=True)
-            raise e # 重新抛出异常，以便FastAPI可以继续处理错误
+            # 捕获异常并放入数据库日志队列，由后台任务批量写入，不阻塞当前请求
+            db_handler.enqueue({
+                "level": "ERROR",
+                "message": f"Unhandled exception: {e}",
+                "pathname": scope["path"],
+                "lineno": 0, # 中间件中难以获取精确行号
+                "funcname": "dispatch",
+                "exc_info": traceback.format_exc(),
+                "stack_info": None # 堆栈信息通常包含在exc_info中
+            })
+            logger.error("Unhandled exception during request to %s: %s", scope["path"], e, exc_info=True)
+            raise # 重新抛出异常，以便FastAPI可以继续处理错误
         finally:
-            process_time = time.time() - start_time
-            logger.info(f"Request: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.4f}s")
-        return response
+            if profile is not None:
+                await self.profiler.finish(profile, status_code)
+            if logger.isEnabledFor(logging.INFO) and (
+                status_code >= 500 or self.sample_rate >= 1.0 or random.random() < self.sample_rate
+            ):
+                process_time = time.perf_counter() - start_time
+                # 使用惰性格式化，仅在日志真正输出时才拼接字符串
+                logger.info(
+                    "Request: %s %s - Status: %s - Time: %.4fs",
+                    scope["method"], scope["path"], status_code, process_time
+                )
+
+class MetricsMiddleware:
+    """
+    记录每个路由的请求数、延迟分布和正在处理的请求数（纯ASGI实现）。
+    路由按路径模板（如 /users/{user_id}）而不是实际路径统计，未匹配任何路由的请求统一记为 unmatched，
+    避免标签数量随请求路径无限增长。
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(method)
+            # 路由匹配后 FastAPI 会把匹配到的路由写入 scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_requests_total.inc(method, route_path, status_code)
+            http_request_duration_seconds.observe(time.perf_counter() - start_time, method, route_path)
+
+class RequestScopeMiddleware:
+    """
+    为每个HTTP请求开启依赖注入的请求作用域，响应结束后释放请求内创建的数据库会话等资源。
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        async with request_scope():
+            await self.app(scope, receive, send)
+
+class RateLimitMiddleware:
+    """
+    LLM 等高开销接口的限流和准入控制（纯ASGI实现），只作用于 limiters 中配置的路径：
+    1. 按客户端IP和用户（Bearer 令牌中的 sub，无有效令牌时只按IP）的令牌桶限流，超出时返回 429；
+    2. 按接口限制同时处理的请求数，超出的请求排队，队列已满或预计等待过久时返回 503。
+    拒绝时通过 Retry-After 告知客户端重试时间。名额在整个响应（包括流式响应）发送完毕后才归还。
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: dict[str, ConcurrencyLimiter] = admission_limiters,
+        user_limiter: TokenBucketLimiter | None = user_rate_limiter,
+        ip_limiter: TokenBucketLimiter | None = ip_rate_limiter
+    ):
+        """
+        - **app**: 下一个ASGI应用。
+        - **limiters**: 各接口路径的准入控制。
+        - **user_limiter**: 按用户限流的令牌桶，为 None 时不按用户限流。
+        - **ip_limiter**: 按客户端IP限流的令牌桶，为 None 时不按IP限流。
+        """
+        self.app = app
+        self.limiters = limiters
+        self.user_limiter = user_limiter
+        self.ip_limiter = ip_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter = self.limiters.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if self.ip_limiter is not None:
+            client = scope.get("client")
+            retry_after = self.ip_limiter.acquire(client[0] if client else "unknown")
+            if retry_after:
+                await self._reject(scope, receive, send, 429, "ip", retry_after)
+                return
+        if self.user_limiter is not None:
+            subject = self._subject(scope)
+            retry_after = self.user_limiter.acquire(subject) if subject else 0.0
+            if retry_after:
+                await self._reject(scope, receive, send, 429, "user", retry_after)
+                return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            await self._reject(scope, receive, send, 503, "queue", e.retry_after)
+            return
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start_time)
+
+    @staticmethod
+    def _subject(scope: Scope) -> str | None:
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        return token_subject(token)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, reason: str, retry_after: float):
+        rate_limit_rejections_total.inc(scope["path"], reason)
+        detail = "Too many requests, please retry later" if status_code == 429 else "Server is busy, please retry later"
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"Retry-After": retry_after_header(retry_after)},
+        )
+        await response(scope, receive, send)
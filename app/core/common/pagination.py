@@ -0,0 +1,29 @@
+import base64
+import json
+
+class InvalidCursorError(ValueError):
+    """
+    分页游标无法解析（被篡改、截断或来自不兼容的版本）。
+    """
+
+_CURSOR_VERSION = 1
+
+def encode_cursor(last_id: int) -> str:
+    """
+    将上一页最后一条记录的ID编码为不透明的游标字符串。
+    """
+    payload = json.dumps({"v": _CURSOR_VERSION, "after": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    解析游标，返回上一页最后一条记录的ID。
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload.get("v") != _CURSOR_VERSION or type(payload.get("after")) is not int:
+            raise ValueError("unsupported cursor payload")
+        return payload["after"]
+    except (ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
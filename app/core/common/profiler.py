@@ -0,0 +1,238 @@
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.common.logger import logger
+
+# 当前请求正在进行的性能分析，请求内创建的任务会继承该上下文
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar("active_profile", default=None)
+
+# 事件循环当前正在执行的任务，由 asyncio 维护，采样线程只读取
+_current_tasks = asyncio.tasks._current_tasks
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _await_stack(task: asyncio.Task) -> List[str]:
+    """
+    沿协程的 await 链展开挂起任务的逻辑调用栈，最后一层为正在等待的对象（如 Future）。
+    """
+    labels = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        for prefix in ("cr", "ag", "gi"):
+            if hasattr(awaitable, f"{prefix}_frame"):
+                break
+        else:
+            labels.append(f"<await {type(awaitable).__name__}>")
+            break
+        frame = getattr(awaitable, f"{prefix}_frame")
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "gi_yieldfrom" if prefix == "gi" else f"{prefix}_await")
+    return labels
+
+def _thread_stack(frame, root_frame) -> List[str]:
+    """
+    展开线程当前的调用栈，只保留从任务协程开始的部分，与挂起时的 await 栈共用同一个根。
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root_frame:
+            break
+        frame = frame.f_back
+    return [_frame_label(frame) for frame in reversed(frames)]
+
+class Profile:
+    """
+    单个请求的采样性能分析。
+    后台线程按固定间隔采样：请求内的任务正在事件循环上运行时记录线程的实际调用栈，
+    挂起等待时记录其 await 链，因此等待上游的时间和占用 CPU 的时间都会体现在结果中。
+    并发的多个任务各自计入样本，样本数反映的是任务时间而不是墙钟时间。
+    """
+    def __init__(self, profile_id: str, method: str, path: str, trigger: str, interval_seconds: float):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.interval_seconds = interval_seconds
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.tasks: List[asyncio.Task] = [asyncio.current_task()] # 请求内的任务，只追加，采样线程遍历副本
+        self.samples: Counter = Counter()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{profile_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.duration_seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self._sample()
+
+    def _sample(self):
+        running = _current_tasks.get(self.loop)
+        frame = sys._current_frames().get(self.thread_id)
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            if task is running and frame is not None:
+                coro = task.get_coro()
+                stack = _thread_stack(frame, getattr(coro, "cr_frame", None))
+            else:
+                stack = _await_stack(task)
+            if stack:
+                self.samples[";".join(stack)] += 1
+
+    def collapsed(self) -> str:
+        """
+        以折叠栈格式（每行“栈帧;栈帧;... 样本数”）返回结果，可直接用 flamegraph.pl、speedscope 等工具生成火焰图。
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    """
+    在事件循环上安装任务工厂：正在分析的请求内创建的任务（gather、create_task、anyio 任务组等）
+    会被加入该请求的任务列表。未在分析中的请求只多一次 ContextVar 读取。
+    """
+    previous = loop.get_task_factory()
+    if getattr(previous, "_request_profiler", False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _active_profile.get()
+        if profile is not None:
+            profile.tasks.append(task)
+        return task
+
+    factory._request_profiler = True
+    loop.set_task_factory(factory)
+
+class RequestProfiler:
+    """
+    按需对单个请求进行采样性能分析。
+    携带与 ADMIN_TOKEN 一致的 X-Profile 请求头的请求总是被分析；其余匹配路径前缀的请求按采样率分析。
+    分析结果以折叠栈文件保存在 output_dir 中，只保留最近 max_profiles 个。
+    """
+    def __init__(
+        self,
+        output_dir: str,
+        interval_seconds: float,
+        sample_rate: float,
+        paths: List[str],
+        admin_token: str,
+        max_profiles: int,
+        max_active: int
+    ):
+        self.output_dir = output_dir
+        self.interval_seconds = interval_seconds
+        self.sample_rate = sample_rate
+        self.paths = tuple(paths)
+        self.admin_token = admin_token
+        self.max_profiles = max_profiles
+        self.max_active = max_active
+        self.active = 0
+        self.profiles: OrderedDict[str, dict] = OrderedDict()
+
+    def trigger_for(self, scope) -> Optional[str]:
+        """
+        判断请求是否需要分析，返回触发方式（header 或 sampled），不需要时返回 None。
+        """
+        if self.active >= self.max_active:
+            return None
+        if self.admin_token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    if hmac.compare_digest(value, self.admin_token.encode()):
+                        return "header"
+                    break
+        if self.sample_rate > 0 and scope["path"].startswith(self.paths) and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, scope, trigger: str) -> Profile:
+        """
+        开始分析当前请求，必须在处理请求的任务中调用。
+        """
+        _install_task_factory(asyncio.get_running_loop())
+        profile = Profile(uuid.uuid4().hex, scope["method"], scope["path"], trigger, self.interval_seconds)
+        _active_profile.set(profile)
+        self.active += 1
+        profile.start()
+        return profile
+
+    def _save(self, profile: Profile) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{profile.id}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profile.collapsed())
+        return path
+
+    async def finish(self, profile: Profile, status_code: int):
+        """
+        停止采样并在线程中写入结果文件，超出保留数量时删除最早的结果。
+        """
+        try:
+            await asyncio.to_thread(profile.stop)
+            path = await asyncio.to_thread(self._save, profile)
+        finally:
+            self.active -= 1
+        self.profiles[profile.id] = {
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "trigger": profile.trigger,
+            "status_code": status_code,
+            "started_at": profile.started_at,
+            "duration_seconds": profile.duration_seconds,
+            "samples": sum(profile.samples.values()),
+            "file": path,
+        }
+        while len(self.profiles) > self.max_profiles:
+            _, evicted = self.profiles.popitem(last=False)
+            try:
+                os.remove(evicted["file"])
+            except OSError:
+                pass
+        logger.info(f"Saved profile {profile.id} for {profile.method} {profile.path} ({profile.trigger}) to {path}")
+
+    def list_profiles(self) -> List[dict]:
+        """
+        返回已保存的分析结果，最新的在前。
+        """
+        return list(reversed(self.profiles.values()))
+
+    def path_for(self, profile_id: str) -> Optional[str]:
+        profile = self.profiles.get(profile_id)
+        return profile["file"] if profile is not None else None
+
+request_profiler = RequestProfiler(
+    output_dir=settings.PROFILER_OUTPUT_DIR,
+    interval_seconds=settings.PROFILER_INTERVAL_SECONDS,
+    sample_rate=settings.PROFILER_SAMPLE_RATE,
+    paths=[path.strip() for path in settings.PROFILER_PATHS.split(",") if path.strip()],
+    admin_token=settings.ADMIN_TOKEN,
+    max_profiles=settings.PROFILER_MAX_PROFILES,
+    max_active=settings.PROFILER_MAX_ACTIVE
+)
@@ -0,0 +1,212 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Hashable
+
+from app.core.config import settings
+
+class AdmissionRejected(Exception):
+    """
+    接口的等待队列已满，或预计排队时间超过上限时抛出，调用方应返回 503 并让客户端在 retry_after 秒后重试。
+    """
+    def __init__(self, retry_after: float):
+        super().__init__(f"Admission rejected, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+def retry_after_header(seconds: float) -> str:
+    """
+    Retry-After 只接受整数秒，向上取整且至少为1秒。
+    """
+    return str(max(1, math.ceil(seconds)))
+
+class TokenBucketLimiter:
+    """
+    按键（用户或客户端IP）限流的令牌桶：每个键最多积累 burst 个令牌，每秒补充 rate 个，每个请求消耗一个。
+    令牌在访问时按经过的时间补充，不需要定时任务，每次检查都是 O(1)。
+    桶按最近访问顺序保存在 OrderedDict 中，每次检查时顺带从最旧的一端淘汰空闲超过 idle_seconds 的键；
+    空闲这么久的桶已经装满，与新建的桶等价，因此淘汰不会放宽限制。键数超过 max_keys 时淘汰最久未使用的键。
+    仅在事件循环线程中使用，不加锁。
+    """
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_keys: int,
+        idle_seconds: float,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_seconds = max(idle_seconds, burst / rate)
+        self.timer = timer
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict() # 键 -> [剩余令牌数, 上次更新时间]
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def acquire(self, key: Hashable, cost: float = 1.0) -> float:
+        """
+        为 key 消耗 cost 个令牌。成功时返回 0，令牌不足时不消耗并返回需要等待的秒数。
+        """
+        now = self.timer()
+        self._evict_idle(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            self.allowed += 1
+            return 0.0
+        self.rejected += 1
+        return (cost - bucket[0]) / self.rate
+
+    def _evict_idle(self, now: float):
+        cutoff = now - self.idle_seconds
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[1] > cutoff:
+                break
+            del self._buckets[key]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        """
+        返回当前键数以及放行、拒绝、淘汰的计数。
+        """
+        return {
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+class ConcurrencyLimiter:
+    """
+    单个接口的准入控制：同时处理的请求数不超过 max_in_flight，超出的请求按先后顺序排队等待，
+    请求结束时名额直接交给队首的等待者。以下情况立即拒绝（AdmissionRejected），不让请求在队列中空等：
+    - 等待队列已有 max_queue 个请求；
+    - 按平均处理时长估算的排队时间超过 queue_timeout；
+    - 排队超过 queue_timeout 仍未轮到。
+    仅在事件循环线程中使用，不加锁。
+    """
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        # 已超时或取消的等待者不从队列中间删除，轮到时跳过，保证入队和出队都是 O(1)
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service_time: float | None = None # 名额占用时长的指数移动平均
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def estimated_wait(self) -> float:
+        """
+        估算新请求排在当前队列之后需要等待的秒数。
+        """
+        if self._service_time is None:
+            return 0.0
+        return (self.queued + 1) / self.max_in_flight * self._service_time
+
+    async def acquire(self):
+        """
+        获取一个处理名额，必要时排队等待；无法在 queue_timeout 内获得名额时抛出 AdmissionRejected。
+        """
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        estimated = self.estimated_wait()
+        if self.queued >= self.max_queue or estimated > self.queue_timeout:
+            self.shed += 1
+            raise AdmissionRejected(max(estimated, self._service_time or 1.0))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Python 3.12+ 的 wait_for 基于 asyncio.timeout，名额在超时的同一轮事件循环中交给本请求时仍会抛出 TimeoutError，
+            # 此时名额已经计入 in_flight，需要转交给下一个等待者或归还，否则该接口的并发上限会永久减少
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            self.timed_out += 1
+            raise AdmissionRejected(self.estimated_wait()) from None
+        except asyncio.CancelledError:
+            # 名额已经交给本请求但请求被取消（如客户端断开），需要把名额还回去
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            self.queued -= 1
+        self.admitted += 1
+
+    def release(self, held: float | None = None):
+        """
+        归还名额，有等待者时直接交给队首的等待者。held 为本次占用名额的秒数，用于估算排队时间。
+        """
+        if held is not None:
+            self._service_time = held if self._service_time is None else self._service_time + 0.2 * (held - self._service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """
+        返回正在处理和排队的请求数、平均处理时长以及放行、拒绝、排队超时的计数。
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "service_time_seconds": self._service_time,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
+
+def parse_admission_limits(spec: str) -> dict[str, int]:
+    """
+    解析 "路径=上限,路径=上限" 格式的配置。
+    """
+    limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        path, _, limit = item.partition("=")
+        limits[path.strip()] = int(limit)
+    return limits
+
+def _bucket_limiter(rate: float, burst: float) -> TokenBucketLimiter | None:
+    if rate <= 0 or not settings.RATE_LIMIT_ENABLED:
+        return None
+    return TokenBucketLimiter(rate, burst, settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_IDLE_SECONDS)
+
+# 各接口的准入控制，以请求路径为键；用户和IP的令牌桶由这些接口共用
+admission_limiters = {
+    path: ConcurrencyLimiter(limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    for path, limit in parse_admission_limits(settings.ADMISSION_LIMITS).items()
+} if settings.RATE_LIMIT_ENABLED else {}
+user_rate_limiter = _bucket_limiter(settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST)
+ip_rate_limiter = _bucket_limiter(settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST)
@@ -0,0 +1,125 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from app.core.common.tokens import estimate_tokens, split_into_chunks
+
+_WORD = re.compile(r"[a-z0-9]+(?:['._-][a-z0-9]+)*")
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索词：拉丁字母和数字按单词切分并转小写，中日韩文本没有分词器，按相邻字符二元组切分。
+    """
+    text = text.lower()
+    terms = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+class BM25Index:
+    """
+    内存中的 BM25 倒排索引。
+    索引保存每个词的 (段落序号, 词频) 倒排列表，查询时只遍历查询词的倒排列表，
+    按词累加各段落得分，耗时与命中的倒排项数量成正比，而不是与段落数乘以查询词数成正比。
+    """
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(passages)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for index, passage in enumerate(passages):
+            terms = tokenize(passage)
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((index, frequency))
+        self.average_length = (sum(self.lengths) / self.size) if self.size else 0.0
+
+    def idf(self, term: str) -> float:
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (self.size - frequency + 0.5) / (frequency + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        """
+        返回每个段落相对于查询的 BM25 得分，与段落顺序一致。
+        """
+        scores = [0.0] * self.size
+        if not self.size:
+            return scores
+        # 预先计算每个段落的长度归一化项，查询的每个词复用
+        norms = [self.k1 * (1 - self.b + self.b * length / (self.average_length or 1)) for length in self.lengths]
+        for term, query_frequency in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            weight = self.idf(term) * query_frequency * (self.k1 + 1)
+            for index, frequency in postings:
+                scores[index] += weight * frequency / (frequency + norms[index])
+        return scores
+
+def split_passages(document: str, passage_tokens: int) -> List[str]:
+    """
+    按段落切分文档，超过 passage_tokens 的段落再切分为多个块。
+    短段落不与相邻段落合并，使导航、页脚等内容单独成段，可以被单独过滤。
+    """
+    passages = []
+    for paragraph in _PARAGRAPH_BREAK.split(document):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= passage_tokens:
+            passages.append(paragraph)
+        else:
+            passages.extend(split_into_chunks(paragraph, passage_tokens))
+    return passages
+
+def select_passages(
+    documents: List[str],
+    query: str,
+    budget_tokens: int,
+    passage_tokens: int
+) -> Tuple[List[str], dict]:
+    """
+    将文档切分为段落，按与查询的 BM25 得分从高到低选取，直到达到 token 预算。
+    得分为零的段落（如导航、页脚等与问题无关的内容）不会被选中。
+    返回按原文顺序重组后的文档列表（没有入选段落的文档被去掉）以及统计信息；
+    所有段落都与查询无关时原样返回文档，交由后续阶段处理。
+    """
+    passages: List[Tuple[int, str, int]] = []
+    for document_index, document in enumerate(documents):
+        for passage in split_passages(document, passage_tokens):
+            passages.append((document_index, passage, estimate_tokens(passage)))
+
+    total_tokens = sum(tokens for _, _, tokens in passages)
+    scores = BM25Index([passage for _, passage, _ in passages]).scores(query)
+    ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: scores[i], reverse=True)
+
+    stats = {
+        "passages": len(passages),
+        "original_tokens": total_tokens,
+    }
+    if not ranked:
+        stats.update(kept_passages=len(passages), kept_tokens=total_tokens)
+        return documents, stats
+
+    kept = []
+    kept_tokens = 0
+    for i in ranked:
+        tokens = passages[i][2]
+        if kept_tokens + tokens > budget_tokens:
+            continue # 跳过放不下的段落，继续尝试得分更低但更短的段落
+        kept.append(i)
+        kept_tokens += tokens
+
+    grouped: Dict[int, List[str]] = defaultdict(list)
+    for i in sorted(kept):
+        document_index, passage, _ = passages[i]
+        grouped[document_index].append(passage)
+    stats.update(kept_passages=len(kept), kept_tokens=kept_tokens)
+    return ["\n\n".join(grouped[index]) for index in sorted(grouped)], stats
@@ -1,17 +1,19 @@
+import hmac
 from datetime import datetime, timedelta
 from typing import Optional
 
 from jose import JWTError, jwt
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi_injector import Injected
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core.config import settings
-from app.core.database import get_db
 from app.crud.user import UserCRUD
 from app.models.user import User
-from sqlalchemy.ext.asyncio import AsyncSession # 导入AsyncSession
 from app.core.common.hashing import verify_password, get_password_hash
+from app.core.common.cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -30,27 +32,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+def token_subject(token: str) -> Optional[str]:
+    """
+    校验JWT访问令牌并返回其中的 sub（用户邮箱），令牌无效、已过期或没有 sub 时返回 None。
+    - **token**: JWT令牌。
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def _detached_copy(user: User) -> User:
+    """
+    复制一个不属于任何会话的用户对象用于缓存，避免跨请求共享某个会话中的实例。
+    """
+    copy = User(id=user.id, email=user.email, hashed_password=user.hashed_password, is_active=user.is_active)
+    make_transient_to_detached(copy)
+    return copy
+
+async def get_current_user(token: str = Depends(oauth2_scheme), user_crud: UserCRUD = Injected(UserCRUD)) -> User:
     """
     获取当前认证用户。
+    已解析的用户按令牌 sub 缓存在 principal_cache 中，命中时不再查询数据库。
+    未命中时这次查询读主库（请求中的其他读操作仍走只读副本）：缓存刚因用户更新而失效时，副本可能尚未同步，读副本会把旧的 is_active/email 重新写入缓存。
     - **token**: 从请求头中提取的JWT令牌。
-    - **db**: 数据库会话依赖。
+    - **user_crud**: 用户CRUD依赖，与当前请求共享同一数据库会话。
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    username = token_subject(token)
+    if username is None:
         raise credentials_exception
-    
-    user_crud = UserCRUD(db)
-    user = await user_crud.get_user_by_email(email=username)
+
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    user = await user_crud.get_user_by_email(email=username, from_primary=True)
     if user is None:
         raise credentials_exception
+    user = _detached_copy(user)
+    principal_cache.set(username, user)
     return user
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    校验管理接口令牌（X-Admin-Token 请求头）。未配置 ADMIN_TOKEN 时管理接口始终不可用。
+    - **x_admin_token**: 请求头中的管理令牌。
+    """
+    if not settings.ADMIN_TOKEN or x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required",
+        )
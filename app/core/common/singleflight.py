@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    合并并发的相同调用：同一个键同时只执行一次，其余调用方等待并共享同一结果（或异常）。
+    共享的执行在独立任务中运行，单个等待方被取消不会影响其他等待方；
+    只有当所有等待方都已取消时才取消共享任务。
+    """
+    def __init__(self):
+        self._calls: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 func() 并返回结果；若相同 key 的调用正在进行，则等待其结果。
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.create_task(func())
+            call = (task, [0])
+            self._calls[key] = call
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        task, waiters = call
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiters[0] == 1 and not task.done():
+                task.cancel()
+                # 立即移除该键，取消完成前到达的新调用方会开始新的执行，而不是加入已取消的任务
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key, (None,))[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception() # 标记异常已被读取，避免无人等待时出现告警
+
+    def stats(self) -> dict:
+        """
+        返回正在执行的调用数、等待这些调用的调用方数、实际执行次数和被合并的调用次数。
+        """
+        return {
+            "in_flight": len(self._calls),
+            "waiters": sum(waiters[0] for _, waiters in self._calls.values()),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,39 @@
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+from app.core.common.logger import logger
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """
+    按 Server-Sent Events 格式编码一条事件，数据序列化为单行JSON。
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+async def _encode_events(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    try:
+        async for event, data in events:
+            yield format_sse(data, event)
+    except Exception as e:
+        # 响应头已发送，无法再改变状态码，以 error 事件通知客户端
+        logger.error(f"Streaming response error: {e}")
+        yield format_sse({"detail": str(e)}, "error")
+    finally:
+        aclose = getattr(events, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """
+    将 (事件名, 数据) 异步迭代器包装为 text/event-stream 流式响应。
+    客户端断开时 Starlette 会取消响应任务，迭代器随之关闭并释放上游连接。
+    """
+    return StreamingResponse(
+        _encode_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
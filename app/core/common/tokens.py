@@ -0,0 +1,81 @@
+import math
+import re
+from functools import lru_cache
+from typing import List
+
+# 中日韩字符及全角符号，通常每个字符约占一个 token
+_CJK = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[。！？；.!?;\n])")
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # tiktoken 为可选依赖，未安装或无法加载编码时使用估算
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """
+    计算文本的 token 数。安装了 tiktoken 时精确计算，否则按中日韩字符每字一个、其他字符每四个一个估算。
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """
+    将超过 max_tokens 的段落先按句子切分，单句仍然过长时按字符数硬切分。
+    """
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        if not sentence:
+            continue
+        tokens = estimate_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append(sentence)
+            continue
+        width = max(1, len(sentence) * max_tokens // tokens)
+        pieces.extend(sentence[i:i + width] for i in range(0, len(sentence), width))
+    return pieces
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    按段落边界将文本切分为不超过 max_tokens 的块，相邻块之间保留约 overlap_tokens 的重叠内容，
+    使跨块的上下文不至于丢失。
+    """
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens <= max_tokens:
+            units.append((paragraph, tokens))
+        else:
+            units.extend((piece, estimate_tokens(piece)) for piece in _split_oversized(paragraph, max_tokens))
+
+    chunks = []
+    current: List[tuple] = []
+    current_tokens = 0
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(piece for piece, _ in current))
+            # 从上一块末尾保留不超过 overlap_tokens 的内容作为下一块的开头
+            carried = []
+            carried_tokens = 0
+            for piece, piece_tokens in reversed(current):
+                if carried_tokens + piece_tokens > overlap_tokens or carried_tokens + piece_tokens + tokens > max_tokens:
+                    break
+                carried.insert(0, (piece, piece_tokens))
+                carried_tokens += piece_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append((unit, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(piece for piece, _ in current))
+    return chunks
@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from pydantic import Field # 导入 Field
 from pydantic_settings import BaseSettings # 导入 BaseSettings
 
 load_dotenv()
@@ -13,19 +12,123 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    DATABASE_SCHEMA_MODE: str = os.getenv("DATABASE_SCHEMA_MODE", "create") # 启动时的表结构处理：create 建表（默认），check 只检查结构版本，skip 不处理
     POOL_SIZE: int = int(os.getenv("POOL_SIZE", 10)) # Default pool size
+    MAX_OVERFLOW: int = int(os.getenv("MAX_OVERFLOW", 20)) # 超过连接池大小后允许的最大溢出连接数
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "") # 只读副本URL，逗号分隔，为空时读写都走主库
+    DATABASE_REPLICA_UNHEALTHY_SECONDS: float = float(os.getenv("DATABASE_REPLICA_UNHEALTHY_SECONDS", 30)) # 副本连接失败后暂停使用的时间（秒）
+
+    # 用户列表配置
+    USER_PAGE_MAX_LIMIT: int = int(os.getenv("USER_PAGE_MAX_LIMIT", 1000)) # 用户列表单页最大条数
+    USER_BULK_MAX_ITEMS: int = int(os.getenv("USER_BULK_MAX_ITEMS", 1000)) # 批量创建用户单次请求的最大条数
+    USER_EXPORT_CHUNK_SIZE: int = int(os.getenv("USER_EXPORT_CHUNK_SIZE", 1000)) # 用户导出时每次从数据库游标读取的行数
+
+    # 已认证用户缓存配置
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000)) # 最大缓存用户数
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", 60)) # 缓存有效期（秒）
+
+    # 密码哈希池配置
+    HASHING_EXECUTOR: str = os.getenv("HASHING_EXECUTOR", "thread") # thread 或 process
+    HASHING_MAX_WORKERS: int = int(os.getenv("HASHING_MAX_WORKERS", os.cpu_count() or 4)) # 同时执行的哈希数量
+    HASHING_MAX_PENDING: int = int(os.getenv("HASHING_MAX_PENDING", 64)) # 排队上限，超出后返回503
+
+    # 数据库日志批量写入配置
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000)) # 内存队列最大条数，超出后丢弃并计数
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", 100)) # 单次批量插入的最大条数
+    LOG_FLUSH_INTERVAL: float = float(os.getenv("LOG_FLUSH_INTERVAL", 1.0)) # 最长刷新间隔（秒）
+    LOG_REQUEST_SAMPLE_RATE: float = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", 1.0)) # 请求日志采样率，5xx始终记录
+
+    # 管理接口配置
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "") # 管理接口令牌（X-Admin-Token），为空时禁用管理接口和请求头触发的性能分析
+
+    # LLM 接口限流和准入控制配置（客户端IP取自连接地址，部署在反向代理之后时需启用 uvicorn 的 --proxy-headers）
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true" # 是否启用限流和准入控制
+    RATE_LIMIT_USER_RATE: float = float(os.getenv("RATE_LIMIT_USER_RATE", 1.0)) # 每个用户每秒补充的请求数，0为不按用户限流
+    RATE_LIMIT_USER_BURST: float = float(os.getenv("RATE_LIMIT_USER_BURST", 20)) # 每个用户允许的突发请求数
+    RATE_LIMIT_IP_RATE: float = float(os.getenv("RATE_LIMIT_IP_RATE", 2.0)) # 每个客户端IP每秒补充的请求数，0为不按IP限流
+    RATE_LIMIT_IP_BURST: float = float(os.getenv("RATE_LIMIT_IP_BURST", 40)) # 每个客户端IP允许的突发请求数
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000)) # 每种令牌桶最多保留的键数，超出后淘汰最久未使用的
+    RATE_LIMIT_IDLE_SECONDS: float = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", 600)) # 键空闲多久后淘汰（不短于令牌桶装满所需的时间）
+    ADMISSION_LIMITS: str = os.getenv("ADMISSION_LIMITS", "/llm/chat=64,/llm/summarize_urls_with_query=16") # 各接口同时处理的请求数上限，格式为 路径=上限，逗号分隔；限流只作用于这些接口
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", 128)) # 每个接口等待队列的长度，队列已满时返回503
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 10)) # 最长排队时间，预计等待时间超过该值时直接返回503
+
+    # 请求性能分析配置
+    PROFILER_SAMPLE_RATE: float = float(os.getenv("PROFILER_SAMPLE_RATE", 0.0)) # 按采样率自动分析的请求比例，0为只通过X-Profile请求头触发
+    PROFILER_PATHS: str = os.getenv("PROFILER_PATHS", "/llm/summarize_urls_with_query") # 按采样率分析的路径前缀，逗号分隔
+    PROFILER_INTERVAL_SECONDS: float = float(os.getenv("PROFILER_INTERVAL_SECONDS", 0.005)) # 采样间隔（秒）
+    PROFILER_OUTPUT_DIR: str = os.getenv("PROFILER_OUTPUT_DIR", "./profiles") # 折叠栈文件的保存目录
+    PROFILER_MAX_PROFILES: int = int(os.getenv("PROFILER_MAX_PROFILES", 100)) # 保留的分析结果数量，超出后删除最早的
+    PROFILER_MAX_ACTIVE: int = int(os.getenv("PROFILER_MAX_ACTIVE", 2)) # 同时进行分析的请求数上限
 
     # Azure OpenAI 配置
-    AZURE_OPENAI_API_KEY: str = Field(..., env="AZURE_OPENAI_API_KEY")
-    AZURE_OPENAI_ENDPOINT: str = Field(..., env="AZURE_OPENAI_ENDPOINT")
+    # 外部服务的密钥等配置在首次创建对应客户端或服务时通过 require() 检查，缺失时不影响启动和其他接口
+    AZURE_OPENAI_API_KEY: str = os.getenv("AZURE_OPENAI_API_KEY", "")
+    AZURE_OPENAI_ENDPOINT: str = os.getenv("AZURE_OPENAI_ENDPOINT", "")
     AZURE_OPENAI_API_VERSION: str = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
-    AZURE_OPENAI_DEPLOYMENT_NAME: str = Field(..., env="AZURE_OPENAI_DEPLOYMENT_NAME")
+    AZURE_OPENAI_DEPLOYMENT_NAME: str = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "")
 
     # Google Custom Search API
-    GOOGLE_API_KEY: str = Field(..., env="GOOGLE_API_KEY")
-    GOOGLE_CSE_ID: str = Field(..., env="GOOGLE_CSE_ID")
+    GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
+    GOOGLE_CSE_ID: str = os.getenv("GOOGLE_CSE_ID", "")
+    SERPAPI_URL: str = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+
+    # 搜索结果缓存配置
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", 1024)) # 最大缓存条目数
+    SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", 300)) # 新鲜期，期内直接返回
+    SEARCH_CACHE_STALE_SECONDS: float = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", 3600)) # 新鲜期后仍可返回旧结果并后台刷新的时长
+    SEARCH_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL_SECONDS", 60)) # 空结果的缓存时长
 
     # JinaAI Content Extraction API
-    JINAAI_API_KEY: str = Field(..., env="JINAAI_API_KEY")
+    JINAAI_API_KEY: str = os.getenv("JINAAI_API_KEY", "")
+    JINAAI_BASE_URL: str = os.getenv("JINAAI_BASE_URL", "https://r.jina.ai/") # JinaAI Reader API
+
+    # 上游HTTP客户端连接池配置（SerpAPI、JinaAI、Azure OpenAI 共享，进程内复用）
+    UPSTREAM_MAX_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100)) # 每个连接池的最大连接数
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", 20)) # 保持的空闲长连接数
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY_SECONDS", 30)) # 空闲长连接的保持时间
+    UPSTREAM_TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", 30)) # SerpAPI/JinaAI 请求超时
+    UPSTREAM_HTTP2: bool = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true" # 启用HTTP/2，需要安装 h2
+    UPSTREAM_WARMUP: bool = os.getenv("UPSTREAM_WARMUP", "false").lower() == "true" # 启动时预热上游连接
+
+    # 网页内容并发提取配置
+    EXTRACT_MAX_CONCURRENCY: int = int(os.getenv("EXTRACT_MAX_CONCURRENCY", 10)) # 全局并发上限
+    EXTRACT_PER_HOST_CONCURRENCY: int = int(os.getenv("EXTRACT_PER_HOST_CONCURRENCY", 3)) # 同一站点的并发上限
+    EXTRACT_TIMEOUT_SECONDS: float = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", 20)) # 单个链接（含重试）的总超时
+    EXTRACT_MAX_RETRIES: int = int(os.getenv("EXTRACT_MAX_RETRIES", 3)) # 单个链接的最大尝试次数
+    EXTRACT_RETRY_DELAY_SECONDS: float = float(os.getenv("EXTRACT_RETRY_DELAY_SECONDS", 2)) # 重试间隔
+
+    # 网页内容缓存配置
+    CONTENT_CACHE_PATH: str = os.getenv("CONTENT_CACHE_PATH", "./content_cache.db") # 磁盘层SQLite文件，留空则只使用内存层
+    CONTENT_CACHE_TTL_SECONDS: float = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", 86400)) # 缓存有效期
+    CONTENT_CACHE_MEMORY_BYTES: int = int(os.getenv("CONTENT_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)) # 内存层字节上限
+    CONTENT_CACHE_DISK_BYTES: int = int(os.getenv("CONTENT_CACHE_DISK_BYTES", 1024 * 1024 * 1024)) # 磁盘层字节上限
+
+    # 近重复内容去除配置（SimHash 相似度不低于阈值的文档或段落只保留第一份）
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true" # 是否启用近重复内容去除
+    DEDUP_SIMILARITY_THRESHOLD: float = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", 0.9)) # 相似度阈值（0~1），0.9 对应 64 位指纹中最多 6 位不同
+
+    # 相关段落筛选配置（提取后、总结前按 BM25 得分保留与问题相关的段落）
+    RELEVANCE_FILTER_ENABLED: bool = os.getenv("RELEVANCE_FILTER_ENABLED", "true").lower() == "true" # 是否启用相关段落筛选
+    # 筛选后保留段落的 token 上限。应大于 SUMMARY_CONTEXT_BUDGET_TOKENS：筛选后仍超出单次调用预算的内容走分块摘要（map-reduce），
+    # 不大于时筛选结果总能放进一次调用，分块摘要不会触发
+    RELEVANCE_BUDGET_TOKENS: int = int(os.getenv("RELEVANCE_BUDGET_TOKENS", 24000))
+    RELEVANCE_PASSAGE_TOKENS: int = int(os.getenv("RELEVANCE_PASSAGE_TOKENS", 200)) # 切分段落的 token 上限
+
+    # 总结阶段的 token 预算配置（内容超出预算时分块摘要后再合并）
+    SUMMARY_CONTEXT_BUDGET_TOKENS: int = int(os.getenv("SUMMARY_CONTEXT_BUDGET_TOKENS", 12000)) # 单次调用中参考内容的 token 上限
+    SUMMARY_CHUNK_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000)) # 分块摘要时每块的 token 上限
+    SUMMARY_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", 200)) # 相邻块之间的重叠 token 数
+    SUMMARY_MAP_CONCURRENCY: int = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4)) # 分块摘要的最大并发调用数
+    SUMMARY_MAX_CHUNKS: int = int(os.getenv("SUMMARY_MAX_CHUNKS", 32)) # 单个请求最多摘要的块数，超出部分丢弃
+    SUMMARY_MAP_MAX_TOKENS: int = int(os.getenv("SUMMARY_MAP_MAX_TOKENS", 400)) # 每块摘要的最大输出 token 数
+
+    def require(self, *names: str):
+        """
+        检查指定的配置是否都已设置，缺失时抛出 RuntimeError。
+        """
+        missing = [name for name in names if not getattr(self, name)]
+        if missing:
+            raise RuntimeError(f"Missing required settings: {', '.join(missing)}")
 
 settings = Settings()
@@ -1,18 +1,163 @@
+import hashlib
+import time
+
+from sqlalchemy import Column, MetaData, String, Table, delete, event, insert, inspect, select
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql import Select
 from app.core.config import settings
 
 # 数据库连接URL，从配置中获取
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+REPLICA_DATABASE_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
-# 创建异步数据库引擎
-# connect_args={"check_same_thread": False} 仅适用于 SQLite，对于 PostgreSQL 等其他数据库应移除
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_size=settings.POOL_SIZE,  # 连接池大小
-    max_overflow=20,  # 超过连接池大小后允许的最大溢出连接数
-    echo=False # 设置为True可以打印SQL语句，方便调试
-)
+def create_engine_for(url: str) -> AsyncEngine:
+    """
+    按统一的连接池配置创建异步数据库引擎。
+    """
+    # SQLite (aiosqlite) 默认使用 NullPool，不接受 pool_size 等参数，这里显式指定队列连接池
+    engine_kwargs = {}
+    if url.startswith("sqlite"):
+        engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+    return create_async_engine(
+        url,
+        pool_size=settings.POOL_SIZE,  # 连接池大小
+        max_overflow=settings.MAX_OVERFLOW,  # 超过连接池大小后允许的最大溢出连接数
+        echo=False, # 设置为True可以打印SQL语句，方便调试
+        **engine_kwargs
+    )
+
+class ReplicaSet:
+    """
+    只读副本集合：按轮询顺序选择副本，连接失败的副本在 unhealthy_seconds 秒内不再被选中，
+    之后自动重新参与选择。没有可用副本时由调用方回退到主库。
+    """
+    def __init__(self, engines: list[AsyncEngine], unhealthy_seconds: float):
+        self.engines = engines
+        self.unhealthy_seconds = unhealthy_seconds
+        self._next = 0
+        self._unhealthy_until: dict[AsyncEngine, float] = {}
+        self.selected = {engine: 0 for engine in engines}
+        self.failures = {engine: 0 for engine in engines}
+        for engine in engines:
+            event.listen(engine.sync_engine, "handle_error", self._make_error_listener(engine))
+
+    def _make_error_listener(self, engine: AsyncEngine):
+        def on_error(context):
+            # 只有连接层面的错误（无法连接、连接断开）才说明副本不可用，SQL错误不影响副本状态
+            if context.is_disconnect or context.connection is None:
+                self.mark_unhealthy(engine)
+        return on_error
+
+    def is_healthy(self, engine: AsyncEngine) -> bool:
+        return self._unhealthy_until.get(engine, 0.0) <= time.monotonic()
+
+    def mark_unhealthy(self, engine: AsyncEngine):
+        self.failures[engine] += 1
+        self._unhealthy_until[engine] = time.monotonic() + self.unhealthy_seconds
+
+    def choose(self) -> AsyncEngine | None:
+        """
+        按轮询顺序返回下一个健康的副本，全部不可用时返回 None。
+        """
+        for _ in range(len(self.engines)):
+            engine = self.engines[self._next % len(self.engines)]
+            self._next += 1
+            if self.is_healthy(engine):
+                self.selected[engine] += 1
+                return engine
+        return None
+
+    def stats(self) -> list[dict]:
+        """
+        返回每个副本的地址（隐藏密码）、健康状态、被选中次数和连接失败次数。
+        """
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self.is_healthy(engine),
+                "selected": self.selected[engine],
+                "failures": self.failures[engine],
+            }
+            for engine in self.engines
+        ]
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+class RoutingSession(Session):
+    """
+    读写分离的会话：普通 SELECT 路由到只读副本，写操作（flush、INSERT/UPDATE/DELETE、SELECT ... FOR UPDATE）
+    路由到主库。会话一旦写入过数据就固定使用主库（read-your-writes），保证同一请求内能读到自己的写入；
+    也可以通过 use_primary() 要求之后的读操作都走主库，或通过 primary_bind() 只让单条语句读主库。同一会话内的读操作固定使用同一个副本；
+    无法连接所选副本时自动改用其他健康的副本或主库重试一次，读操作不会因副本故障而失败。
+    """
+    def __init__(self, *args, replicas: ReplicaSet | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.pinned_to_primary = False
+        self._replica: AsyncEngine | None = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if kwargs.get("bind") is not None: # 语句通过 bind_arguments 显式指定了数据库（见 primary_bind()）
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or (clause is not None and getattr(clause, "is_dml", False)):
+            self.pinned_to_primary = True
+        elif (
+            self.replicas is not None
+            and not self.pinned_to_primary
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            if self._replica is None or not self.replicas.is_healthy(self._replica):
+                self._replica = self.replicas.choose()
+            if self._replica is not None:
+                return self._replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except DBAPIError:
+            if self._replica is None or engine is not self._replica.sync_engine:
+                raise
+            # 无法连接副本时该副本已被标记为不可用（见 ReplicaSet），改用下一个健康的副本或主库重试一次，调用方无感知
+            self._replica = self.replicas.choose()
+            fallback = self._replica.sync_engine if self._replica is not None else super().get_bind()
+            return super()._connection_for_bind(fallback, execution_options, **kw)
+
+def use_primary(session: AsyncSession):
+    """
+    使会话之后的所有读操作都走主库，用于必须读到最新数据的场景。
+    """
+    session.sync_session.pinned_to_primary = True
+
+def primary_bind(session: AsyncSession) -> dict:
+    """
+    返回让单条语句在主库执行的 bind_arguments，会话中其他读操作仍按原规则路由。
+    """
+    return {"bind": session.sync_session.bind}
+
+def supports_returning(session: AsyncSession, statement: str) -> bool:
+    """
+    判断会话所用数据库是否支持 INSERT/UPDATE/DELETE ... RETURNING（statement 为 insert、update 或 delete）。
+    """
+    return getattr(session.get_bind().dialect, f"{statement}_returning", False)
+
+# 创建异步数据库引擎（主库）
+engine = create_engine_for(SQLALCHEMY_DATABASE_URL)
+
+# 只读副本，未配置时所有操作都走主库
+replica_set = ReplicaSet(
+    [create_engine_for(url) for url in REPLICA_DATABASE_URLS],
+    unhealthy_seconds=settings.DATABASE_REPLICA_UNHEALTHY_SECONDS
+) if REPLICA_DATABASE_URLS else None
 
 # 创建异步会话本地工厂
 # expire_on_commit=False 允许在提交后访问会话中的对象
@@ -21,12 +166,116 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    replicas=replica_set,
     expire_on_commit=False
 )
 
+def pool_stats() -> dict[str, dict]:
+    """
+    返回主库和各只读副本连接池的容量、已借出连接数和溢出连接数，键为数据库地址（隐藏密码），主库为 primary。
+    """
+    engines = {"primary": engine}
+    if replica_set is not None:
+        engines.update((replica.url.render_as_string(hide_password=True), replica) for replica in replica_set.engines)
+    stats = {}
+    for name, item in engines.items():
+        pool = item.pool
+        # 只有队列连接池提供这些统计，NullPool 等没有连接复用的连接池跳过
+        if isinstance(pool, QueuePool):
+            stats[name] = {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+    return stats
+
 # 声明性基类，用于定义ORM模型
 Base = declarative_base()
 
+# 记录当前表结构版本的单行表，不属于 Base.metadata，不参与结构指纹的计算
+schema_version_table = Table("schema_version", MetaData(), Column("version", String(64), primary_key=True))
+
+SCHEMA_MODES = ("create", "check", "skip")
+
+class SchemaVersionError(RuntimeError):
+    """
+    数据库中没有记录表结构版本，或记录的版本与当前模型不一致时抛出。
+    """
+
+def schema_fingerprint(bind: AsyncEngine = engine) -> str:
+    """
+    按数据库方言生成所有模型的建表和建索引语句，返回其 SHA-256 摘要，模型的表结构变化时摘要随之变化。
+    """
+    import app.models # noqa: F401 确保所有模型都已注册到 Base.metadata
+
+    digest = hashlib.sha256()
+    for table in sorted(Base.metadata.tables.values(), key=lambda table: table.name):
+        digest.update(str(CreateTable(table).compile(dialect=bind.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=bind.dialect)).encode())
+    return digest.hexdigest()
+
+async def _write_schema_version(conn, version: str):
+    await conn.run_sync(schema_version_table.create, checkfirst=True)
+    await conn.execute(delete(schema_version_table))
+    await conn.execute(insert(schema_version_table).values(version=version))
+
+async def create_schema(bind: AsyncEngine = engine):
+    """
+    创建缺失的表和索引。只有所有模型的表都是这次新建的，才记录当前的表结构版本：
+    create_all 不会修改已有的表，无法保证已有的表与模型一致，这种情况下保留原有的版本记录（或不记录）。
+    """
+    version = schema_fingerprint(bind)
+    async with bind.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: [name for name in Base.metadata.tables if inspect(sync_conn).has_table(name)]
+        )
+        # 使用 run_sync 来在异步 contexts 中执行同步的 create_all 操作
+        await conn.run_sync(Base.metadata.create_all)
+        if not existing:
+            await _write_schema_version(conn, version)
+
+async def record_schema_version(bind: AsyncEngine = engine):
+    """
+    将当前模型的表结构版本记录到数据库，应在迁移完成、表结构已与模型一致后调用。
+    """
+    version = schema_fingerprint(bind)
+    async with bind.begin() as conn:
+        await _write_schema_version(conn, version)
+
+async def check_schema(bind: AsyncEngine = engine):
+    """
+    只用一次查询核对数据库记录的表结构版本与当前模型是否一致，不执行任何DDL，不一致时抛出 SchemaVersionError。
+    """
+    expected = schema_fingerprint(bind)
+    try:
+        async with bind.connect() as conn:
+            recorded = (await conn.execute(select(schema_version_table.c.version))).scalar_one_or_none()
+    except DBAPIError:
+        # 版本表不存在，说明数据库不是以 create 模式新建的，也没有在迁移后记录版本
+        recorded = None
+    if recorded is None:
+        raise SchemaVersionError(
+            "Database schema version is not recorded, migrate the database to the current models "
+            "and record the version with record_schema_version()"
+        )
+    if recorded != expected:
+        raise SchemaVersionError(
+            f"Database schema version {recorded[:12]} does not match the models ({expected[:12]}), "
+            "migrate the database and record the new version with record_schema_version()"
+        )
+
+async def init_schema(mode: str, bind: AsyncEngine = engine):
+    """
+    应用启动时按 DATABASE_SCHEMA_MODE 处理表结构：
+    - **create**: 创建缺失的表（每次启动都会检查各表是否存在），在空数据库上建表时记录结构版本。
+    - **check**: 不执行DDL，只核对结构版本，适用于表结构已建好的重启场景。
+    - **skip**: 不做任何处理，例如由外部迁移工具管理表结构。
+    """
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"Unsupported DATABASE_SCHEMA_MODE: {mode}")
+    if mode == "create":
+        await create_schema(bind)
+    elif mode == "check":
+        await check_schema(bind)
+
 # 异步获取数据库会话的依赖注入函数
 async def get_db():
     """
@@ -1,7 +1,9 @@
 from injector import Module, provider, singleton
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal
+from app.core.clients import UpstreamClients, upstream_clients
+from app.core.scopes import request
 from app.crud.user import UserCRUD
 from app.crud.log import LogCRUD
 from app.services.user import UserService
@@ -12,20 +14,18 @@ class ApplicationModule(Module):
     """
     FastAPI 应用程序的依赖注入模块。
     定义了如何提供 CRUD 和 Service 类的实例。
+    数据库会话及依赖它的 CRUD/Service 均为请求作用域，每个请求各自持有一个会话。
     """
-    @singleton
+    @request
     @provider
     def provide_db_session(self) -> AsyncSession:
         """
-        提供数据库会话。
+        提供当前请求的数据库会话。
+        会话在首次执行SQL时才从连接池获取连接，请求结束时由 request_scope() 关闭并归还连接。
         """
-        # 这里我们直接返回 get_db 的结果，FastAPIInjector 会处理其作为依赖注入函数。
-        # 实际的会话管理（yield）会在 FastAPI 的 Depends 机制中处理。
-        # 在这里，我们只是声明如何获取一个 AsyncSession 实例。
-        # 注意：FastAPIInjector 会在请求生命周期内管理这个会话。
-        return get_db()
+        return AsyncSessionLocal()
     
-    @singleton
+    @request
     @provider
     def provide_user_crud(self, db: AsyncSession) -> UserCRUD:
         """
@@ -33,6 +33,7 @@ class ApplicationModule(Module):
         """
         return UserCRUD(db)
 
+    @request
     @provider
     def provide_user_service(self, user_crud: UserCRUD) -> UserService:
         """
@@ -40,7 +41,7 @@ class ApplicationModule(Module):
         """
         return UserService(user_crud)
 
-    @singleton
+    @request
     @provider
     def provide_log_crud(self, db: AsyncSession) -> LogCRUD:
         """
@@ -48,16 +49,24 @@ class ApplicationModule(Module):
         """
         return LogCRUD(db)
 
+    @singleton
+    @provider
+    def provide_upstream_clients(self) -> UpstreamClients:
+        """
+        提供进程内共享的上游客户端，其生命周期由应用的启动和关闭事件管理。
+        """
+        return upstream_clients
+
     @provider
-    def provide_llm_service(self) -> LLMService: # LLMService 不再依赖 db
+    def provide_llm_service(self, clients: UpstreamClients) -> LLMService: # LLMService 不再依赖 db
         """
-        提供 LLMService 实例。
+        提供 LLMService 实例，复用共享的 Azure OpenAI 客户端。
         """
-        return LLMService()
+        return LLMService(clients.openai)
 
     @provider
-    def provide_web_summarizer_service(self) -> WebSummarizerService:
+    def provide_web_summarizer_service(self, clients: UpstreamClients) -> WebSummarizerService:
         """
-        提供 WebSummarizerService 实例。
+        提供 WebSummarizerService 实例，复用共享的 httpx 和 Azure OpenAI 客户端。
         """
-        return WebSummarizerService()
+        return WebSummarizerService(clients.http, clients.openai)
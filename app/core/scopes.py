@@ -0,0 +1,61 @@
+import inspect
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Type, TypeVar
+
+from injector import InstanceProvider, Provider, Scope, ScopeDecorator
+
+T = TypeVar("T")
+
+class RequestScopeError(RuntimeError):
+    """
+    在请求上下文之外获取请求作用域对象时抛出。
+    """
+
+class _RequestContext:
+    """
+    单个请求内已创建的实例缓存。
+    """
+    def __init__(self):
+        self.providers: dict[Any, Provider] = {}
+        self.instances: list[Any] = []
+
+_current_request: ContextVar[_RequestContext | None] = ContextVar("current_request", default=None)
+
+class RequestScope(Scope):
+    """
+    请求作用域：同一请求内每个类型只构造一次实例，请求结束时统一释放。
+    实例缓存保存在 ContextVar 中，由 request_scope() 在每个请求开始时创建，
+    因此并发请求之间互不干扰，同步依赖在线程池中解析时也能共享同一缓存。
+    """
+    def get(self, key: Type[T], provider: Provider[T]) -> Provider[T]:
+        context = _current_request.get()
+        if context is None:
+            raise RequestScopeError(f"{key!r} 是请求作用域对象，只能在 request_scope() 内获取")
+        try:
+            return context.providers[key]
+        except KeyError:
+            instance = provider.get(self.injector)
+            context.instances.append(instance)
+            instance_provider = InstanceProvider(instance)
+            context.providers[key] = instance_provider
+            return instance_provider
+
+request = ScopeDecorator(RequestScope)
+
+@asynccontextmanager
+async def request_scope():
+    """
+    开启一个请求作用域，退出时按创建的逆序关闭实现了异步 close() 的实例（如 AsyncSession），
+    将数据库连接归还连接池。
+    """
+    context = _RequestContext()
+    token = _current_request.set(context)
+    try:
+        yield context
+    finally:
+        _current_request.reset(token)
+        for instance in reversed(context.instances):
+            close = getattr(instance, "close", None)
+            if close is not None and inspect.iscoroutinefunction(close):
+                await close()
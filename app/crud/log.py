@@ -1,7 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from app.core.database import supports_returning
 from app.models.log import Log
 from app.schemas.log import LogCreate
 
+_MAX_ROWS_PER_INSERT = 500 # 单条多行INSERT的最大行数，避免超出数据库的绑定参数上限
+
 class LogCRUD:
     """
     日志数据访问层 (CRUD)
@@ -13,9 +17,29 @@ class LogCRUD:
     async def create_log(self, log: LogCreate) -> Log:
         """
         创建新的日志条目。
+        支持 RETURNING 的数据库用单条 INSERT ... RETURNING 取回包含数据库生成时间戳的完整行。
         """
-        db_log = Log(**log.dict())
+        if supports_returning(self.db, "insert"):
+            db_log = await self.db.scalar(insert(Log).values(**log.model_dump()).returning(Log))
+            await self.db.commit()
+            return db_log
+        db_log = Log(**log.model_dump())
         self.db.add(db_log)
         await self.db.commit()
-        await self.db.refresh(db_log)
+        # 时间戳由数据库生成，不支持 RETURNING 时只能再查询该列
+        await self.db.refresh(db_log, ["timestamp"])
         return db_log
+
+    async def create_logs(self, logs: list[LogCreate]) -> int:
+        """
+        批量创建日志条目，使用多行 INSERT ... VALUES (...), (...) 语句写入，每条语句最多 _MAX_ROWS_PER_INSERT 行。
+        （向 execute 传入参数列表会退化为 DBAPI 的 executemany，在多数驱动上仍是逐行执行。）
+        返回写入的条数。
+        """
+        if not logs:
+            return 0
+        rows = [log.model_dump() for log in logs]
+        for start in range(0, len(rows), _MAX_ROWS_PER_INSERT):
+            await self.db.execute(insert(Log).values(rows[start:start + _MAX_ROWS_PER_INSERT]))
+        await self.db.commit()
+        return len(logs)
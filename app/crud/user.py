@@ -1,8 +1,12 @@
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Row, delete, insert, select, update
+from app.core.database import primary_bind, supports_returning
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.common.hashing import get_password_hash
+from app.core.common.hashing import get_password_hash_async
+from app.core.common.cache import principal_cache
 
 class UserCRUD:
     """
@@ -19,58 +23,163 @@ class UserCRUD:
         result = await self.db.execute(select(User).filter(User.id == user_id))
         return result.scalars().first()
 
-    async def get_user_by_email(self, email: str) -> User | None:
+    async def get_user_by_email(self, email: str, from_primary: bool = False) -> User | None:
         """
-        根据邮箱获取单个用户。
+        根据邮箱获取单个用户。from_primary 为 True 时这次查询读主库，不受只读副本同步延迟影响。
         """
-        result = await self.db.execute(select(User).filter(User.email == email))
+        result = await self.db.execute(
+            select(User).filter(User.email == email),
+            bind_arguments=primary_bind(self.db) if from_primary else None
+        )
         return result.scalars().first()
 
     async def get_users(self, skip: int = 0, limit: int = 100) -> list[User]:
         """
-        获取用户列表。
+        获取用户列表（OFFSET 分页，页数越深越慢，仅为兼容保留）。
         """
-        result = await self.db.execute(select(User).offset(skip).limit(limit))
+        result = await self.db.execute(select(User).order_by(User.id).offset(skip).limit(limit))
         return list(result.scalars().all())
 
+    async def get_users_after(self, after_id: int | None, limit: int) -> list[User]:
+        """
+        按ID顺序获取ID大于 after_id 的用户（键集分页），每页耗时与页的深度无关。
+        """
+        query = select(User).order_by(User.id).limit(limit)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def stream_users(self, chunk_size: int) -> AsyncIterator[list[Row]]:
+        """
+        通过服务端游标按ID顺序分批读取所有用户，每批最多 chunk_size 行。
+        只查询需要的列而不加载 ORM 对象，行不会累积在会话的标识映射中，内存占用与总行数无关。
+        """
+        result = await self.db.stream(
+            select(User.id, User.email, User.is_active)
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
     async def create_user(self, user: UserCreate) -> User:
         """
         创建新用户。
+        支持 RETURNING 的数据库用单条 INSERT ... RETURNING 取回完整的行，否则由 INSERT 取得主键；
+        两种方式都不需要提交后再查询一次。
         """
-        hashed_password = get_password_hash(user.password)
-        db_user = User(email=user.email, hashed_password=hashed_password)
-        self.db.add(db_user)
+        hashed_password = await get_password_hash_async(user.password)
+        values = {"email": user.email, "hashed_password": hashed_password, "is_active": True}
+        if supports_returning(self.db, "insert"):
+            db_user = await self.db.scalar(insert(User).values(**values).returning(User))
+        else:
+            db_user = User(**values)
+            self.db.add(db_user)
         await self.db.commit()
-        await self.db.refresh(db_user)
         return db_user
 
+    async def get_existing_emails(self, emails: list[str]) -> set[str]:
+        """
+        用一次 IN 查询返回给定邮箱中已被注册的邮箱。
+        """
+        if not emails:
+            return set()
+        result = await self.db.execute(select(User.email).filter(User.email.in_(emails)))
+        return set(result.scalars().all())
+
+    async def create_users(self, users: list[tuple[str, str]]) -> list[Row]:
+        """
+        批量创建用户，users 为 (邮箱, 密码哈希) 列表。
+        支持 RETURNING 的数据库以多行 INSERT ... RETURNING 分批插入，否则插入后再按邮箱查询一次；
+        在最后统一提交，按输入顺序返回 (id, email, is_active)。
+        任意邮箱冲突时抛出 IntegrityError，由调用方回滚后处理。
+        """
+        values = [{"email": email, "hashed_password": hashed_password, "is_active": True} for email, hashed_password in users]
+        if supports_returning(self.db, "insert"):
+            result = await self.db.execute(
+                insert(User).returning(User.id, User.email, User.is_active, sort_by_parameter_order=True),
+                values
+            )
+            rows = list(result.all())
+        else:
+            await self.db.execute(insert(User), values)
+            result = await self.db.execute(
+                select(User.id, User.email, User.is_active).filter(User.email.in_([email for email, _ in users]))
+            )
+            by_email = {row.email: row for row in result.all()}
+            rows = [by_email[email] for email, _ in users]
+        await self.db.commit()
+        return rows
+
+    async def rollback(self):
+        """
+        回滚当前事务。
+        """
+        await self.db.rollback()
+
     async def update_user(self, user_id: int, user_update: UserUpdate) -> User | None:
         """
         更新现有用户。
+        支持 RETURNING 的数据库用单条 UPDATE ... RETURNING 完成更新并取回新值；修改邮箱时需要先查出旧邮箱，
+        用于失效已认证用户缓存。
         """
+        update_data = user_update.model_dump(exclude_unset=True)
+        if "password" in update_data:
+            update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
+        if not update_data:
+            return await self.get_user(user_id)
+        if not supports_returning(self.db, "update"):
+            return await self._update_user_loaded(user_id, update_data)
+
+        old_email = None
+        if "email" in update_data:
+            old_email = await self.db.scalar(select(User.email).filter(User.id == user_id))
+            if old_email is None:
+                return None
+        db_user = await self.db.scalar(
+            update(User)
+            .filter(User.id == user_id)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        if db_user is None:
+            return None
+        await self.db.commit()
+        # 提交后再失效缓存，避免并发请求在提交前重新缓存旧数据
+        if old_email is not None:
+            principal_cache.invalidate(old_email)
+        principal_cache.invalidate(db_user.email)
+        return db_user
+
+    async def _update_user_loaded(self, user_id: int, update_data: dict) -> User | None:
+        # 不支持 RETURNING 时先加载再更新，提交后对象的属性已是新值，无需再刷新
         db_user = await self.get_user(user_id)
         if not db_user:
             return None
-        
-        update_data = user_update.dict(exclude_unset=True)
+        old_email = db_user.email
         for key, value in update_data.items():
-            if key == "password":
-                db_user.hashed_password = get_password_hash(value)
-            else:
-                setattr(db_user, key, value)
-        
-        self.db.add(db_user)
+            setattr(db_user, key, value)
         await self.db.commit()
-        await self.db.refresh(db_user)
+        principal_cache.invalidate(old_email)
+        principal_cache.invalidate(db_user.email)
         return db_user
 
     async def delete_user(self, user_id: int) -> User | None:
         """
         删除用户。
+        支持 RETURNING 的数据库用单条 DELETE ... RETURNING 删除并取回被删除的行。
         """
-        db_user = await self.get_user(user_id)
-        if not db_user:
-            return None
-        await self.db.delete(db_user)
+        if supports_returning(self.db, "delete"):
+            db_user = await self.db.scalar(delete(User).filter(User.id == user_id).returning(User))
+            if db_user is None:
+                return None
+        else:
+            db_user = await self.get_user(user_id)
+            if not db_user:
+                return None
+            await self.db.delete(db_user)
         await self.db.commit()
+        principal_cache.invalidate(db_user.email)
         return db_user
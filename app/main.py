@@ -1,24 +1,32 @@
 from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import timedelta
 from injector import Injector
 from fastapi_injector import attach_injector, Injected # 修改导入
 
 from app.api.endpoints import user as user_endpoints
 from app.api.endpoints import llm as llm_endpoints
+from app.api.endpoints import admin as admin_endpoints
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import init_schema, replica_set, pool_stats
 from app.core.common.security import create_access_token, get_current_user
-from app.core.common.logger import setup_logging
-from app.core.common.middlewares import LogMiddleware
+from app.core.common.logger import setup_logging, db_handler
+from app.core.common.hashing import HashingOverloadedError, hashing_pool
+from app.core.common.content_cache import content_cache
+from app.core.clients import upstream_clients
+from app.core.common.middlewares import LogMiddleware, MetricsMiddleware, RateLimitMiddleware, RequestScopeMiddleware
+from app.core.common.metrics import registry
+from app.core.common.ratelimit import admission_limiters
 from app.schemas.token import Token
 from app.schemas.common.base import BaseResponse
 from app.services.user import UserService
+from app.services.websummary import summarize_flight
 from app.models.user import User
 from app.core.modules import ApplicationModule # 导入ApplicationModule
 
-# 设置日志
+# 设置日志（只在应用入口配置一次）
 setup_logging()
 
 # 初始化FastAPI应用
@@ -36,9 +44,52 @@ attach_injector(app=app, injector=Injector([ApplicationModule()])) # 修改初
 
 @app.on_event("startup")
 async def init_db():
-    async with engine.begin() as conn:
-        # 使用 run_sync 来在异步 contexts 中执行同步的 create_all 操作
-        await conn.run_sync(Base.metadata.create_all)
+    # 默认建表；DATABASE_SCHEMA_MODE=check 时只核对结构版本，跳过DDL以加快重启
+    await init_schema(settings.DATABASE_SCHEMA_MODE)
+
+@app.on_event("startup")
+async def start_log_sink():
+    # 启动数据库日志的后台批量写入任务
+    db_handler.start()
+
+@app.on_event("startup")
+async def start_upstream_clients():
+    # 创建进程内共享的上游客户端，并按配置预热连接
+    await upstream_clients.start()
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    await upstream_clients.close()
+
+@app.on_event("shutdown")
+async def stop_log_sink():
+    # 关闭时将队列中剩余的日志全部写入数据库
+    await db_handler.stop()
+
+@app.on_event("shutdown")
+async def stop_hashing_pool():
+    hashing_pool.shutdown()
+
+@app.on_event("shutdown")
+async def close_content_cache():
+    await content_cache.close()
+
+@app.on_event("shutdown")
+async def dispose_replicas():
+    if replica_set is not None:
+        await replica_set.dispose()
+
+@app.exception_handler(HashingOverloadedError)
+async def hashing_overloaded_handler(request, exc):
+    # 密码哈希排队已满时快速失败，而不是让请求无限堆积
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+# 添加限流和准入控制中间件，放在CORS之内使429/503响应同样带有CORS头
+app.add_middleware(RateLimitMiddleware)
 
 # 添加CORS中间件
 app.add_middleware(
@@ -47,11 +98,62 @@ app.add_middleware(
     allow_credentials=True, # 允许发送凭据（如cookies, HTTP认证）
     allow_methods=["*"],  # 允许所有HTTP方法
     allow_headers=["*"],  # 允许所有HTTP头
+    expose_headers=["X-Next-Cursor", "X-Profile-Id", "Retry-After"], # 允许浏览器读取分页游标、性能分析结果ID和限流后的重试时间
 )
 
+# 添加请求作用域中间件，每个请求使用独立的数据库会话
+app.add_middleware(RequestScopeMiddleware)
+
 # 添加自定义日志中间件
 app.add_middleware(LogMiddleware)
 
+# 添加指标中间件，放在最外层以统计完整的请求耗时
+app.add_middleware(MetricsMiddleware)
+
+# 连接池指标在抓取时读取，不在请求路径上产生开销
+for _field, _documentation in (
+    ("size", "Configured size of the database connection pool."),
+    ("checked_out", "Database connections currently checked out of the pool."),
+    ("overflow", "Database connections currently open beyond the pool size."),
+):
+    registry.callback_gauge(
+        f"db_pool_{_field}", _documentation, ("database",),
+        lambda field=_field: {(name,): stats[field] for name, stats in pool_stats().items()}
+    )
+
+registry.callback_gauge(
+    "upstream_pool_connections", "Connections held by the shared upstream HTTP clients.", ("client", "state"),
+    lambda: {
+        (client, state): value
+        for client, stats in upstream_clients.stats().items()
+        for state, value in stats.items()
+    }
+)
+
+registry.callback_gauge(
+    "admission_requests", "Requests being processed or waiting in the queue of rate-limited endpoints.", ("path", "state"),
+    lambda: {
+        (path, state): limiter.stats()[state]
+        for path, limiter in admission_limiters.items()
+        for state in ("in_flight", "queued")
+    }
+)
+
+registry.callback_gauge(
+    "hashing_pool_tasks", "Password hashing jobs running or waiting in the hashing pool.", ("state",),
+    lambda: {(state,): hashing_pool.stats()[state] for state in ("in_flight", "queued")}
+)
+
+registry.callback_gauge(
+    "summarize_singleflight_calls", "Distinct summarize pipelines running and the requests waiting on them.", ("state",),
+    lambda: {(state,): summarize_flight.stats()[state] for state in ("in_flight", "waiters")}
+)
+
+registry.callback_counter(
+    "summarize_singleflight_total", "Summarize requests that started a pipeline or were coalesced onto a running one.", ("outcome",),
+    lambda: {(outcome,): summarize_flight.stats()[outcome] for outcome in ("executions", "coalesced")}
+)
+
 # 公共路由 (无需认证)
 @app.post(
     "/token",
@@ -92,6 +194,13 @@ async def root():
     """
     return {"message": "Welcome to FastAPI Project!"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    以 Prometheus 文本格式导出指标。
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # 认证路由 (需要Token验证)
 # 所有包含在此路由中的接口都需要通过get_current_user进行认证
 api_router = APIRouter(dependencies=[Depends(get_current_user)])
@@ -103,3 +212,6 @@ app.include_router(api_router)
 
 # 将公共路由包含到主应用中 (无需认证)
 app.include_router(llm_endpoints.public_router, prefix="/llm", tags=["llm-public"])
+
+# 管理路由 (需要 X-Admin-Token 请求头)
+app.include_router(admin_endpoints.router, prefix="/admin", tags=["admin"])
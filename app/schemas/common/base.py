@@ -1,13 +1,84 @@
-from typing import Generic, TypeVar, Optional
-from pydantic import BaseModel, Field
-from pydantic.generics import GenericModel
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Generic, Iterable, Mapping, Optional, TypeVar
+
+import orjson
+from pydantic import BaseModel, Field, TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
 
 T = TypeVar("T")
 
-class BaseResponse(GenericModel, Generic[T]):
+class BaseResponse(BaseModel, Generic[T]):
     code: int = Field(200, description="状态码")
     message: str = Field("Success", description="消息")
     data: Optional[T] = Field(None, description="数据")
 
-    class Config:
-        arbitrary_types_allowed = True
+@lru_cache(maxsize=None)
+def response_adapter(data_type: Any) -> TypeAdapter:
+    """
+    返回 BaseResponse[data_type] 的 TypeAdapter。构建校验器和序列化器的开销较大，每种数据类型只构建一次。
+    """
+    return TypeAdapter(BaseResponse[data_type])
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def render_envelope(
+    data: Any,
+    data_type: Any = Any,
+    *,
+    trusted: bool = False,
+    code: int = 200,
+    message: str = "Success"
+) -> bytes:
+    """
+    将数据包装为 BaseResponse 并直接序列化为 JSON 字节串。
+    - **data**: 响应数据，可以是 ORM 对象、Pydantic 模型或普通的字典、列表。
+    - **data_type**: 数据的类型（如 list[UserResponse]），用于校验和按模型字段输出。
+    - **trusted**: 数据已由服务端生成且符合 data_type（如 attributes_of() 的结果）时为 True，
+      跳过校验直接用 orjson 序列化；否则按 data_type 校验（支持从 ORM 对象读取属性）后由 pydantic-core 序列化。
+    """
+    if trusted:
+        return orjson.dumps({"code": code, "message": message, "data": data}, default=_default)
+    adapter = response_adapter(data_type)
+    envelope = adapter.validate_python({"code": code, "message": message, "data": data}, from_attributes=True)
+    return adapter.dump_json(envelope)
+
+def attributes_of(items: Iterable[Any], model: type[BaseModel]) -> list[dict]:
+    """
+    按模型声明的字段从对象（如 ORM 实例）中读取属性，返回字典列表，不做校验。
+    用于服务端自己查询出的数据，配合 render_envelope(..., trusted=True) 使用。
+    """
+    names = tuple(model.model_fields)
+    if len(names) == 1:
+        return [{names[0]: getattr(item, names[0])} for item in items]
+    getter = attrgetter(*names)
+    return [dict(zip(names, getter(item))) for item in items]
+
+class EnvelopeResponse(Response):
+    """
+    已序列化好的 BaseResponse JSON 响应。
+    接口直接返回该响应时 FastAPI 不再按 response_model 校验和序列化，避免同一份数据被处理两次；
+    response_model 仍然保留，用于生成接口文档。
+    """
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        data: Any,
+        data_type: Any = Any,
+        *,
+        trusted: bool = False,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        super().__init__(
+            render_envelope(data, data_type, trusted=trusted),
+            status_code=status_code,
+            headers=headers,
+            background=background
+        )
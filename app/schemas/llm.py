@@ -7,6 +7,7 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
+    stream: bool = False # 为True时以Server-Sent Events逐段返回
 
 class ChatResponse(BaseModel):
     response: str
@@ -14,6 +15,10 @@ class ChatResponse(BaseModel):
 class SummarizeRequest(BaseModel):
     urls: List[str]
     query: str
+    stream: bool = False # 为True时以Server-Sent Events返回各阶段进度和总结内容
 
 class SummarizeResponse(BaseModel):
     summary: str
+
+class ContentCachePurgeResponse(BaseModel):
+    purged: int
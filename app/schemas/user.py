@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Literal, Optional
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -16,5 +16,16 @@ class UserResponse(UserBase):
     id: int
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class UserBulkItemResult(BaseModel):
+    index: int # 在请求列表中的位置
+    email: str # 请求中已校验过的邮箱
+    status: Literal["created", "conflict"]
+    user: Optional[UserResponse] = None
+    detail: Optional[str] = None
+
+class UserBulkCreateResponse(BaseModel):
+    created: int
+    conflicts: int
+    results: list[UserBulkItemResult]
@@ -1,31 +1,50 @@
-import openai
+from typing import TYPE_CHECKING, AsyncIterator
+
 from app.core.config import settings
+from app.core.common.metrics import observe_upstream
 from app.schemas.llm import ChatRequest, ChatMessage
 
+if TYPE_CHECKING:
+    import openai # 只用于类型标注，客户端由 UpstreamClients 在首次使用时创建
+
 class LLMService:
-    def __init__(self):
-        self.client = openai.AzureOpenAI(
-            api_key=settings.AZURE_OPENAI_API_KEY,
-            api_version=settings.AZURE_OPENAI_API_VERSION,
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
-        )
+    def __init__(self, client: "openai.AsyncAzureOpenAI"):
+        self.client = client # 进程内共享的客户端，由 UpstreamClients 管理生命周期
         self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
 
-    async def chat(self, request: ChatRequest) -> str:
+    def _build_completion_kwargs(self, request: ChatRequest) -> dict:
         messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+        return dict(
+            model=self.deployment_name,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=800,
+            top_p=0.95,
+            frequency_penalty=0,
+            presence_penalty=0,
+            stop=None
+        )
+
+    async def chat(self, request: ChatRequest) -> str:
         try:
-            response = await self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=800,
-                top_p=0.95,
-                frequency_penalty=0,
-                presence_penalty=0,
-                stop=None
-            )
+            async with observe_upstream("openai"):
+                response = await self.client.chat.completions.create(**self._build_completion_kwargs(request))
             return response.choices[0].message.content
         except Exception as e:
             # 可以在这里添加更详细的日志记录
             print(f"Error calling Azure OpenAI API: {e}")
             raise
+
+    async def chat_stream(self, request: ChatRequest) -> AsyncIterator[str]:
+        """
+        以流式方式对话，逐段产出模型返回的文本。
+        生成器被关闭（如客户端断开连接）时会立即关闭上游响应。
+        """
+        async with observe_upstream("openai_stream"):
+            stream = await self.client.chat.completions.create(stream=True, **self._build_completion_kwargs(request))
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
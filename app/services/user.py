@@ -1,6 +1,12 @@
+from typing import AsyncIterator
+
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
+
 from app.crud.user import UserCRUD
-from app.schemas.user import UserCreate, UserUpdate
-from app.core.common.hashing import verify_password
+from app.schemas.user import UserBulkCreateResponse, UserBulkItemResult, UserCreate, UserResponse, UserUpdate
+from app.core.common.hashing import get_password_hash, hashing_pool, verify_password_async
+from app.core.common.pagination import decode_cursor, encode_cursor
 from app.models.user import User
 
 class UserService:
@@ -29,12 +35,82 @@ class UserService:
         """
         return await self.user_crud.get_users(skip, limit)
 
+    async def get_users_page(self, cursor: str | None, limit: int) -> tuple[list[User], str | None]:
+        """
+        获取一页用户，返回 (用户列表, 下一页游标)；没有更多数据时游标为 None。
+        """
+        after_id = decode_cursor(cursor) if cursor else None
+        # 多取一条用于判断是否还有下一页
+        users = await self.user_crud.get_users_after(after_id, limit + 1)
+        if len(users) > limit:
+            users = users[:limit]
+            return users, encode_cursor(users[-1].id)
+        return users, None
+
+    def export_users(self, chunk_size: int) -> AsyncIterator[list[Row]]:
+        """
+        分批读取所有用户用于导出。
+        """
+        return self.user_crud.stream_users(chunk_size)
+
     async def create_user(self, user: UserCreate) -> User:
         """
         创建新用户。
         """
         return await self.user_crud.create_user(user)
 
+    async def bulk_create_users(self, users: list[UserCreate]) -> UserBulkCreateResponse:
+        """
+        批量创建用户，逐条返回创建成功或邮箱冲突。
+        已注册的邮箱用一次 IN 查询找出，请求内重复的邮箱只创建第一条；
+        其余用户的密码在哈希池中并行计算，再以批量 INSERT ... RETURNING 一次写入。
+        """
+        results: list[UserBulkItemResult | None] = [None] * len(users)
+        seen: set[str] = set()
+        pending: list[int] = []
+        for index, user in enumerate(users):
+            if user.email in seen:
+                results[index] = UserBulkItemResult(index=index, email=user.email, status="conflict", detail="Duplicate email in request")
+            else:
+                seen.add(user.email)
+                pending.append(index)
+
+        existing = await self.user_crud.get_existing_emails([users[index].email for index in pending])
+        hashes = await hashing_pool.map(
+            get_password_hash,
+            [users[index].password for index in pending if users[index].email not in existing]
+        )
+        hashed = dict(zip((index for index in pending if users[index].email not in existing), hashes))
+
+        while True:
+            for index in pending:
+                if users[index].email in existing:
+                    results[index] = UserBulkItemResult(index=index, email=users[index].email, status="conflict", detail="Email already registered")
+            pending = [index for index in pending if users[index].email not in existing]
+            try:
+                rows = await self.user_crud.create_users([(users[index].email, hashed[index]) for index in pending]) if pending else []
+                break
+            except IntegrityError:
+                # 检查之后有其他请求注册了相同邮箱，回滚后重新检查并只插入剩余的用户
+                await self.user_crud.rollback()
+                existing = await self.user_crud.get_existing_emails([users[index].email for index in pending])
+                if not existing:
+                    raise
+
+        for index, row in zip(pending, rows):
+            results[index] = UserBulkItemResult(
+                index=index,
+                email=row.email,
+                status="created",
+                # 数据来自数据库，无需再次校验邮箱格式
+                user=UserResponse.model_construct(id=row.id, email=row.email, is_active=row.is_active)
+            )
+        return UserBulkCreateResponse(
+            created=len(rows),
+            conflicts=len(users) - len(rows),
+            results=results
+        )
+
     async def update_user(self, user_id: int, user_update: UserUpdate) -> User | None:
         """
         更新现有用户。
@@ -52,6 +128,6 @@ class UserService:
         验证用户凭据。
         """
         user = await self.user_crud.get_user_by_email(email)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await verify_password_async(password, user.hashed_password):
             return None
         return user
@@ -1,41 +1,130 @@
 import os
-import httpx
 import asyncio
 import logging
-from typing import List, Tuple
+import time
+from collections import defaultdict
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
-from openai import AzureOpenAI,AsyncAzureOpenAI
 from app.core.config import settings
 from app.core.common.logger import logger
+from app.core.common.content_cache import content_cache
+from app.core.common.cache import search_cache
+from app.core.common.singleflight import SingleFlight
+from app.core.common.tokens import estimate_tokens, split_into_chunks
+from app.core.common.relevance import select_passages
+from app.core.common.dedup import near_duplicate_filter
+from app.core.common.metrics import observe_upstream
+
+if TYPE_CHECKING:
+    # 客户端由 UpstreamClients 在首次使用时创建，这里只用于类型标注，避免导入时加载 httpx 和 openai
+    import httpx
+    from openai import AsyncAzureOpenAI
+
+# 正在进行的搜索结果后台刷新任务，按缓存键去重
+_search_refresh_tasks: Dict[Tuple[Tuple[str, ...], str], asyncio.Task] = {}
+
+# 正在执行的总结流程，按规范化后的 (站点集合, 问题) 合并并发的相同请求
+summarize_flight = SingleFlight()
 
 class WebSummarizerService:
-    def __init__(self):
-        self.http_client = httpx.AsyncClient()
+    def __init__(self, http_client: "httpx.AsyncClient", azure_openai_client: "AsyncAzureOpenAI"):
+        settings.require("GOOGLE_API_KEY", "GOOGLE_CSE_ID", "JINAAI_API_KEY")
+        # 客户端为进程内共享实例，由 UpstreamClients 管理生命周期
+        self.http_client = http_client
         self.google_api_key = settings.GOOGLE_API_KEY
         self.google_cse_id = settings.GOOGLE_CSE_ID
+        self.serpapi_url = settings.SERPAPI_URL
+        self.search_cache = search_cache
+        self.search_cache_fresh_seconds = settings.SEARCH_CACHE_TTL_SECONDS
+        self.search_cache_stale_seconds = settings.SEARCH_CACHE_STALE_SECONDS
+        self.search_cache_negative_seconds = settings.SEARCH_CACHE_NEGATIVE_TTL_SECONDS
         self.jinaai_api_key = settings.JINAAI_API_KEY
+        self.jinaai_base_url = settings.JINAAI_BASE_URL
+        self.extract_max_concurrency = settings.EXTRACT_MAX_CONCURRENCY
+        self.extract_per_host_concurrency = settings.EXTRACT_PER_HOST_CONCURRENCY
+        self.extract_timeout_seconds = settings.EXTRACT_TIMEOUT_SECONDS
+        self.extract_max_retries = settings.EXTRACT_MAX_RETRIES
+        self.extract_retry_delay_seconds = settings.EXTRACT_RETRY_DELAY_SECONDS
+        self.content_cache = content_cache
+        self.dedup_enabled = settings.DEDUP_ENABLED
+        self.near_duplicate_filter = near_duplicate_filter
+        self.relevance_filter_enabled = settings.RELEVANCE_FILTER_ENABLED
+        self.relevance_budget_tokens = settings.RELEVANCE_BUDGET_TOKENS
+        self.relevance_passage_tokens = settings.RELEVANCE_PASSAGE_TOKENS
+        self.summary_context_budget_tokens = settings.SUMMARY_CONTEXT_BUDGET_TOKENS
+        self.summary_chunk_tokens = settings.SUMMARY_CHUNK_TOKENS
+        self.summary_chunk_overlap_tokens = settings.SUMMARY_CHUNK_OVERLAP_TOKENS
+        self.summary_map_concurrency = settings.SUMMARY_MAP_CONCURRENCY
+        self.summary_max_chunks = settings.SUMMARY_MAX_CHUNKS
+        self.summary_map_max_tokens = settings.SUMMARY_MAP_MAX_TOKENS
 
-        self.azure_openai_client = AsyncAzureOpenAI(
-            api_key=settings.AZURE_OPENAI_API_KEY,
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-            api_version=settings.AZURE_OPENAI_API_VERSION
-        )
+        self.azure_openai_client = azure_openai_client
         self.azure_openai_deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
 
+    @staticmethod
+    def normalize_search(urls: List[str], query: str) -> Tuple[Tuple[str, ...], str]:
+        """
+        规范化搜索参数：站点去重并排序，问题转为小写并合并连续空白。
+        规范化结果同时用作搜索结果缓存的键。
+        """
+        sites = tuple(sorted({urlparse(url).netloc.lower() for url in urls if urlparse(url).netloc}))
+        normalized_query = " ".join(query.casefold().split())
+        return sites, normalized_query
+
     async def search_urls_for_query(self, urls: List[str], query: str) -> List[str]:
         """
         在指定的URL列表中，通过Google Custom Search API搜索用户的问题，并返回相关链接。
+        结果按规范化后的 (站点集合, 问题) 缓存：新鲜期内直接返回；过期但仍在陈旧窗口内时
+        先返回旧结果并在后台刷新；空结果使用较短的有效期进行负缓存。
         """
         if not urls:
             return []
 
+        key = self.normalize_search(urls, query)
+        entry = self.search_cache.get(key)
+        if entry is not None:
+            fetched_at, links = entry
+            if links and self.search_cache.timer() - fetched_at > self.search_cache_fresh_seconds:
+                self._refresh_search_in_background(key)
+            logger.info(f"Search cache hit for query: {key[1]}")
+            return list(links)
+
+        links = await self._search(*key)
+        self._store_search_result(key, links)
+        return links
+
+    def _store_search_result(self, key: Tuple[Tuple[str, ...], str], links: List[str]):
+        if links:
+            ttl = self.search_cache_fresh_seconds + self.search_cache_stale_seconds
+        else:
+            ttl = self.search_cache_negative_seconds
+        self.search_cache.set(key, (self.search_cache.timer(), tuple(links)), ttl=ttl)
+
+    def _refresh_search_in_background(self, key: Tuple[Tuple[str, ...], str]):
+        """
+        在后台刷新陈旧的搜索结果，同一个键同时只有一个刷新任务。
+        """
+        if key in _search_refresh_tasks:
+            return
+
+        async def refresh():
+            try:
+                self._store_search_result(key, await self._search(*key))
+            except Exception as e:
+                logger.warning(f"Background search refresh failed, keeping stale result: {e}")
+            finally:
+                _search_refresh_tasks.pop(key, None)
+
+        _search_refresh_tasks[key] = asyncio.create_task(refresh())
+
+    async def _search(self, sites: Tuple[str, ...], query: str) -> List[str]:
         # 构建 site: 参数
-        site_queries = [f"site:{urlparse(url).netloc}" for url in urls]
+        site_queries = [f"site:{site}" for site in sites]
         combined_site_query = " OR ".join(site_queries)
         search_query = f"{query} {combined_site_query}"
 
-        google_search_url = "https://serpapi.com/search"
         params = {
             "api_key": self.google_api_key,
             "engine": "google",
@@ -44,14 +133,17 @@ class WebSummarizerService:
             "filter":1
         }
 
+        import httpx # 此时客户端已创建，httpx 已经导入
+
         try:
             logger.info(f"Calling Google Custom Search API with query: {search_query}")
-            response = await self.http_client.get(google_search_url, params=params)
-            response.raise_for_status()
+            async with observe_upstream("serpapi"):
+                response = await self.http_client.get(self.serpapi_url, params=params)
+                response.raise_for_status()
             data = response.json()
             
             links = []
-            for item in data["organic_results"]:
+            for item in data.get("organic_results", []): # 没有结果时 SerpAPI 不返回 organic_results
                 links.append(item["link"])
             logger.info(f"Found {len(links)} links from Google Search.")
             return links
@@ -67,71 +159,244 @@ class WebSummarizerService:
 
     async def extract_content_from_links(self, links: List[str]) -> List[str]:
         """
-        使用JinaAI内容提取服务从给定的链接中提取主要内容。
-        """
-        extracted_contents = []
-        jinaai_base_url = "https://r.jina.ai/" # JinaAI Reader API
-        MAX_RETRIES = 3
-        RETRY_DELAY_SECONDS = 2 # 重试间隔
-
-        for link in links:
-            for attempt in range(MAX_RETRIES):
-                try:
-                    logger.info(f"Attempt {attempt + 1} to extract content from link: {link} using JinaAI")
-                    jina_url = f"{jinaai_base_url}{link}"
-                    response = await self.http_client.get(jina_url, headers={"Authorization": f"Bearer {self.jinaai_api_key}"})
-                    response.raise_for_status()
-                    extracted_contents.append(response.text)
-                    logger.info(f"Successfully extracted content from {link} on attempt {attempt + 1}")
-                    break # 成功后跳出重试循环
-                except httpx.HTTPStatusError as e:
-                    logger.warning(f"JinaAI content extraction HTTP error for {link} (Attempt {attempt + 1}/{MAX_RETRIES}): {e.response.status_code} - {e.response.text}")
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(RETRY_DELAY_SECONDS) # 等待后重试
-                    else:
-                        logger.error(f"Failed to extract content from {link} after {MAX_RETRIES} attempts due to HTTP error.")
-                except httpx.RequestError as e:
-                    logger.warning(f"JinaAI content extraction request error for {link} (Attempt {attempt + 1}/{MAX_RETRIES}): {e}")
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(RETRY_DELAY_SECONDS) # 等待后重试
-                    else:
-                        logger.error(f"Failed to extract content from {link} after {MAX_RETRIES} attempts due to request error.")
-                except Exception as e:
-                    logger.warning(f"An unexpected error occurred during JinaAI extraction for {link} (Attempt {attempt + 1}/{MAX_RETRIES}): {e}")
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(RETRY_DELAY_SECONDS) # 等待后重试
-                    else:
-                        logger.error(f"Failed to extract content from {link} after {MAX_RETRIES} attempts due to unexpected error.")
-        
+        使用JinaAI内容提取服务从给定的链接中并发提取主要内容。
+        优先读取内容缓存；未命中时并发请求，并发数受全局上限和单站点上限约束，
+        每个链接（含重试）有独立的总超时。返回结果保持与 links 相同的排序，提取失败的链接被跳过。
+        """
+        global_limit = asyncio.Semaphore(self.extract_max_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.extract_per_host_concurrency)
+        )
+
+        async def extract_with_timeout(link: str) -> Optional[str]:
+            cached = await self.content_cache.get(link)
+            if cached is not None:
+                logger.info(f"Content cache hit for link: {link}")
+                return cached
+            try:
+                content = await asyncio.wait_for(
+                    self._extract_content_from_link(link, global_limit, host_limits[urlparse(link).netloc]),
+                    timeout=self.extract_timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out extracting content from {link} after {self.extract_timeout_seconds}s.")
+                return None
+            if content and content.strip():
+                await self.content_cache.set(link, content)
+            return content
+
+        results = await asyncio.gather(*(extract_with_timeout(link) for link in links))
+        extracted_contents = [content for content in results if content is not None]
+
         logger.info(f"Successfully extracted content from {len(extracted_contents)} out of {len(links)} links.")
         return extracted_contents
 
-    async def summarize_combined_content(self, combined_content: str, query: str) -> str:
+    async def _extract_content_from_link(
+        self, link: str, global_limit: asyncio.Semaphore, host_limit: asyncio.Semaphore
+    ) -> Optional[str]:
         """
-        使用Azure OpenAI服务根据合并内容和用户问题进行总结。
+        提取单个链接的内容，失败时按配置重试；仅在发出请求时占用并发名额，重试等待期间不占用。
         """
-        if not combined_content:
-            return "没有足够的内容进行总结。"
+        import httpx # 此时客户端已创建，httpx 已经导入
+
+        max_retries = self.extract_max_retries
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"Attempt {attempt + 1} to extract content from link: {link} using JinaAI")
+                jina_url = f"{self.jinaai_base_url}{link}"
+                async with global_limit, host_limit:
+                    async with observe_upstream("jina"):
+                        response = await self.http_client.get(jina_url, headers={"Authorization": f"Bearer {self.jinaai_api_key}"})
+                        response.raise_for_status()
+                logger.info(f"Successfully extracted content from {link} on attempt {attempt + 1}")
+                return response.text
+            except httpx.HTTPStatusError as e:
+                logger.warning(f"JinaAI content extraction HTTP error for {link} (Attempt {attempt + 1}/{max_retries}): {e.response.status_code} - {e.response.text}")
+                reason = "HTTP error"
+            except httpx.RequestError as e:
+                logger.warning(f"JinaAI content extraction request error for {link} (Attempt {attempt + 1}/{max_retries}): {e}")
+                reason = "request error"
+            except Exception as e:
+                logger.warning(f"An unexpected error occurred during JinaAI extraction for {link} (Attempt {attempt + 1}/{max_retries}): {e}")
+                reason = "unexpected error"
+            if attempt < max_retries - 1:
+                await asyncio.sleep(self.extract_retry_delay_seconds) # 等待后重试
+            else:
+                logger.error(f"Failed to extract content from {link} after {max_retries} attempts due to {reason}.")
+        return None
 
+    def _build_summary_messages(self, combined_content: str, query: str) -> List[dict]:
         prompt = (
             f"以下是关于 '{query}' 的参考文档内容：\n\n"
             f"{combined_content}\n\n"
             f"请根据上述参考文档，详细回答问题：'{query}'。如果文档中没有直接答案，请说明。"
         )
 
-        messages = [
+        return [
             {"role": "system", "content": "你是一个专业的总结助手，能够根据提供的文档和问题进行准确、简洁的总结。"},
             {"role": "user", "content": prompt}
         ]
 
-        try:
-            logger.info(f"Calling Azure OpenAI for summarization with query: {query}")
+    async def remove_near_duplicates(self, documents: List[str]) -> List[str]:
+        """
+        去除近似重复的文档（镜像、不同版本）和段落（分页、转载），避免同一内容多次进入提示词。
+        计算 SimHash 指纹是CPU密集的计算，在线程中执行，避免阻塞事件循环。
+        """
+        if not self.dedup_enabled:
+            return documents
+        deduplicated, counts = await asyncio.to_thread(self.near_duplicate_filter.filter_with_stats, documents)
+        if counts["bytes_saved"]:
+            logger.info(
+                f"Removed near-duplicate content: {counts['documents_removed']} documents, "
+                f"{counts['passages_removed']} passages, {counts['bytes_saved']} bytes."
+            )
+        return deduplicated
+
+    async def filter_relevant_passages(self, documents: List[str], query: str) -> Tuple[List[str], dict]:
+        """
+        按 BM25 得分保留与问题相关的段落，去掉导航、页脚等无关内容以减少提示词 token。
+        返回筛选后的文档列表和统计信息（段落数、筛选前后的 token 数、耗时）。
+        切分和打分是CPU密集的计算，在线程中执行，避免阻塞事件循环。
+        """
+        if not self.relevance_filter_enabled:
+            return documents, {}
+        start = time.perf_counter()
+        filtered, stats = await asyncio.to_thread(
+            select_passages, documents, query, self.relevance_budget_tokens, self.relevance_passage_tokens
+        )
+        stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(
+            f"Relevance filter kept {stats['kept_passages']}/{stats['passages']} passages, "
+            f"{stats['kept_tokens']}/{stats['original_tokens']} tokens in {stats['elapsed_ms']}ms."
+        )
+        return filtered, stats
+
+    def _build_map_messages(self, chunk: str, query: str) -> List[dict]:
+        prompt = (
+            f"以下是关于 '{query}' 的一段参考资料：\n\n"
+            f"{chunk}\n\n"
+            f"请提取这段资料中与问题 '{query}' 相关的事实、数据和结论，简洁列出要点。如果没有相关内容，请只回复“无相关内容”。"
+        )
+
+        return [
+            {"role": "system", "content": "你是一个专业的资料整理助手，只根据提供的资料提取要点，不补充资料以外的内容。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _summarize_chunk(self, chunk: str, query: str) -> str:
+        """
+        对单个内容块进行摘要（map 阶段），只保留与问题相关的要点。
+        """
+        async with observe_upstream("openai"):
             response = await self.azure_openai_client.chat.completions.create(
                 model=self.azure_openai_deployment_name,
-                messages=messages,
-                temperature=0.7, # 可以调整
-                max_tokens=1000 # 可以调整
+                messages=self._build_map_messages(chunk, query),
+                temperature=0.3,
+                max_tokens=self.summary_map_max_tokens
             )
+        return response.choices[0].message.content or ""
+
+    async def _summarize_chunks(self, chunks: List[str], query: str) -> List[str]:
+        """
+        以有限并发对多个块进行摘要，失败的块被跳过；全部失败时抛出第一个异常。
+        """
+        semaphore = asyncio.Semaphore(self.summary_map_concurrency)
+
+        async def summarize(chunk: str) -> str:
+            async with semaphore:
+                return await self._summarize_chunk(chunk, query)
+
+        results = await asyncio.gather(*(summarize(chunk) for chunk in chunks), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors:
+            logger.warning(f"Chunk summarization failed: {error}")
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return [result.strip() for result in results if not isinstance(result, BaseException) and result.strip()]
+
+    def _split_documents(self, documents: List[str], separator: str) -> Tuple[str, int, List[str]]:
+        """
+        合并文档并估算 token 数，超出预算时按块大小切分，返回 (合并内容, token 数, 分块列表)；未超出预算时分块列表为空。
+        遍历全部文档的 CPU 密集计算，在线程中调用。
+        """
+        combined_content = separator.join(documents)
+        budget = self.summary_context_budget_tokens
+        total_tokens = estimate_tokens(combined_content)
+        if total_tokens <= budget:
+            return combined_content, total_tokens, []
+        chunk_tokens = min(self.summary_chunk_tokens, budget)
+        chunks = [
+            chunk
+            for document in documents
+            for chunk in split_into_chunks(document, chunk_tokens, self.summary_chunk_overlap_tokens)
+        ]
+        return combined_content, total_tokens, chunks
+
+    async def condense_documents(self, documents: List[str], query: str) -> Tuple[str, int]:
+        """
+        将提取到的文档整理为可放入单次总结调用的参考内容，返回 (参考内容, 分块摘要调用次数)。
+        内容在 token 预算内时直接合并（只需一次调用）；超出预算时先分块并发摘要（map），
+        摘要合并后仍超出预算则按预算分组再次摘要，直到可以放入最终的总结调用（reduce）。
+        token 估算和切分在线程中执行，reduce 阶段按每条要点的 token 数累加，不重复计算合并后的文本。
+        """
+        separator = "\n\n---\n\n"
+        budget = self.summary_context_budget_tokens
+        combined_content, total_tokens, chunks = await asyncio.to_thread(self._split_documents, documents, separator)
+        if not chunks:
+            return combined_content, 0
+
+        if len(chunks) > self.summary_max_chunks:
+            logger.warning(f"Content split into {len(chunks)} chunks, only the first {self.summary_max_chunks} are summarized.")
+            chunks = chunks[:self.summary_max_chunks]
+        logger.info(f"Content has ~{total_tokens} tokens (budget {budget}), summarizing {len(chunks)} chunks.")
+        notes = await self._summarize_chunks(chunks, query)
+        calls = len(chunks)
+
+        separator_tokens = estimate_tokens(separator)
+        note_tokens = await asyncio.to_thread(lambda: [estimate_tokens(note) for note in notes])
+
+        def joined_tokens(counts: List[int]) -> int:
+            return sum(counts) + separator_tokens * max(0, len(counts) - 1)
+
+        # 合并后的要点仍超出预算时，按预算贪心分组再摘要，直到能放入一次调用
+        while len(notes) > 1 and joined_tokens(note_tokens) > budget:
+            groups: List[List[str]] = [[]]
+            group_tokens = 0
+            for note, tokens in zip(notes, note_tokens):
+                if groups[-1] and group_tokens + tokens > budget:
+                    groups.append([])
+                    group_tokens = 0
+                groups[-1].append(note)
+                group_tokens += tokens
+            if len(groups) == len(notes):
+                break # 每条要点单独就接近预算，无法继续合并
+            notes = await self._summarize_chunks([separator.join(group) for group in groups], query)
+            calls += len(groups)
+            note_tokens = await asyncio.to_thread(lambda: [estimate_tokens(note) for note in notes])
+
+        condensed = separator.join(notes)
+        if joined_tokens(note_tokens) > budget:
+            condensed = (await asyncio.to_thread(split_into_chunks, condensed, budget))[0]
+        return condensed, calls
+
+    async def summarize_combined_content(self, combined_content: str, query: str) -> str:
+        """
+        使用Azure OpenAI服务根据合并内容和用户问题进行总结。
+        """
+        if not combined_content:
+            return "没有足够的内容进行总结。"
+
+        messages = self._build_summary_messages(combined_content, query)
+
+        try:
+            logger.info(f"Calling Azure OpenAI for summarization with query: {query}")
+            async with observe_upstream("openai"):
+                response = await self.azure_openai_client.chat.completions.create(
+                    model=self.azure_openai_deployment_name,
+                    messages=messages,
+                    temperature=0.7, # 可以调整
+                    max_tokens=1000 # 可以调整
+                )
             summary = response.choices[0].message.content
             logger.info("Successfully received summary from Azure OpenAI.")
             return summary
@@ -139,10 +404,44 @@ class WebSummarizerService:
             logger.error(f"Azure OpenAI API error: {e}")
             raise
 
+    async def summarize_combined_content_stream(self, combined_content: str, query: str) -> AsyncIterator[str]:
+        """
+        以流式方式进行总结，逐段产出模型返回的文本。
+        生成器被关闭（如客户端断开连接）时会立即关闭上游响应。
+        """
+        if not combined_content:
+            yield "没有足够的内容进行总结。"
+            return
+
+        messages = self._build_summary_messages(combined_content, query)
+        logger.info(f"Calling Azure OpenAI for streaming summarization with query: {query}")
+        # 流式调用记录的是建立流（收到响应头）的耗时
+        async with observe_upstream("openai_stream"):
+            stream = await self.azure_openai_client.chat.completions.create(
+                model=self.azure_openai_deployment_name,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True
+            )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
     async def process_request(self, urls: List[str], query: str) -> str:
         """
         协调整个流程：搜索、提取内容并总结。
+        规范化后相同的并发请求会合并为一次执行，所有请求共享同一结果。
         """
+        key = self.normalize_search(urls, query)
+        if key in summarize_flight:
+            logger.info(f"Coalescing summarize request with in-flight pipeline for query: {key[1]}")
+        return await summarize_flight.do(key, lambda: self._run_pipeline(urls, query))
+
+    async def _run_pipeline(self, urls: List[str], query: str) -> str:
         logger.info(f"Starting process for URLs: {urls} with query: {query}")
         
         # 1. 在指定URL中搜索问题，获取相关链接
@@ -160,11 +459,52 @@ class WebSummarizerService:
             logger.warning("No content could be extracted from the relevant links.")
             return "未能从找到的链接中提取到有效内容。"
 
-        # 3. 合并所有提取到的内容
-        combined_content = "\n\n---\n\n".join(extracted_contents)
+        # 3. 去除近重复内容并只保留与问题相关的段落，合并后超出 token 预算时先分块摘要
+        extracted_contents = await self.remove_near_duplicates(extracted_contents)
+        extracted_contents, _ = await self.filter_relevant_passages(extracted_contents, query)
+        combined_content, _ = await self.condense_documents(extracted_contents, query)
         
         # 4. 使用LLM总结合并后的内容
         summary = await self.summarize_combined_content(combined_content, query)
         
         logger.info("Process completed successfully.")
         return summary
+
+    async def process_request_stream(self, urls: List[str], query: str) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        流式执行整个流程，依次产出 (事件名, 数据)：
+        每个阶段完成时产出 stage 事件，总结阶段逐段产出 token 事件，最后产出 done 事件。
+        流式请求不参与并发合并，每个请求独立执行。
+        """
+        logger.info(f"Starting streaming process for URLs: {urls} with query: {query}")
+
+        relevant_links = await self.search_urls_for_query(urls, query)
+        yield "stage", {"stage": "search", "links": len(relevant_links)}
+        if not relevant_links:
+            logger.warning("No relevant links found from Google Search.")
+            yield "token", {"content": "未能找到与您问题相关的任何内容。"}
+            yield "done", {}
+            return
+
+        extracted_contents = await self.extract_content_from_links(relevant_links)
+        extracted_contents = [content for content in extracted_contents if content.strip()]
+        yield "stage", {"stage": "extract", "pages": len(extracted_contents)}
+        if not extracted_contents:
+            logger.warning("No content could be extracted from the relevant links.")
+            yield "token", {"content": "未能从找到的链接中提取到有效内容。"}
+            yield "done", {}
+            return
+
+        extracted_contents = await self.remove_near_duplicates(extracted_contents)
+        extracted_contents, relevance = await self.filter_relevant_passages(extracted_contents, query)
+        if relevance:
+            yield "stage", {"stage": "filter", "original_tokens": relevance["original_tokens"], "kept_tokens": relevance["kept_tokens"]}
+        combined_content, map_calls = await self.condense_documents(extracted_contents, query)
+        if map_calls:
+            yield "stage", {"stage": "map", "chunks": map_calls}
+        yield "stage", {"stage": "summarizing"}
+        async with aclosing(self.summarize_combined_content_stream(combined_content, query)) as deltas:
+            async for delta in deltas:
+                yield "token", {"content": delta}
+        logger.info("Streaming process completed successfully.")
+        yield "done", {}
@@ -0,0 +1,107 @@
+"""
+批量创建用户与逐个创建用户的吞吐量对比基准测试。
+
+在进程内（httpx ASGITransport）分别以逐个 POST /users/（顺序、以及 16 并发）和
+POST /users/bulk（每批 USERS 个）创建同样数量的用户，比较每秒创建的用户数。
+
+bcrypt 的计算量与创建方式无关，只能靠多核并行摊薄，默认以 plaintext 方案代替 bcrypt，
+以衡量其余开销（请求处理、重复检查、插入、提交、刷新）；设置 BENCH_HASH_SCHEME=bcrypt
+（可配合 BENCH_BCRYPT_ROUNDS）可测量包含哈希计算的端到端结果。
+
+运行方式（需配置好 .env 或环境变量，DATABASE_URL 建议指向临时 SQLite 文件）：
+    python -m benchmarks.bench_bulk_users
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+from passlib.context import CryptContext
+
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common import hashing
+from app.core.common.security import create_access_token
+from app.models.user import User
+
+USERS = 1000
+CONCURRENCY = 16
+HASH_SCHEME = os.getenv("BENCH_HASH_SCHEME", "plaintext")
+BCRYPT_ROUNDS = int(os.getenv("BENCH_BCRYPT_ROUNDS", 12))
+
+
+async def reset_database():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(email="admin@example.com", hashed_password="x"))
+        await db.commit()
+
+
+def payload(prefix: str) -> list[dict]:
+    return [{"email": f"{prefix}{i}@example.com", "password": f"password{i}"} for i in range(USERS)]
+
+
+async def single_sequential(client) -> float:
+    start = time.perf_counter()
+    for user in payload("seq"):
+        response = await client.post("/users/", json=user)
+        assert response.status_code == 201, response.text
+    return time.perf_counter() - start
+
+
+async def single_concurrent(client) -> float:
+    users = payload("conc")
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def create(user):
+        async with semaphore:
+            response = await client.post("/users/", json=user)
+            assert response.status_code == 201, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(create(user) for user in users))
+    return time.perf_counter() - start
+
+
+async def bulk(client) -> float:
+    start = time.perf_counter()
+    response = await client.post("/users/bulk", json=payload("bulk"))
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["created"] == USERS
+    return time.perf_counter() - start
+
+
+async def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    if HASH_SCHEME == "bcrypt":
+        hashing.pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=BCRYPT_ROUNDS)
+    else:
+        hashing.pwd_context = CryptContext(schemes=[HASH_SCHEME])
+    token = create_access_token({"sub": "admin@example.com"})
+    transport = httpx.ASGITransport(app=app)
+    results = {
+        "users": USERS,
+        "hash_scheme": HASH_SCHEME if HASH_SCHEME != "bcrypt" else f"bcrypt-{BCRYPT_ROUNDS}",
+        "cpu_count": os.cpu_count(),
+        "database": engine.dialect.name,
+    }
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"Authorization": f"Bearer {token}"}) as client:
+        for label, run in (("single_sequential", single_sequential), ("single_concurrent", single_concurrent), ("bulk", bulk)):
+            await reset_database()
+            elapsed = await run(client)
+            results[label] = {"seconds": round(elapsed, 3), "users_per_second": round(USERS / elapsed, 1)}
+    results["speedup_vs_sequential"] = round(results["bulk"]["users_per_second"] / results["single_sequential"]["users_per_second"], 1)
+    results["speedup_vs_concurrent"] = round(results["bulk"]["users_per_second"] / results["single_concurrent"]["users_per_second"], 1)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    hashing.hashing_pool.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+冷启动基准测试：导入耗时和首个请求耗时。
+
+每次测量都启动新的 Python 进程：
+    - import_ms：导入 app.main 的耗时
+    - first_request_ms：从启动 uvicorn 子进程到 GET / 首次返回 200 的耗时（含解释器启动、导入、启动事件）
+    - top_imports：python -X importtime 中累计耗时最高的模块，用于定位导入开销
+
+数据库为临时目录中已建好表的 SQLite 文件，对应服务重启而不是首次部署的场景。
+可通过环境变量传入要比较的配置，例如 DATABASE_SCHEMA_MODE=check。
+
+运行方式（需配置好 .env 或环境变量）：
+    python -m benchmarks.bench_cold_start
+"""
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(os.getenv("BENCH_COLD_START_RUNS", 5))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_ms(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1]) * 1000
+
+
+def top_imports(env: dict, count: int = 10) -> list:
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in output.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        # 只统计顶层包（如 openai、sqlalchemy）以及 app 自身的模块
+        if match and ("." not in match.group(2) or match.group(2).startswith("app.")):
+            name = match.group(2)
+            cumulative[name] = max(cumulative.get(name, 0), int(match.group(1)))
+    ranked = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:count]
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def first_request_ms(env: dict) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"App exited during startup with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="cold-start-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'app.db')}"
+    env.setdefault("CONTENT_CACHE_PATH", "")
+    # 先完整启动一次以建表，之后的测量对应已有数据库的重启
+    first_request_ms(dict(env, DATABASE_SCHEMA_MODE="create"))
+
+    imports = [import_ms(env) for _ in range(RUNS)]
+    requests = [first_request_ms(env) for _ in range(RUNS)]
+    print(json.dumps({
+        "runs": RUNS,
+        "schema_mode": env.get("DATABASE_SCHEMA_MODE", "default"),
+        "import_ms": {"min": round(min(imports), 1), "median": round(statistics.median(imports), 1)},
+        "first_request_ms": {"min": round(min(requests), 1), "median": round(statistics.median(requests), 1)},
+        "top_imports": top_imports(env),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
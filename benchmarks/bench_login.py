@@ -0,0 +1,107 @@
+"""
+登录负载下的事件循环阻塞基准测试。
+
+在进程内（httpx ASGITransport）以固定并发持续请求 /token，同时以固定间隔探测
+无关接口 GET /，比较同步 bcrypt（旧实现）与哈希池（新实现）下：
+    - /token 吞吐量
+    - GET / 的 p50/p99 延迟
+
+运行方式（需配置好 .env 或环境变量，DATABASE_URL 建议指向临时 SQLite 文件）：
+    python -m benchmarks.bench_login
+"""
+import asyncio
+import json
+import logging
+import statistics
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common.hashing import get_password_hash, verify_password
+from app.models.user import User
+from app.services import user as user_service_module
+
+DURATION_SECONDS = 5
+LOGIN_CONCURRENCY = 16
+PROBE_INTERVAL_SECONDS = 0.01
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+@contextmanager
+def blocking_verify():
+    """
+    将 verify_password_async 替换为在事件循环中直接执行 bcrypt 的实现，模拟旧行为。
+    """
+    original = user_service_module.verify_password_async
+
+    async def verify_inline(plain_password, hashed_password):
+        return verify_password(plain_password, hashed_password)
+
+    user_service_module.verify_password_async = verify_inline
+    try:
+        yield
+    finally:
+        user_service_module.verify_password_async = original
+
+
+async def run_load(client):
+    deadline = time.perf_counter() + DURATION_SECONDS
+    logins = 0
+    probe_latencies = []
+
+    async def login_worker():
+        nonlocal logins
+        while time.perf_counter() < deadline:
+            response = await client.post("/token", data={"username": "bench@example.com", "password": "password123"})
+            if response.status_code == 200:
+                logins += 1
+
+    async def probe():
+        # 以计划发送时间为起点计算延迟，事件循环被阻塞的时间也计入延迟
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/")
+            probe_latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += PROBE_INTERVAL_SECONDS
+
+    await asyncio.gather(probe(), *(login_worker() for _ in range(LOGIN_CONCURRENCY)))
+    return {
+        "token_rps": round(logins / DURATION_SECONDS, 1),
+        "probe_requests": len(probe_latencies),
+        "probe_p50_ms": round(statistics.median(probe_latencies), 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 99), 2),
+    }
+
+
+async def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(email="bench@example.com", hashed_password=get_password_hash("password123")))
+        await db.commit()
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with blocking_verify():
+            results["inline_bcrypt"] = await run_load(client)
+        results["hashing_pool"] = await run_load(client)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+LogMiddleware 前后对比基准测试。
+
+直接以 ASGI 调用驱动一个最小的 Starlette 应用，比较旧的 BaseHTTPMiddleware 实现
+与新的纯 ASGI 实现每个请求的额外开销，分别测量 INFO 日志被过滤和开启两种情况。
+
+运行方式（需配置好 .env 或环境变量）：
+    python -m benchmarks.bench_middleware
+"""
+import asyncio
+import json
+import logging
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.core.common.logger import logger
+from app.core.common.middlewares import LogMiddleware
+
+REQUESTS = 5000
+
+
+class LegacyLogMiddleware(BaseHTTPMiddleware):
+    """
+    旧实现的等价版本（不含异常写库分支），用于对比。
+    """
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = Response("Internal Server Error", status_code=500)
+        try:
+            response = await call_next(request)
+        finally:
+            process_time = time.time() - start_time
+            logger.info(f"Request: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.4f}s")
+        return response
+
+
+async def homepage(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(middleware_class=None):
+    app = Starlette(routes=[Route("/", homepage)])
+    if middleware_class is not None:
+        app.add_middleware(middleware_class)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 12345), "server": ("127.0.0.1", 8000),
+    }
+
+    async def send(message):
+        pass
+
+    async def request_once():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait() # 模拟客户端保持连接，直到被取消
+        await app(dict(scope), receive, send)
+
+    for _ in range(200): # 预热
+        await request_once()
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request_once()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main():
+    root = logging.getLogger()
+    saved_handlers = root.handlers
+    root.handlers = [logging.NullHandler()]
+    results = {}
+    try:
+        for label, level in (("info_filtered", logging.WARNING), ("info_enabled", logging.INFO)):
+            logger.setLevel(level)
+            baseline = await drive(build_app(), REQUESTS)
+            legacy = await drive(build_app(LegacyLogMiddleware), REQUESTS)
+            current = await drive(build_app(LogMiddleware), REQUESTS)
+            results[label] = {
+                "no_middleware_us": round(baseline, 2),
+                "legacy_us": round(legacy, 2),
+                "asgi_us": round(current, 2),
+                "legacy_overhead_us": round(legacy - baseline, 2),
+                "asgi_overhead_us": round(current - baseline, 2),
+            }
+    finally:
+        root.handlers = saved_handlers
+        logger.setLevel(logging.NOTSET)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+相关段落筛选（BM25）基准测试。
+
+构造一组模拟 JinaAI 提取结果的页面：每页包含导航、页脚以及多个主题的正文段落，
+其中只有一个主题与问题相关。测量筛选前后提示词的 token 数以及筛选阶段增加的耗时。
+
+运行方式（需配置好 .env 或环境变量）：
+    python -m benchmarks.bench_relevance
+"""
+import json
+import random
+import statistics
+import time
+
+from app.core.common.relevance import select_passages
+from app.core.config import settings
+
+PAGES = 10
+PARAGRAPHS_PER_TOPIC = 12
+RUNS = 50
+QUERY = "How do I configure connection pool size for the async database engine?"
+
+TOPICS = {
+    "database": "database engine connection pool size async configure session timeout overflow sqlalchemy".split(),
+    "billing": "invoice payment subscription plan refund currency billing cycle tax".split(),
+    "deploy": "container image kubernetes rollout replica helm chart registry".split(),
+    "auth": "token login password oauth scope refresh expiry credential".split(),
+    "frontend": "component render state hook style layout bundle browser".split(),
+}
+FILLER = "the a of to and in is for with that this on it by as be are from at or".split()
+
+
+def paragraph(rng: random.Random, topic: str) -> str:
+    words = []
+    for _ in range(rng.randint(60, 120)):
+        words.append(rng.choice(TOPICS[topic]) if rng.random() < 0.3 else rng.choice(FILLER))
+    return " ".join(words).capitalize() + "."
+
+
+def build_corpus(seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    pages = []
+    for page in range(PAGES):
+        navigation = [f"[{name}](https://docs.example.com/{name.lower()})" for name in ("Home", "Guides", "API", "Pricing", "Blog", "Support")]
+        body = [paragraph(rng, topic) for topic in TOPICS for _ in range(PARAGRAPHS_PER_TOPIC)]
+        rng.shuffle(body)
+        footer = ["© 2024 Example Inc. All rights reserved.", "Privacy · Terms · Cookies · Status"]
+        pages.append("\n\n".join(navigation + body + footer))
+    return pages
+
+
+def main():
+    corpus = build_corpus()
+    budget = settings.RELEVANCE_BUDGET_TOKENS
+    passage_tokens = settings.RELEVANCE_PASSAGE_TOKENS
+
+    for _ in range(5): # 预热
+        select_passages(corpus, QUERY, budget, passage_tokens)
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        filtered, stats = select_passages(corpus, QUERY, budget, passage_tokens)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    kept_text = "\n\n".join(filtered)
+    relevant_words = set(TOPICS["database"])
+    kept_paragraphs = [p for p in kept_text.split("\n\n") if p]
+    on_topic = sum(1 for p in kept_paragraphs if sum(w in relevant_words for w in p.lower().split()) > 5)
+
+    timings.sort()
+    print(json.dumps({
+        "pages": PAGES,
+        "passages": stats["passages"],
+        "kept_passages": stats["kept_passages"],
+        "on_topic_kept_passages": on_topic,
+        "original_tokens": stats["original_tokens"],
+        "kept_tokens": stats["kept_tokens"],
+        "budget_tokens": budget,
+        "prompt_reduction_pct": round(100 * (1 - stats["kept_tokens"] / stats["original_tokens"]), 1),
+        "filter_ms_mean": round(statistics.mean(timings), 2),
+        "filter_ms_p50": round(timings[len(timings) // 2], 2),
+        "filter_ms_p95": round(timings[int(len(timings) * 0.95) - 1], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+BaseResponse 用户列表响应的序列化基准测试。
+
+分别以 1000 和 10000 个用户（ORM 对象）为数据，比较生成最终 JSON 字节串的耗时：
+    - response_model：旧方式，接口返回 BaseResponse，由 FastAPI 按 response_model 再次校验、
+      转换为可 JSON 化的数据并以 json.dumps 渲染
+    - validated：缓存的 TypeAdapter 校验（从 ORM 属性读取）后由 pydantic-core 直接序列化为字节串
+    - trusted：按 UserResponse 字段读取属性后跳过校验，由 orjson 直接序列化（GET /users/ 使用的方式）
+
+运行方式（需配置好 .env 或环境变量）：
+    python -m benchmarks.bench_response
+"""
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.user import User
+from app.schemas.common.base import BaseResponse, EnvelopeResponse, attributes_of
+from app.schemas.user import UserResponse
+
+SIZES = (1000, 10000)
+REPEAT = 10
+
+
+async def timed(render, repeat: int = REPEAT) -> float:
+    await render() # 预热（包括构建并缓存 TypeAdapter）
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await render()
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000
+
+
+async def main():
+    field = create_response_field(name="Response", type_=BaseResponse[list[UserResponse]])
+    results = {}
+    for size in SIZES:
+        users = [User(id=i, email=f"user{i}@example.com", hashed_password="x", is_active=True) for i in range(size)]
+
+        async def response_model():
+            return JSONResponse(await serialize_response(field=field, response_content=BaseResponse(data=users))).body
+
+        async def validated():
+            return EnvelopeResponse(users, list[UserResponse]).body
+
+        async def trusted():
+            return EnvelopeResponse(attributes_of(users, UserResponse), trusted=True).body
+
+        bodies = [json.loads(await render()) for render in (response_model, validated, trusted)]
+        assert bodies[0] == bodies[1] == bodies[2]
+
+        legacy_ms = await timed(response_model)
+        validated_ms = await timed(validated)
+        trusted_ms = await timed(trusted)
+        results[f"{size}_users"] = {
+            "response_model_ms": round(legacy_ms, 2),
+            "validated_ms": round(validated_ms, 2),
+            "trusted_ms": round(trusted_ms, 2),
+            "validated_speedup": round(legacy_ms / validated_ms, 1),
+            "trusted_speedup": round(legacy_ms / trusted_ms, 1),
+            "body_bytes": len(await trusted()),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,182 @@
+"""
+SerpAPI、Jina Reader 和 Azure OpenAI 的本地替身服务，供离线压测使用。
+
+三个服务由同一个 Starlette 应用提供，每个服务可以单独配置响应延迟、随机抖动和错误率：
+    GET  /search                                             SerpAPI（返回 organic_results 链接）
+    GET  /jina/{link}                                        Jina Reader（返回按链接确定生成的网页正文）
+    POST /openai/deployments/{deployment}/chat/completions   Azure OpenAI（支持 stream=true 的 SSE 响应）
+    GET  /_stats                                             各服务的请求数和注入的错误数
+
+单独运行（默认端口 9100）：
+    python -m benchmarks.fake_upstreams --port 9100 --openai-latency 0.5 --jina-error-rate 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+_WORDS = (
+    "performance latency throughput cache database index query request response server client "
+    "connection pool async event loop python fastapi summary search content token model stream"
+).split()
+
+
+class UpstreamBehavior:
+    """
+    单个上游服务的行为：每次请求先等待 latency_seconds 加上 [0, jitter_seconds) 的随机抖动，
+    再以 error_rate 的概率返回 error_status。
+    """
+    def __init__(self, latency_seconds: float = 0.0, jitter_seconds: float = 0.0, error_rate: float = 0.0, error_status: int = 500):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self):
+        self.requests += 1
+        await asyncio.sleep(self.latency_seconds + random.random() * self.jitter_seconds)
+
+    def injected_error(self) -> Response | None:
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({"error": {"message": "injected failure"}}, status_code=self.error_status)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "latency_seconds": self.latency_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+def _words(seed: str, count: int) -> str:
+    rng = random.Random(hashlib.sha256(seed.encode()).digest())
+    return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+
+def create_app(
+    serpapi: UpstreamBehavior,
+    jina: UpstreamBehavior,
+    openai: UpstreamBehavior,
+    results_per_search: int = 5,
+    paragraphs_per_page: int = 20,
+    stream_chunks: int = 20
+) -> Starlette:
+    """
+    创建替身服务应用。网页正文、搜索结果都由请求参数确定性生成，同样的请求得到同样的内容。
+    """
+    async def search(request: Request):
+        await serpapi.delay()
+        error = serpapi.injected_error()
+        if error is not None:
+            return error
+        query = request.query_params.get("q", "")
+        slug = hashlib.sha256(query.encode()).hexdigest()[:12]
+        links = [f"https://site{i % 3}.example/{slug}/{i}" for i in range(results_per_search)]
+        return JSONResponse({"organic_results": [{"link": link} for link in links]})
+
+    async def reader(request: Request):
+        await jina.delay()
+        error = jina.injected_error()
+        if error is not None:
+            return error
+        link = request.path_params["link"]
+        # 每页包含导航、页脚等重复内容，以及按链接生成的正文段落
+        paragraphs = ["Home | Docs | Blog | Contact"]
+        paragraphs.extend(_words(f"{link}#{i}", 60) + "." for i in range(paragraphs_per_page))
+        paragraphs.append("Copyright 2024 Example Inc. All rights reserved.")
+        return PlainTextResponse("\n\n".join(paragraphs))
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await openai.delay()
+        error = openai.injected_error()
+        if error is not None:
+            return error
+        content = _words(json.dumps(body.get("messages", []), sort_keys=True), 80)
+        created = int(time.time())
+        model = body.get("model", "fake")
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        words = content.split()
+        size = max(1, len(words) // stream_chunks)
+
+        async def events():
+            for start in range(0, len(words), size):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": None, "delta": {"content": " ".join(words[start:start + size]) + " "}}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def stats(request: Request):
+        return JSONResponse({"serpapi": serpapi.stats(), "jina": jina.stats(), "openai": openai.stats()})
+
+    return Starlette(routes=[
+        Route("/search", search),
+        Route("/jina/{link:path}", reader),
+        Route("/openai/deployments/{deployment}/chat/completions", chat_completions, methods=["POST"]),
+        Route("/_stats", stats),
+    ])
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser):
+    """
+    为三个上游服务添加 --<name>-latency、--<name>-jitter、--<name>-error-rate 参数。
+    """
+    defaults = {"serpapi": 0.2, "jina": 0.3, "openai": 0.8}
+    for name, latency in defaults.items():
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help=f"{name} 基础延迟（秒）")
+        parser.add_argument(f"--{name}-jitter", type=float, default=None, help=f"{name} 随机抖动上限（秒），默认为基础延迟的一半")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help=f"{name} 返回错误的概率")
+
+
+def behaviors_from_args(args) -> dict:
+    behaviors = {}
+    for name in ("serpapi", "jina", "openai"):
+        latency = getattr(args, f"{name}_latency")
+        jitter = getattr(args, f"{name}_jitter")
+        behaviors[name] = UpstreamBehavior(
+            latency_seconds=latency,
+            jitter_seconds=latency / 2 if jitter is None else jitter,
+            error_rate=getattr(args, f"{name}_error_rate")
+        )
+    return behaviors
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(**behaviors_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,257 @@
+"""
+离线压测：在本地启动应用和上游替身服务，以异步负载生成器压测主要接口，输出 JSON 报告。
+
+流程：
+1. 在临时目录中创建 SQLite 数据库，写入登录用户和用于列表查询的用户；
+2. 在本进程中启动 SerpAPI、Jina Reader、Azure OpenAI 替身服务（见 benchmarks.fake_upstreams），
+   延迟和错误率可通过参数配置；
+3. 以子进程方式用 uvicorn 启动应用，上游地址指向替身服务，压测进程与应用不共享事件循环；
+4. 依次对 /token、/users/、/llm/chat、/llm/summarize_urls_with_query 以固定并发发送请求（闭环模式，
+   每个并发槽位在收到响应后发送下一个请求），统计吞吐量和 p50/p95/p99 延迟。
+
+报告输出到标准输出，也可以用 --output 写入文件，便于比较不同版本或不同配置的结果。
+总结接口默认每个请求使用不同的问题，避免命中搜索缓存和请求合并；--repeat-queries 可测量缓存命中时的表现。
+
+运行方式：
+    python -m benchmarks.loadtest --requests 200 --concurrency 20 --output loadtest.json
+    python -m benchmarks.loadtest --scenarios summarize --openai-latency 1.5 --jina-error-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import add_behavior_arguments, behaviors_from_args, create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGIN_EMAIL = "loadtest@example.com"
+LOGIN_PASSWORD = "loadtest-password"
+SCENARIOS = ("token", "users", "chat", "summarize")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    最近秩法计算分位数，sorted_values 需已排序。
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: list, statuses: dict, elapsed: float, concurrency: int) -> dict:
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(values),
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(values, 0.50)),
+            "p95": ms(percentile(values, 0.95)),
+            "p99": ms(percentile(values, 0.99)),
+            "mean": ms(sum(values) / len(values)) if values else 0.0,
+            "max": ms(values[-1]) if values else 0.0,
+        },
+        "status_codes": dict(sorted(statuses.items())),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+    }
+
+
+async def run_load(send, total: int, concurrency: int) -> dict:
+    """
+    以 concurrency 个并发槽位发送 total 个请求，send(i) 发送第 i 个请求并返回响应。
+    连接错误、超时等异常按异常类型名计入状态统计。
+    """
+    latencies = []
+    statuses: dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await send(index)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize_latencies(latencies, statuses, time.perf_counter() - start, concurrency)
+
+
+def build_scenarios(client: httpx.AsyncClient, token: str, repeat_queries: bool) -> dict:
+    auth = {"Authorization": f"Bearer {token}"}
+
+    async def login(i):
+        return await client.post("/token", data={"username": LOGIN_EMAIL, "password": LOGIN_PASSWORD})
+
+    async def list_users(i):
+        return await client.get("/users/", params={"limit": 50}, headers=auth)
+
+    async def chat(i):
+        return await client.post(
+            "/llm/chat", json={"messages": [{"role": "user", "content": f"loadtest message {i}"}]}, headers=auth
+        )
+
+    async def summarize(i):
+        query = "how to reduce api latency" if repeat_queries else f"how to reduce api latency {i}"
+        return await client.post(
+            "/llm/summarize_urls_with_query",
+            json={"urls": ["site0.example", "site1.example", "site2.example"], "query": query}
+        )
+
+    return {"token": login, "users": list_users, "chat": chat, "summarize": summarize}
+
+
+def app_environment(database_url: str, upstream_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "SERPAPI_URL": f"{upstream_url}/search",
+        "JINAAI_BASE_URL": f"{upstream_url}/jina/",
+        "AZURE_OPENAI_ENDPOINT": upstream_url,
+        "CONTENT_CACHE_PATH": "", # 只使用内存缓存，每次压测从空缓存开始
+        "PROFILER_SAMPLE_RATE": "0",
+    })
+    for name in ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_DEPLOYMENT_NAME", "GOOGLE_API_KEY", "GOOGLE_CSE_ID", "JINAAI_API_KEY"):
+        env.setdefault(name, "loadtest")
+    env.setdefault("LOG_REQUEST_SAMPLE_RATE", "0") # 压测时默认不输出逐请求日志
+    env.setdefault("RATE_LIMIT_ENABLED", "false") # 所有请求来自同一IP，默认关闭限流以测量接口本身的吞吐量
+    return env
+
+
+async def seed_database(env: dict, seed_users: int):
+    """
+    在应用启动前建表并写入用户。需要在设置好环境变量后再导入 app 模块。
+    """
+    os.environ.update(env)
+    from app.core.database import Base, engine
+    from app.core.common.security import get_password_hash
+    from app.models.user import User
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        db.add(User(email=LOGIN_EMAIL, hashed_password=get_password_hash(LOGIN_PASSWORD)))
+        db.add_all([User(email=f"seed{i}@example.com", hashed_password="x") for i in range(seed_users)])
+        await db.commit()
+    await engine.dispose()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup with code {process.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not become ready in time")
+
+
+async def main(args) -> dict:
+    import uvicorn
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    database_url = f"sqlite+aiosqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    behaviors = behaviors_from_args(args)
+    upstream_port = free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    upstream_server = uvicorn.Server(uvicorn.Config(
+        create_app(**behaviors), host="127.0.0.1", port=upstream_port, log_level="warning", lifespan="off"
+    ))
+    upstream_task = asyncio.create_task(upstream_server.serve())
+
+    env = app_environment(database_url, upstream_url)
+    await seed_database(env, args.seed_users)
+
+    app_port = free_port()
+    startup = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    report = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "repeat_queries": args.repeat_queries,
+            "seed_users": args.seed_users,
+            "upstreams": {name: behavior.stats() for name, behavior in behaviors.items()},
+        },
+        "scenarios": {},
+    }
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=args.timeout) as client:
+            await wait_until_ready(client, process)
+            report["startup_seconds"] = round(time.perf_counter() - startup, 3)
+            login = await client.post("/token", data={"username": LOGIN_EMAIL, "password": LOGIN_PASSWORD})
+            login.raise_for_status()
+            scenarios = build_scenarios(client, login.json()["data"]["access_token"], args.repeat_queries)
+            for name in args.scenarios:
+                send = scenarios[name]
+                if args.warmup:
+                    await run_load(lambda i: send(-1 - i), args.warmup, min(args.warmup, args.concurrency))
+                report["scenarios"][name] = await run_load(send, args.requests, args.concurrency)
+        report["upstreams"] = {name: behavior.stats() for name, behavior in behaviors.items()}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        upstream_server.should_exit = True
+        await upstream_task
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    parser.add_argument("--warmup", type=int, default=10, help="每个场景正式计时前的预热请求数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求的超时（秒）")
+    parser.add_argument("--seed-users", type=int, default=1000, help="预先写入的用户数")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"逗号分隔的场景列表，可选 {','.join(SCENARIOS)}")
+    parser.add_argument("--repeat-queries", action="store_true", help="总结接口所有请求使用同一个问题")
+    parser.add_argument("--output", help="同时将报告写入该文件")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = json.dumps(asyncio.run(main(args)), indent=2)
+    print(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result + "\n")
@@ -0,0 +1,291 @@
+"""
+每个请求都会用到的基础操作的微基准测试。
+
+单独测量以下操作的每次耗时：
+    - JWT 签发与校验（security.py）
+    - bcrypt 哈希与校验（hashing.py）
+    - 接口返回 ORM 用户对象时的响应序列化：BaseResponse 按 FastAPI response_model 流程的校验与序列化
+      （单个用户、100 个用户），以及 EnvelopeResponse 的校验路径（单个用户）和跳过校验的路径（100 个用户）。
+      两组使用相同的 ORM 输入，可以直接比较
+    - LogCreate 构造
+    - 通过 fastapi_injector 在请求作用域内解析 UserService（直接调用，以及 FastAPI 对同步依赖使用的线程池）
+
+每项先预热，再自动确定每轮的调用次数（每轮至少 min_time 秒），重复多轮后汇总中位数、均值、
+标准差、最小值和 p95（单位为微秒）。结果可以保存为基准线（microbench_baseline.json），
+之后的运行与基准线的中位数比较，变慢超过阈值的项被标记为回归。被标记的项会再完整测量几次，
+取各次中位数的中位数确认，排除偶发干扰。共享或负载较高的机器上同一代码的测量结果可以相差 50% 以上，
+因此默认阈值较宽（慢一倍），只用于发现明显的回归；在安静的机器上可以通过 --threshold 收紧。
+在 pytest 中设置 MICROBENCH=1 时，tests/test_microbench.py 以快速模式运行并在出现回归时失败。
+
+运行方式（需配置好 .env 或环境变量）：
+    python -m benchmarks.micro                       # 测量并与基准线比较
+    python -m benchmarks.micro --save-baseline       # 测量并保存为新的基准线
+    python -m benchmarks.micro --only jwt_encode,jwt_decode --threshold 0.1 --check
+"""
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json")
+DEFAULT_THRESHOLD = 1.0 # 中位数比基准线慢一倍以上视为回归
+
+# 名称 -> 准备函数，准备函数返回被测的无参可调用对象（同步函数或协程函数）
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Callable]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+@benchmark("jwt_encode")
+def _jwt_encode():
+    from app.core.common.security import create_access_token
+    return lambda: create_access_token({"sub": "bench@example.com"})
+
+@benchmark("jwt_decode")
+def _jwt_decode():
+    from jose import jwt
+    from app.core.config import settings
+    from app.core.common.security import create_access_token
+    token = create_access_token({"sub": "bench@example.com"})
+    return lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+@benchmark("bcrypt_hash")
+def _bcrypt_hash():
+    from app.core.common.hashing import get_password_hash
+    return lambda: get_password_hash("bench-password")
+
+@benchmark("bcrypt_verify")
+def _bcrypt_verify():
+    from app.core.common.hashing import get_password_hash, verify_password
+    hashed = get_password_hash("bench-password")
+    return lambda: verify_password("bench-password", hashed)
+
+def _serialize_base_response(count: Optional[int]):
+    """
+    按接口返回 BaseResponse(data=ORM对象) 时 FastAPI 处理 response_model 的流程
+    （从属性校验、转换为可 JSON 化的数据、渲染 JSONResponse）序列化响应。
+    count 为 None 时 data 为单个用户，否则为 count 个用户的列表。
+    """
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.models.user import User
+    from app.schemas.common.base import BaseResponse
+    from app.schemas.user import UserResponse
+
+    users = [User(id=i, email=f"user{i}@example.com", hashed_password="x", is_active=True) for i in range(count or 1)]
+    model = BaseResponse[UserResponse] if count is None else BaseResponse[list[UserResponse]]
+    field = create_response_field(name="Response", type_=model)
+    data = users[0] if count is None else users
+
+    async def run():
+        JSONResponse(await serialize_response(field=field, response_content=BaseResponse(data=data)))
+    return run
+
+@benchmark("base_response_user")
+def _base_response_user():
+    return _serialize_base_response(None)
+
+@benchmark("base_response_users_100")
+def _base_response_users_100():
+    return _serialize_base_response(100)
+
+@benchmark("envelope_user")
+def _envelope_user():
+    from app.models.user import User
+    from app.schemas.common.base import EnvelopeResponse
+    from app.schemas.user import UserResponse
+    user = User(id=1, email="user1@example.com", hashed_password="x", is_active=True)
+    return lambda: EnvelopeResponse(user, UserResponse)
+
+@benchmark("envelope_users_100_trusted")
+def _envelope_users_100_trusted():
+    from app.models.user import User
+    from app.schemas.common.base import EnvelopeResponse, attributes_of
+    from app.schemas.user import UserResponse
+    users = [User(id=i, email=f"user{i}@example.com", hashed_password="x", is_active=True) for i in range(100)]
+    return lambda: EnvelopeResponse(attributes_of(users, UserResponse), trusted=True)
+
+@benchmark("log_create")
+def _log_create():
+    from app.schemas.log import LogCreate
+    record = {
+        "level": "ERROR", "message": "Unhandled exception: boom", "pathname": "/users/1",
+        "lineno": 0, "funcname": "dispatch", "exc_info": "Traceback ...", "stack_info": None,
+    }
+    return lambda: LogCreate(**record)
+
+def _injected_dependency():
+    from fastapi_injector import Injected
+    from app.main import app
+    from app.services.user import UserService
+    from starlette.requests import Request
+
+    request = Request({"type": "http", "app": app, "headers": []})
+    return Injected(UserService).dependency, request
+
+@benchmark("di_resolve_user_service")
+def _di_resolve_user_service():
+    from app.core.scopes import request_scope
+    dependency, request = _injected_dependency()
+
+    async def run():
+        async with request_scope():
+            dependency(request)
+    return run
+
+@benchmark("di_resolve_user_service_threadpool")
+def _di_resolve_user_service_threadpool():
+    # fastapi_injector 的依赖是同步函数，FastAPI 会放到线程池中执行
+    from starlette.concurrency import run_in_threadpool
+    from app.core.scopes import request_scope
+    dependency, request = _injected_dependency()
+
+    async def run():
+        async with request_scope():
+            await run_in_threadpool(dependency, request)
+    return run
+
+async def _timed(func: Callable, number: int) -> float:
+    # 与 timeit 一样在计时期间关闭垃圾回收，避免结果受进程中其他对象数量（如在 pytest 中运行时）的影响
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if inspect.iscoroutinefunction(func):
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+            return time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+async def measure(func: Callable, warmup_seconds: float = 0.2, min_time: float = 0.05, repeat: int = 7) -> dict:
+    """
+    测量 func 每次调用的耗时（微秒）：预热 warmup_seconds 秒后，按倍增确定每轮调用次数 number
+    使每轮至少 min_time 秒，再测量 repeat 轮，返回各轮平均单次耗时的统计。
+    """
+    deadline = time.perf_counter() + warmup_seconds
+    while time.perf_counter() < deadline:
+        await _timed(func, 1)
+
+    number = 1
+    while (elapsed := await _timed(func, number)) < min_time:
+        number *= 2 if elapsed * 10 > min_time else 10
+    samples = sorted([(await _timed(func, number)) / number * 1e6 for _ in range(repeat)])
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "min_us": round(samples[0], 3),
+        "p95_us": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3),
+        "number": number,
+        "repeat": repeat,
+    }
+
+async def run_benchmarks(names: List[str], quick: bool = False) -> Dict[str, dict]:
+    """
+    依次运行指定的基准测试。quick 为 True 时缩短预热和测量时间，用于 pytest。
+    """
+    options = dict(warmup_seconds=0.05, min_time=0.02, repeat=5) if quick else {}
+    results = {}
+    for name in names:
+        results[name] = await measure(BENCHMARKS[name](), **options)
+    return results
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+def save_baseline(results: Dict[str, dict], path: str = BASELINE_PATH):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {name: {"min_us": stats["min_us"], "median_us": stats["median_us"]} for name, stats in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """
+    返回单次耗时中位数比基准线慢超过 threshold（相对比例）的项，没有基准线的项跳过。
+    """
+    regressions = []
+    for name, stats in results.items():
+        if "median_us" not in baseline.get(name, {}):
+            continue
+        ratio = stats["median_us"] / baseline[name]["median_us"]
+        if ratio > 1 + threshold:
+            regressions.append({
+                "name": name,
+                "baseline_us": baseline[name]["median_us"],
+                "median_us": stats["median_us"],
+                "ratio": round(ratio, 3),
+            })
+    return regressions
+
+async def check_regressions(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float,
+    quick: bool = False,
+    attempts: int = 2
+) -> List[dict]:
+    """
+    比较结果与基准线；被标记为回归的项再完整测量 attempts 次，以包括首次在内各次中位数的中位数
+    重新判断，排除偶发的调度干扰，持续变慢的项才作为回归返回。results 中这些项的中位数会被更新。
+    """
+    regressions = find_regressions(results, baseline, threshold)
+    if not regressions:
+        return regressions
+    names = [regression["name"] for regression in regressions]
+    medians = {name: [results[name]["median_us"]] for name in names}
+    for _ in range(attempts):
+        for name, stats in (await run_benchmarks(names, quick=quick)).items():
+            medians[name].append(stats["median_us"])
+    for name in names:
+        results[name]["median_us"] = round(statistics.median(medians[name]), 3)
+        results[name]["runs"] = len(medians[name])
+    return find_regressions({name: results[name] for name in names}, baseline, threshold)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", type=lambda value: value.split(","), default=list(BENCHMARKS), help="逗号分隔的基准测试名称")
+    parser.add_argument("--quick", action="store_true", help="缩短预热和测量时间")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("MICROBENCH_THRESHOLD", DEFAULT_THRESHOLD)),
+                        help="判定回归的相对阈值，如 0.25 表示慢 25%%")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基准线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基准线")
+    parser.add_argument("--check", action="store_true", help="出现回归时以非零状态码退出")
+    args = parser.parse_args()
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    async def main():
+        results = await run_benchmarks(args.only, quick=args.quick)
+        regressions = await check_regressions(results, load_baseline(args.baseline), args.threshold, quick=args.quick)
+        return results, regressions
+
+    results, regressions = asyncio.run(main())
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+    print(json.dumps({"results": results, "threshold": args.threshold, "regressions": regressions}, indent=2))
+    sys.exit(1 if args.check and regressions else 0)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# 测试环境使用临时目录中的 SQLite 数据库，并为外部服务配置占位值，
+# 必须在导入 app 之前设置，Settings 在导入时即完成校验。
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="app-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_TEST_DB_DIR, 'test_sql_app.db')}")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test-key")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "test-deployment")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("GOOGLE_CSE_ID", "test-cse")
+os.environ.setdefault("JINAAI_API_KEY", "test-key")
+os.environ.setdefault("CONTENT_CACHE_PATH", "") # 测试中网页内容缓存只使用内存层
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    # 每个测试会重建数据表，避免缓存的用户跨测试残留
+    from app.core.common.cache import principal_cache
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
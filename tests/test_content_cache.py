@@ -0,0 +1,81 @@
+import asyncio
+
+from app.core.common.content_cache import ContentCache, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Docs.Example.com:443/guide/?b=2&a=1#intro") == "https://docs.example.com/guide?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+
+def test_content_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def scenario():
+        cache = ContentCache(path, ttl=60, max_memory_bytes=1024, max_disk_bytes=1024)
+        await cache.set("https://example.com/a", "page a")
+        await cache.close()
+
+        restarted = ContentCache(path, ttl=60, max_memory_bytes=1024, max_disk_bytes=1024)
+        assert await restarted.get("https://example.com/a/") == "page a"
+        assert await restarted.get("https://example.com/a") == "page a"
+        stats = restarted.stats()
+        await restarted.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["disk_bytes"] == len("page a")
+
+
+def test_content_cache_evicts_by_bytes_and_expires(tmp_path):
+    async def scenario():
+        cache = ContentCache(str(tmp_path / "cache.db"), ttl=60, max_memory_bytes=10, max_disk_bytes=10)
+        await cache.set("https://example.com/1", "12345")
+        await cache.set("https://example.com/2", "12345")
+        await cache.set("https://example.com/3", "12345")
+        stats = cache.stats()
+        assert stats["memory_bytes"] == 10
+        assert stats["disk_bytes"] == 10
+        assert stats["memory_evictions"] == 1
+        assert stats["disk_evictions"] == 1
+        assert await cache.get("https://example.com/1") is None
+
+        cache.ttl = 0
+        await cache.set("https://example.com/expired", "x")
+        assert await cache.get("https://example.com/expired") is None
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_content_cache_purge_url_and_host(tmp_path):
+    async def scenario():
+        cache = ContentCache(str(tmp_path / "cache.db"), ttl=60, max_memory_bytes=1024, max_disk_bytes=1024)
+        await cache.set("https://a.example.com/1", "one")
+        await cache.set("https://a.example.com/2", "two")
+        await cache.set("https://b.example.com/1", "three")
+        assert await cache.purge_url("https://b.example.com/1") == 1
+        assert await cache.purge_host("A.example.com") == 2
+        assert await cache.get("https://a.example.com/1") is None
+        assert cache.stats()["disk_bytes"] == 0
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_content_cache_endpoints_require_admin_token(monkeypatch):
+    from starlette.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = TestClient(app)
+    assert client.get("/admin/content_cache/stats").status_code == 403
+    assert client.delete("/admin/content_cache", params={"host": "example.com"}).status_code == 403
+    assert client.get("/llm/content_cache/stats").status_code == 404 # 普通用户路由上不再提供
+    stats = client.get("/admin/content_cache/stats", headers={"X-Admin-Token": "secret"})
+    assert stats.status_code == 200 and "memory_bytes" in stats.json()["data"]
+    assert client.delete("/admin/content_cache", headers={"X-Admin-Token": "secret"}).status_code == 400
@@ -0,0 +1,96 @@
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common.cache import principal_cache
+from app.crud import log as log_crud_module
+from app.crud import user as user_crud_module
+from app.crud.log import LogCRUD
+from app.crud.user import UserCRUD
+from app.schemas.log import LogCreate
+from app.schemas.user import UserCreate, UserUpdate
+
+
+@contextmanager
+def count_statements():
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+
+async def _fake_hash(password):
+    return f"hashed-{password}"
+
+
+@pytest.fixture
+def returning(request, monkeypatch):
+    monkeypatch.setattr(user_crud_module, "get_password_hash_async", _fake_hash)
+    if not request.param:
+        monkeypatch.setattr(user_crud_module, "supports_returning", lambda session, statement: False)
+        monkeypatch.setattr(log_crud_module, "supports_returning", lambda session, statement: False)
+    return request.param
+
+
+@pytest.mark.parametrize("returning, expected", [
+    (True, {"create": 1, "update": 1, "update_email": 2, "delete": 1, "bulk_create": 2, "log": 1}),
+    (False, {"create": 1, "update": 2, "update_email": 2, "delete": 2, "bulk_create": 2, "log": 2}),
+], indirect=["returning"])
+def test_write_round_trips(returning, expected):
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        counts = {}
+        async with AsyncSessionLocal() as db:
+            users = UserCRUD(db)
+            with count_statements() as statements:
+                created = await users.create_user(UserCreate(email="crud@example.com", password="secret"))
+            counts["create"] = len(statements)
+            assert (created.email, created.is_active, created.hashed_password) == ("crud@example.com", True, "hashed-secret")
+            assert created.id is not None
+
+            principal_cache.set("crud@example.com", created)
+            with count_statements() as statements:
+                updated = await users.update_user(created.id, UserUpdate(is_active=False))
+            counts["update"] = len(statements)
+            assert updated.is_active is False
+            assert "crud@example.com" not in principal_cache._data
+
+            principal_cache.set("crud@example.com", updated)
+            with count_statements() as statements:
+                renamed = await users.update_user(created.id, UserUpdate(email="renamed@example.com", password="new"))
+            counts["update_email"] = len(statements)
+            assert (renamed.email, renamed.hashed_password, renamed.is_active) == ("renamed@example.com", "hashed-new", False)
+            assert "crud@example.com" not in principal_cache._data
+
+            with count_statements() as statements:
+                deleted = await users.delete_user(created.id)
+            counts["delete"] = len(statements)
+            assert deleted.email == "renamed@example.com"
+            assert await users.get_user(created.id) is None
+            assert await users.delete_user(created.id) is None
+            assert await users.update_user(created.id, UserUpdate(is_active=True)) is None
+
+            with count_statements() as statements:
+                rows = await users.create_users([("bulk-b@example.com", "hb"), ("bulk-a@example.com", "ha")])
+            counts["bulk_create"] = len(statements)
+            assert [(row.email, row.is_active) for row in rows] == [("bulk-b@example.com", True), ("bulk-a@example.com", True)]
+            assert (await users.get_user(rows[1].id)).email == "bulk-a@example.com"
+
+            with count_statements() as statements:
+                log = await LogCRUD(db).create_log(LogCreate(level="ERROR", message="m", pathname="p", lineno=1, funcname="f"))
+            counts["log"] = len(statements)
+            assert log.id is not None and log.timestamp is not None
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+        return counts
+
+    assert asyncio.run(scenario()) == expected
@@ -0,0 +1,49 @@
+import random
+
+from app.core.common.dedup import NearDuplicateFilter
+
+
+def _text(rng, words=120):
+    vocabulary = [f"word{i}" for i in range(500)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def test_removes_near_duplicate_documents_and_counts_bytes():
+    rng = random.Random(1)
+    original = "\n\n".join(_text(rng) for _ in range(5))
+    mirror = original.replace("word1 ", "word2 ", 1) + "\n\nMirrored from docs.example.com"
+    unrelated = "\n\n".join(_text(rng) for _ in range(5))
+    dedup = NearDuplicateFilter(similarity_threshold=0.9)
+
+    result = dedup.filter([original, mirror, unrelated])
+
+    assert result == [original, unrelated]
+    assert dedup.stats()["documents_removed"] == 1
+    assert dedup.stats()["bytes_saved"] == len(mirror.encode())
+
+
+def test_removes_repeated_passages_across_pages():
+    rng = random.Random(2)
+    shared = _text(rng)
+    nav = "Home | Docs | API"
+    page_one = "\n\n".join([nav, _text(rng), shared])
+    page_two = "\n\n".join([nav, _text(rng), shared.replace("word", "Word", 3)])
+    dedup = NearDuplicateFilter(similarity_threshold=0.9)
+
+    result = dedup.filter([page_one, page_two])
+
+    assert result[0] == page_one
+    assert result[1] == page_two.split("\n\n")[1]
+    assert dedup.stats()["passages_removed"] == 2
+
+
+def test_index_compares_only_a_small_fraction_of_passage_pairs():
+    rng = random.Random(3)
+    documents = ["\n\n".join(_text(rng) for _ in range(20)) for _ in range(40)]
+    passages = sum(len(document.split("\n\n")) for document in documents)
+
+    result, counts = NearDuplicateFilter(similarity_threshold=0.9).filter_with_stats(documents)
+
+    assert len(result) == len(documents)
+    # 两两比较需要 n(n-1)/2 次，分段索引只比较共享某一段的候选指纹
+    assert counts["comparisons"] < passages * (passages - 1) / 2 / 20
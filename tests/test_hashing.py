@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.common.hashing import (
+    HashingOverloadedError, HashingPool, get_password_hash_async, verify_password_async,
+)
+
+
+def test_async_hashing_roundtrip():
+    async def scenario():
+        hashed = await get_password_hash_async("password123")
+        assert await verify_password_async("password123", hashed)
+        assert not await verify_password_async("wrong", hashed)
+
+    asyncio.run(scenario())
+
+
+def test_hashing_pool_rejects_when_overloaded():
+    async def scenario():
+        pool = HashingPool(max_workers=1, max_pending=1)
+        tasks = [asyncio.create_task(pool.run(time.sleep, 0.2)) for _ in range(3)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        pool.shutdown()
+        assert sum(isinstance(r, HashingOverloadedError) for r in results) == 1
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_hashing_pool_counts_running_job_until_it_finishes_after_cancellation():
+    async def scenario():
+        pool = HashingPool(max_workers=1, max_pending=0)
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        waiter = asyncio.create_task(pool.run(blocking))
+        await asyncio.to_thread(started.wait, 5)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # 等待方已取消，但任务仍在占用工作线程
+        assert pool.in_flight == 1
+        with pytest.raises(HashingOverloadedError):
+            await pool.run(time.sleep, 0)
+        release.set()
+        while pool.in_flight:
+            await asyncio.sleep(0.01)
+        await pool.run(time.sleep, 0)
+        pool.shutdown()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == 2 and stats["failed"] == 0
+
+
+def test_hashing_pool_counts_failures_separately():
+    def broken():
+        raise ValueError("bad hash")
+
+    async def scenario():
+        pool = HashingPool(max_workers=1, max_pending=0)
+        with pytest.raises(ValueError):
+            await pool.run(broken)
+        pool.shutdown()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1 and stats["completed"] == 0 and stats["in_flight"] == 0
+
+
+def test_hashing_pool_does_not_block_event_loop():
+    async def scenario():
+        pool = HashingPool(max_workers=2, max_pending=0)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await pool.run(time.sleep, 0.2)
+        ticker_task.cancel()
+        pool.shutdown()
+        assert ticks >= 10
+
+    asyncio.run(scenario())
+
+
+def test_hashing_pool_validates_executor_type():
+    with pytest.raises(ValueError):
+        HashingPool(max_workers=1, max_pending=0, executor_type="fiber")
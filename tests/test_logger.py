@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.database import Base
+from app.core.common.logger import DatabaseHandler
+from app.models.log import Log
+
+
+def _make_session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'logs.db'}")
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _make_logger(name, handler):
+    test_logger = logging.getLogger(name)
+    test_logger.propagate = False
+    test_logger.handlers = [handler]
+    test_logger.setLevel(logging.WARNING)
+    return test_logger
+
+
+async def _count_logs(session_factory):
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(Log))).scalar_one()
+
+
+def test_database_handler_batches_inserts(tmp_path):
+    async def scenario():
+        engine, session_factory = _make_session_factory(tmp_path)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        inserts = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, parameters, context, executemany:
+                inserts.append((statement, executemany)) if statement.startswith("INSERT") else None
+        )
+
+        handler = DatabaseHandler(session_factory, max_queue_size=100, batch_size=10, flush_interval=0.05)
+        test_logger = _make_logger("test.batches", handler)
+        handler.start()
+        for i in range(25):
+            test_logger.warning("warning %d", i)
+        await handler.stop()
+
+        assert await _count_logs(session_factory) == 25
+        assert len(inserts) == 3
+        # 每批是一条多行 INSERT，而不是 DBAPI 的 executemany
+        assert [executemany for _, executemany in inserts] == [False] * 3
+        assert inserts[0][0].count("), (") == 9
+        assert handler.stats() == {"queued": 0, "written": 25, "failed": 0, "dropped": 0}
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_database_handler_drops_when_full_and_flushes_on_stop(tmp_path):
+    async def scenario():
+        engine, session_factory = _make_session_factory(tmp_path)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        handler = DatabaseHandler(session_factory, max_queue_size=5, batch_size=100, flush_interval=60)
+        test_logger = _make_logger("test.drops", handler)
+        for i in range(8):
+            test_logger.error("error %d", i)
+        assert handler.stats()["dropped"] == 3
+
+        handler.start()
+        await handler.stop()
+
+        assert await _count_logs(session_factory) == 5
+        assert handler.stats()["queued"] == 0
+        await engine.dispose()
+
+    asyncio.run(scenario())
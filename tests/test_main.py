@@ -1,121 +1,145 @@
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import pytest
+import asyncio
+
+import httpx
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import AsyncSessionLocal, Base, engine
 from app.models.user import User
-from app.core.common.security import get_password_hash
-
-# Use a test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_sql_app.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-@pytest.fixture(name="db_session")
-def db_session_fixture():
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture(name="client")
-def client_fixture(db_session):
-    def override_get_db():
+from app.core.common.security import create_access_token, get_password_hash
+
+# 使用应用自身的异步引擎（conftest 中 DATABASE_URL 指向本地 SQLite 测试库），与应用运行时的数据库访问方式一致
+
+
+async def _add_users(*users):
+    async with AsyncSessionLocal() as db:
+        db.add_all(users)
+        await db.commit()
+    return users
+
+
+def run_with_client(scenario):
+    """
+    建表后以进程内 ASGI 客户端执行测试场景，结束后删除数据表并释放连接池。
+    所有数据库操作都在同一个事件循环中完成。
+    """
+    async def runner():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         try:
-            yield db_session
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                await scenario(client)
         finally:
-            db_session.close()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
-
-def test_create_user(client):
-    response = client.post(
-        "/users/",
-        json={"email": "test@example.com", "password": "password123"},
-    )
-    assert response.status_code == 201
-    data = response.json()
-    assert data["email"] == "test@example.com"
-    assert "id" in data
-    assert data["is_active"] is True
-
-def test_read_user(client, db_session):
-    hashed_password = get_password_hash("password123")
-    user = User(email="read@example.com", hashed_password=hashed_password)
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
-
-    # First, get a token for authentication
-    login_response = client.post(
-        "/token",
-        data={"username": "read@example.com", "password": "password123"}
-    )
-    assert login_response.status_code == 200
-    token = login_response.json()["access_token"]
-
-    response = client.get(
-        f"/users/{user.id}",
-        headers={"Authorization": f"Bearer {token}"}
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert data["email"] == "read@example.com"
-    assert data["id"] == user.id
-
-def test_read_users(client, db_session):
-    hashed_password = get_password_hash("password123")
-    user1 = User(email="user1@example.com", hashed_password=hashed_password)
-    user2 = User(email="user2@example.com", hashed_password=hashed_password)
-    db_session.add_all([user1, user2])
-    db_session.commit()
-
-    # First, get a token for authentication
-    login_response = client.post(
-        "/token",
-        data={"username": "user1@example.com", "password": "password123"}
-    )
-    assert login_response.status_code == 200
-    token = login_response.json()["access_token"]
-
-    response = client.get(
-        "/users/",
-        headers={"Authorization": f"Bearer {token}"}
-    )
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await engine.dispose()
+    asyncio.run(runner())
+
+def test_create_user():
+    async def scenario(client):
+        # 创建用户的接口需要认证，先准备一个已有用户的令牌
+        await _add_users(User(email="admin@example.com", hashed_password=get_password_hash("password123")))
+        token = create_access_token({"sub": "admin@example.com"})
+        response = await client.post(
+            "/users/",
+            json={"email": "test@example.com", "password": "password123"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+        data = response.json()["data"]
+        assert data["email"] == "test@example.com"
+        assert "id" in data
+        assert data["is_active"] is True
+    run_with_client(scenario)
+
+def test_read_user():
+    async def scenario(client):
+        hashed_password = get_password_hash("password123")
+        user, = await _add_users(User(email="read@example.com", hashed_password=hashed_password))
+
+        # First, get a token for authentication
+        login_response = await client.post(
+            "/token",
+            data={"username": "read@example.com", "password": "password123"}
+        )
+        assert login_response.status_code == 200
+        token = login_response.json()["data"]["access_token"]
+
+        response = await client.get(
+            f"/users/{user.id}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["email"] == "read@example.com"
+        assert data["id"] == user.id
+    run_with_client(scenario)
+
+def test_read_users():
+    async def scenario(client):
+        hashed_password = get_password_hash("password123")
+        await _add_users(
+            User(email="user1@example.com", hashed_password=hashed_password),
+            User(email="user2@example.com", hashed_password=hashed_password)
+        )
+
+        # First, get a token for authentication
+        login_response = await client.post(
+            "/token",
+            data={"username": "user1@example.com", "password": "password123"}
+        )
+        assert login_response.status_code == 200
+        token = login_response.json()["data"]["access_token"]
+
+        response = await client.get(
+            "/users/",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert len(data) >= 2
+        assert any(d["email"] == "user1@example.com" for d in data)
+        assert any(d["email"] == "user2@example.com" for d in data)
+    run_with_client(scenario)
+
+def test_login_for_access_token():
+    async def scenario(client):
+        hashed_password = get_password_hash("securepassword")
+        await _add_users(User(email="login@example.com", hashed_password=hashed_password))
+
+        response = await client.post(
+            "/token",
+            data={"username": "login@example.com", "password": "securepassword"}
+        )
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert "access_token" in data
+        assert data["token_type"] == "bearer"
+    run_with_client(scenario)
+
+def test_login_invalid_credentials():
+    async def scenario(client):
+        response = await client.post(
+            "/token",
+            data={"username": "nonexistent@example.com", "password": "wrongpassword"}
+        )
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Incorrect username or password"
+    run_with_client(scenario)
+
+def test_operational_stats_require_admin_token(monkeypatch):
+    from starlette.testclient import TestClient
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = TestClient(app)
+    token = create_access_token({"sub": "user@example.com"})
+    assert client.get("/llm/upstream/stats", headers={"Authorization": f"Bearer {token}"}).status_code == 404
+    assert client.get("/admin/upstream/stats").status_code == 403
+    response = client.get("/admin/upstream/stats", headers={"X-Admin-Token": "secret"})
     assert response.status_code == 200
-    data = response.json()
-    assert len(data) >= 2
-    assert any(d["email"] == "user1@example.com" for d in data)
-    assert any(d["email"] == "user2@example.com" for d in data)
-
-def test_login_for_access_token(client, db_session):
-    hashed_password = get_password_hash("securepassword")
-    user = User(email="login@example.com", hashed_password=hashed_password)
-    db_session.add(user)
-    db_session.commit()
-
-    response = client.post(
-        "/token",
-        data={"username": "login@example.com", "password": "securepassword"}
-    )
+    assert set(response.json()["data"]) == {"http", "openai"}
+    assert client.get("/llm/dedup/stats", headers={"Authorization": f"Bearer {token}"}).status_code == 404
+    assert client.get("/admin/dedup/stats").status_code == 403
+    response = client.get("/admin/dedup/stats", headers={"X-Admin-Token": "secret"})
     assert response.status_code == 200
-    data = response.json()
-    assert "access_token" in data
-    assert data["token_type"] == "bearer"
-
-def test_login_invalid_credentials(client):
-    response = client.post(
-        "/token",
-        data={"username": "nonexistent@example.com", "password": "wrongpassword"}
-    )
-    assert response.status_code == 401
-    assert response.json()["detail"] == "Incorrect username or password"
+    assert "documents_removed" in response.json()["data"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.common.metrics import (
+    MetricsRegistry,
+    http_request_duration_seconds,
+    http_requests_in_progress,
+    http_requests_total,
+    observe_upstream,
+    upstream_request_duration_seconds,
+)
+from app.core.common.middlewares import MetricsMiddleware
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+    histogram = registry.histogram("job_seconds", "Job latency.", buckets=(0.1, 1.0))
+    registry.callback_gauge("queue_depth", "Depth.", ("queue",), lambda: {("a",): 3})
+    registry.callback_counter("merged_total", "Merged.", (), lambda: {(): 7})
+    counter.inc("x")
+    counter.inc("x", amount=2)
+    counter.inc('we"ird')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{kind="x"} 3' in lines
+    assert 'jobs_total{kind="we\\"ird"} 1' in lines
+    assert 'job_seconds_bucket{le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{le="1"} 2' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 3' in lines
+    assert "job_seconds_count 3" in lines
+    assert "job_seconds_sum 5.55" in lines
+    assert 'queue_depth{queue="a"} 3' in lines
+    assert "# TYPE merged_total counter" in lines
+    assert "merged_total 7" in lines
+    with pytest.raises(ValueError):
+        registry.counter("jobs_total", "Again.")
+
+
+def test_metrics_middleware_labels_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"in_progress": http_requests_in_progress._values[("GET",)]}
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    before = http_requests_total._values.get(("GET", "/items/{item_id}", 200), 0)
+    responses = [client.get(f"/items/{i}") for i in range(3)]
+    client.get("/missing")
+
+    assert all(response.json()["in_progress"] >= 1 for response in responses)
+    assert http_requests_total._values[("GET", "/items/{item_id}", 200)] == before + 3
+    assert http_requests_total._values[("GET", "unmatched", 404)] >= 1
+    assert ("GET", "/items/1") not in http_request_duration_seconds._values
+    assert http_requests_in_progress._values[("GET",)] == 0
+
+
+def test_observe_upstream_records_outcome():
+    def count(outcome):
+        state = upstream_request_duration_seconds._values.get(("test-upstream", outcome))
+        return sum(state[0]) if state else 0
+
+    async def run():
+        async with observe_upstream("test-upstream"):
+            await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            async with observe_upstream("test-upstream"):
+                raise RuntimeError("upstream failed")
+
+    asyncio.run(run())
+    assert count("ok") == 1
+    assert count("error") == 1
+
+
+def test_metrics_endpoint_exposes_pool_gauges():
+    from app.main import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'db_pool_checked_out{database="primary"}' in response.text
+    assert 'db_pool_size{database="primary"}' in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'summarize_singleflight_calls{state="waiters"} 0' in response.text
+    assert 'hashing_pool_tasks{state="queued"} 0' in response.text
+    assert "# TYPE summarize_singleflight_total counter" in response.text
+    assert 'summarize_singleflight_total{outcome="coalesced"}' in response.text
@@ -0,0 +1,52 @@
+import logging
+
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.common.logger import db_handler
+from app.core.common.middlewares import LogMiddleware
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(3):
+            yield f"chunk-{i};"
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def boom(request):
+    raise ValueError("boom")
+
+
+def build_client(sample_rate=1.0):
+    app = Starlette(routes=[Route("/stream", stream), Route("/boom", boom)])
+    app.add_middleware(LogMiddleware, sample_rate=sample_rate)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_log_middleware_passes_streaming_response(caplog):
+    with caplog.at_level(logging.INFO):
+        response = build_client().get("/stream")
+    assert response.status_code == 200
+    assert response.text == "chunk-0;chunk-1;chunk-2;"
+    assert any("Request: GET /stream - Status: 200" in r.getMessage() for r in caplog.records)
+
+
+def test_log_middleware_sampling_skips_successful_requests(caplog):
+    with caplog.at_level(logging.INFO):
+        build_client(sample_rate=0.0).get("/stream")
+    assert not any("Request: GET /stream" in r.getMessage() for r in caplog.records)
+
+
+def test_log_middleware_captures_unhandled_exception(caplog, monkeypatch):
+    entries = []
+    monkeypatch.setattr(db_handler, "enqueue", entries.append)
+    with caplog.at_level(logging.INFO):
+        response = build_client(sample_rate=0.0).get("/boom")
+    assert response.status_code == 500
+    assert entries[0]["level"] == "ERROR"
+    assert entries[0]["pathname"] == "/boom"
+    assert "ValueError: boom" in entries[0]["exc_info"]
+    assert any("Request: GET /boom - Status: 500" in r.getMessage() for r in caplog.records)
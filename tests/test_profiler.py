@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.common.middlewares import LogMiddleware
+from app.core.common.profiler import RequestProfiler
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def waiter():
+    await asyncio.sleep(0.05)
+
+
+def build_app(profiler):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        busy(0.05)
+        await asyncio.gather(waiter(), waiter())
+        return {"ok": True}
+
+    app.add_middleware(LogMiddleware, profiler=profiler)
+    return app
+
+
+def make_profiler(tmp_path, sample_rate=0.0, max_profiles=10):
+    return RequestProfiler(
+        output_dir=str(tmp_path),
+        interval_seconds=0.001,
+        sample_rate=sample_rate,
+        paths=["/work"],
+        admin_token="secret",
+        max_profiles=max_profiles,
+        max_active=2,
+    )
+
+
+async def _get(app, headers=None):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/work", headers=headers)
+
+
+def test_profile_triggered_by_admin_header_records_cpu_and_await_stacks(tmp_path):
+    profiler = make_profiler(tmp_path)
+    response = asyncio.run(_get(build_app(profiler), {"X-Profile": "secret"}))
+    assert response.status_code == 200
+
+    profile_id = response.headers["x-profile-id"]
+    [profile] = profiler.list_profiles()
+    assert profile["id"] == profile_id
+    assert profile["trigger"] == "header"
+    assert profile["samples"] > 0
+    with open(profiler.path_for(profile_id), encoding="utf-8") as f:
+        stacks = f.read().splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    # 运行中的栈和子任务挂起时的 await 栈都被记录
+    assert any("busy (test_profiler.py" in line for line in stacks)
+    assert any("waiter (test_profiler.py" in line and "<await" in line for line in stacks)
+
+
+def test_profile_not_triggered_without_valid_header(tmp_path):
+    profiler = make_profiler(tmp_path)
+    app = build_app(profiler)
+    assert "x-profile-id" not in asyncio.run(_get(app)).headers
+    assert "x-profile-id" not in asyncio.run(_get(app, {"X-Profile": "wrong"})).headers
+    assert profiler.list_profiles() == []
+
+
+def test_sampled_profiles_keep_only_most_recent(tmp_path):
+    profiler = make_profiler(tmp_path, sample_rate=1.0, max_profiles=2)
+    app = build_app(profiler)
+    ids = [asyncio.run(_get(app)).headers["x-profile-id"] for _ in range(3)]
+    assert [profile["id"] for profile in profiler.list_profiles()] == ids[:0:-1]
+    assert profiler.path_for(ids[0]) is None
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(f"{i}.collapsed" for i in ids[1:])
+
+
+def test_admin_profile_endpoints_require_admin_token(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.core.common import profiler as profiler_module
+    from app.main import app
+
+    profile_file = tmp_path / "abc.collapsed"
+    profile_file.write_text("main;work 3\n")
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiler_module.request_profiler, "profiles", {"abc": {"id": "abc", "file": str(profile_file)}})
+    client = TestClient(app)
+
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    listed = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"})
+    assert listed.json()["data"][0]["id"] == "abc"
+    downloaded = client.get("/admin/profiles/abc", headers={"X-Admin-Token": "secret"})
+    assert downloaded.text == "main;work 3\n"
+    assert client.get("/admin/profiles/missing", headers={"X-Admin-Token": "secret"}).status_code == 404
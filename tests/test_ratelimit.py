@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.common.middlewares import RateLimitMiddleware
+from app.core.common.ratelimit import AdmissionRejected, ConcurrencyLimiter, TokenBucketLimiter, parse_admission_limits
+from app.core.common.security import create_access_token
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_over_time():
+    timer = FakeTimer()
+    limiter = TokenBucketLimiter(rate=2, burst=3, max_keys=10, idle_seconds=60, timer=timer)
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    assert limiter.acquire("b") == 0.0 # 各键独立计数
+    timer.now = 0.5
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+    assert limiter.stats()["rejected"] == 2
+
+
+def test_token_bucket_evicts_idle_and_least_recent_keys():
+    timer = FakeTimer()
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_keys=3, idle_seconds=10, timer=timer)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    limiter.acquire("a")
+    limiter.acquire("d") # 超出 max_keys，淘汰最久未使用的 b
+    assert len(limiter) == 3 and limiter.evictions == 1
+    timer.now = 10.5
+    limiter.acquire("e") # 其余键均已空闲超过 idle_seconds
+    assert len(limiter) == 1
+    assert limiter.evictions == 4
+
+
+def test_concurrency_limiter_queues_and_hands_over_slots():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 1
+        with pytest.raises(AdmissionRejected): # 队列已满
+            await limiter.acquire()
+        limiter.release(0.1)
+        await waiting
+        assert limiter.in_flight == 1 and limiter.queued == 0
+        limiter.release(0.1)
+        assert limiter.in_flight == 0
+        assert limiter.stats()["shed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_sheds_when_deadline_would_be_exceeded():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=10, queue_timeout=0.05)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected): # 排队超时
+            await limiter.acquire()
+        assert limiter.timed_out == 1 and limiter.queued == 0
+        limiter.release(5.0) # 超时的等待者被跳过，名额归还
+        assert limiter.in_flight == 0
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as excinfo: # 按平均处理时长估算需要等待约5秒，直接拒绝
+            await limiter.acquire()
+        assert excinfo.value.retry_after == pytest.approx(5.0)
+        assert limiter.timed_out == 1 and limiter.shed == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limiter_returns_slot_handed_over_as_deadline_fires(monkeypatch):
+    async def wait_for_that_times_out_late(waiter, timeout):
+        # 模拟 Python 3.12+：名额在超时的同一轮事件循环中交给等待者，wait_for 仍然抛出 TimeoutError
+        await asyncio.sleep(0)
+        assert waiter.done()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        monkeypatch.setattr(asyncio, "wait_for", wait_for_that_times_out_late)
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(0.1)
+        with pytest.raises(AdmissionRejected):
+            await waiting
+        assert limiter.in_flight == 0 and limiter.queued == 0
+        monkeypatch.undo()
+        await limiter.acquire() # 名额没有丢失
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_parse_admission_limits():
+    assert parse_admission_limits("/llm/chat=4, /llm/summarize=2,") == {"/llm/chat": 4, "/llm/summarize": 2}
+
+
+def build_client(limiter, user_limiter=None, ip_limiter=None):
+    release = asyncio.Event()
+
+    async def stream(request):
+        async def chunks():
+            yield "a"
+            await release.wait()
+            yield "b"
+        return StreamingResponse(chunks())
+
+    async def fast(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/stream", stream), Route("/fast", fast), Route("/open", fast)])
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiters={"/stream": limiter, "/fast": limiter},
+        user_limiter=user_limiter,
+        ip_limiter=ip_limiter,
+    )
+    return TestClient(app), release
+
+
+def test_middleware_rate_limits_by_ip_and_user():
+    timer = FakeTimer()
+    client, _ = build_client(
+        ConcurrencyLimiter(4, 4, 1),
+        user_limiter=TokenBucketLimiter(rate=1, burst=1, max_keys=10, idle_seconds=60, timer=timer),
+        ip_limiter=TokenBucketLimiter(rate=1, burst=3, max_keys=10, idle_seconds=60, timer=timer),
+    )
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice@example.com'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob@example.com'})}"}
+    assert client.get("/fast", headers=alice).status_code == 200
+    response = client.get("/fast", headers=alice)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/fast", headers=bob).status_code == 200
+    assert client.get("/fast", headers={"Authorization": "Bearer invalid"}).status_code == 429 # 令牌无效时只按IP计数
+    assert client.get("/open").status_code == 200 # 未配置的路径不限流
+
+
+def test_middleware_sheds_load_with_503_and_holds_slot_for_streams():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=0, queue_timeout=1)
+    client, release = build_client(limiter)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            streaming = asyncio.create_task(http.get("/stream"))
+            while limiter.in_flight == 0:
+                await asyncio.sleep(0.001)
+            rejected = await http.get("/fast") # 流式响应发送期间一直占用名额
+            assert rejected.status_code == 503
+            assert rejected.headers["retry-after"] == "1"
+            release.set()
+            assert (await streaming).text == "ab"
+            assert limiter.in_flight == 0
+            assert (await http.get("/fast")).status_code == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+from app.core.common.relevance import BM25Index, select_passages, tokenize
+
+
+def test_tokenize_splits_words_and_cjk_bigrams():
+    assert tokenize("Pool_Size in SQLAlchemy 2.0") == ["pool_size", "in", "sqlalchemy", "2.0"]
+    assert tokenize("连接池配置") == ["连接", "接池", "池配", "配置"]
+
+
+def test_bm25_ranks_passages_containing_rare_query_terms_higher():
+    index = BM25Index([
+        "the cat sat on the mat",
+        "connection pool size controls database connections",
+        "the weather is nice today",
+    ])
+
+    scores = index.scores("database pool size")
+
+    assert scores[1] > 0
+    assert scores[0] == scores[2] == 0
+
+
+def test_select_passages_drops_boilerplate_and_respects_budget():
+    documents = [
+        "[Home](/)\n\nConfigure the pool size of the database engine.\n\nUnrelated text about billing.\n\n© 2024 Example",
+        "Pricing page\n\nThe database pool grows up to max overflow connections.",
+        "Nothing relevant here at all.",
+    ]
+
+    filtered, stats = select_passages(documents, "database pool size", budget_tokens=100, passage_tokens=50)
+
+    assert filtered == [
+        "Configure the pool size of the database engine.",
+        "The database pool grows up to max overflow connections.",
+    ]
+    assert stats["kept_passages"] == 2
+    assert stats["kept_tokens"] < stats["original_tokens"]
+
+    filtered, stats = select_passages(documents, "database pool size", budget_tokens=14, passage_tokens=50)
+    assert filtered == ["Configure the pool size of the database engine."]
+
+
+def test_select_passages_keeps_documents_when_nothing_matches():
+    documents = ["alpha beta", "gamma delta"]
+
+    filtered, stats = select_passages(documents, "unrelated", budget_tokens=100, passage_tokens=50)
+
+    assert filtered == documents
+    assert stats["kept_tokens"] == stats["original_tokens"]
@@ -0,0 +1,146 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.database import Base, ReplicaSet, RoutingSession, create_engine_for, use_primary
+from app.crud import user as user_crud_module
+from app.crud.user import UserCRUD
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+
+async def _create_database(engine, email):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        db.add(User(email=email, hashed_password="x"))
+        await db.commit()
+
+
+def _sessionmaker(primary, replicas):
+    return async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=replicas,
+        expire_on_commit=False,
+    )
+
+
+async def _who_answers(session_factory):
+    """
+    每个数据库文件中只有一个用户，返回会话读到的用户邮箱，以此判断读操作被路由到了哪个库。
+    """
+    async with session_factory() as db:
+        users = await UserCRUD(db).get_users(limit=10)
+        return [user.email for user in users]
+
+
+def test_reads_round_robin_across_replicas_and_writes_stick_to_primary(tmp_path, monkeypatch):
+    async def fake_hash(password):
+        return "hashed"
+
+    monkeypatch.setattr(user_crud_module, "get_password_hash_async", fake_hash)
+
+    async def scenario():
+        primary = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        replica_a = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'replica_a.db'}")
+        replica_b = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'replica_b.db'}")
+        await _create_database(primary, "primary@example.com")
+        await _create_database(replica_a, "a@example.com")
+        await _create_database(replica_b, "b@example.com")
+        replicas = ReplicaSet([replica_a, replica_b], unhealthy_seconds=60)
+        session_factory = _sessionmaker(primary, replicas)
+
+        reads = [await _who_answers(session_factory) for _ in range(4)]
+
+        async with session_factory() as db:
+            users = UserCRUD(db)
+            sticky = [(await users.get_user(1)).email, (await users.get_user(1)).email]
+            created = await users.create_user(UserCreate(email="new@example.com", password="pw"))
+            # 写入后同一会话的读操作走主库，能读到刚写入的数据
+            after_write = await users.get_user_by_email("new@example.com")
+
+        async with session_factory() as db:
+            use_primary(db)
+            forced = [user.email for user in await UserCRUD(db).get_users()]
+
+        for engine in (primary, replica_a, replica_b):
+            await engine.dispose()
+        return reads, sticky, created, after_write, forced, replicas.stats()
+
+    reads, sticky, created, after_write, forced, stats = asyncio.run(scenario())
+
+    assert reads == [["a@example.com"], ["b@example.com"], ["a@example.com"], ["b@example.com"]]
+    assert sticky == ["a@example.com", "a@example.com"]
+    assert after_write is not None and after_write.id == created.id
+    assert forced == ["primary@example.com", "new@example.com"]
+    assert [replica["selected"] for replica in stats] == [3, 2]
+
+
+def test_unreachable_replica_is_skipped_until_it_recovers(tmp_path):
+    async def scenario():
+        primary = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        broken = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        healthy = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+        await _create_database(primary, "primary@example.com")
+        await _create_database(healthy, "replica@example.com")
+        replicas = ReplicaSet([broken, healthy], unhealthy_seconds=60)
+        session_factory = _sessionmaker(primary, replicas)
+
+        # 第一次读被路由到不可用的副本，连接失败后自动在健康的副本上重试
+        first = await _who_answers(session_factory)
+        after_failure = [await _who_answers(session_factory) for _ in range(3)]
+
+        # 只有一个无法连接的副本时，重试改读主库
+        only_broken = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'other.db'}")
+        falls_back_to_primary = await _who_answers(_sessionmaker(primary, ReplicaSet([only_broken], unhealthy_seconds=60)))
+
+        replicas.mark_unhealthy(healthy)
+        all_down = await _who_answers(session_factory)
+
+        for engine in (primary, broken, healthy, only_broken):
+            await engine.dispose()
+        return first, after_failure, falls_back_to_primary, all_down, replicas.stats()
+
+    first, after_failure, falls_back_to_primary, all_down, stats = asyncio.run(scenario())
+
+    assert first == ["replica@example.com"]
+    assert after_failure == [["replica@example.com"]] * 3
+    assert falls_back_to_primary == ["primary@example.com"]
+    # 所有副本都不可用时回退到主库
+    assert all_down == ["primary@example.com"]
+    assert [replica["healthy"] for replica in stats] == [False, False]
+    assert stats[0]["failures"] == 1
+
+
+def test_principal_lookup_reads_primary_on_cache_miss(tmp_path):
+    from app.core.common.cache import principal_cache
+    from app.core.common.security import create_access_token, get_current_user
+
+    async def scenario():
+        primary = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        replica = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+        await _create_database(primary, "fresh@example.com")
+        await _create_database(replica, "fresh@example.com")
+        # 副本尚未同步主库上的停用操作
+        async with AsyncSession(primary) as db:
+            (await db.get(User, 1)).is_active = False
+            await db.commit()
+        session_factory = _sessionmaker(primary, ReplicaSet([replica], unhealthy_seconds=60))
+        principal_cache.clear()
+        try:
+            async with session_factory() as db:
+                users = UserCRUD(db)
+                user = await get_current_user(token=create_access_token({"sub": "fresh@example.com"}), user_crud=users)
+                # 只有这次查询读主库，请求中的其他读操作仍走副本
+                later = await users.get_user(1)
+        finally:
+            principal_cache.clear()
+            for engine in (primary, replica):
+                await engine.dispose()
+        return user, later
+
+    user, later = asyncio.run(scenario())
+    assert user.is_active is False
+    assert later.is_active is True
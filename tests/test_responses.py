@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import ValidationError
+
+from app.models.user import User
+from app.schemas.common.base import BaseResponse, EnvelopeResponse, attributes_of, render_envelope, response_adapter
+from app.schemas.user import UserBulkCreateResponse, UserBulkItemResult, UserResponse
+
+
+def _users(count):
+    return [User(id=i, email=f"user{i}@example.com", hashed_password="x", is_active=i % 2 == 0) for i in range(count)]
+
+
+def _via_response_model(content, model):
+    """
+    FastAPI 按 response_model 校验并序列化的结果，作为对照。
+    """
+    field = create_response_field(name="Response", type_=model)
+    return asyncio.run(serialize_response(field=field, response_content=content))
+
+
+def test_fast_paths_match_response_model_output():
+    users = _users(3)
+    expected = _via_response_model(BaseResponse(data=users), BaseResponse[list[UserResponse]])
+
+    assert json.loads(render_envelope(users, list[UserResponse])) == expected
+    trusted = render_envelope(attributes_of(users, UserResponse), trusted=True)
+    assert json.loads(trusted) == expected
+    assert list(json.loads(trusted)["data"][0]) == list(expected["data"][0])
+
+
+def test_trusted_path_serializes_constructed_models():
+    result = UserBulkCreateResponse(created=1, conflicts=1, results=[
+        UserBulkItemResult(index=0, email="a@example.com", status="created",
+                           user=UserResponse.model_construct(id=1, email="a@example.com", is_active=True)),
+        UserBulkItemResult(index=1, email="a@example.com", status="conflict", detail="Duplicate email in request"),
+    ])
+    expected = _via_response_model(BaseResponse(data=result), BaseResponse[UserBulkCreateResponse])
+    assert json.loads(render_envelope(result, trusted=True)) == expected
+
+
+def test_untrusted_path_validates_and_caches_adapter():
+    assert response_adapter(UserResponse) is response_adapter(UserResponse)
+    with pytest.raises(ValidationError):
+        render_envelope({"id": "not-a-number", "email": "a@example.com", "is_active": True}, UserResponse)
+
+
+def test_envelope_response_sets_status_and_headers():
+    response = EnvelopeResponse(_users(1)[0], UserResponse, status_code=201, headers={"X-Next-Cursor": "abc"})
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-next-cursor"] == "abc"
+    assert json.loads(response.body) == {
+        "code": 200, "message": "Success", "data": {"email": "user0@example.com", "id": 0, "is_active": True}
+    }
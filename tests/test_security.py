@@ -0,0 +1,57 @@
+import asyncio
+
+from sqlalchemy import event
+
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common.cache import principal_cache
+from app.core.common.security import create_access_token, get_current_user
+from app.core.scopes import request_scope
+from app.crud.user import UserCRUD
+from app.models.user import User
+from app.schemas.user import UserUpdate
+
+
+async def _authenticate(token):
+    async with request_scope():
+        return await get_current_user(token=token, user_crud=app.state.injector.get(UserCRUD))
+
+
+def test_get_current_user_caches_principal_until_update():
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            user = User(email="cached@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+        principal_cache.clear()
+
+        selects = []
+        listener = lambda conn, cursor, statement, *args: selects.append(statement) if statement.startswith("SELECT") else None
+        event.listen(engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            token = create_access_token({"sub": "cached@example.com"})
+            first = await _authenticate(token)
+            second = await _authenticate(token)
+            assert first.email == second.email == "cached@example.com"
+            assert len(selects) == 1
+
+            async with request_scope():
+                await app.state.injector.get(UserCRUD).update_user(user.id, UserUpdate(is_active=False))
+            assert principal_cache.get("cached@example.com") is None
+
+            selects.clear()
+            third = await _authenticate(token)
+            assert third.is_active is False
+            assert len(selects) == 1
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", listener)
+            principal_cache.clear()
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+from sqlalchemy import event
+
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common.security import create_access_token
+from app.core.scopes import request_scope
+from app.crud.user import UserCRUD
+from app.models.user import User
+
+PARALLEL = 5
+
+
+async def _setup_users():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all([User(email=f"pool{i}@example.com", hashed_password="x") for i in range(PARALLEL)])
+        await db.commit()
+
+
+async def _teardown():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def test_parallel_requests_use_separate_pooled_sessions():
+    async def scenario():
+        await _setup_users()
+        checkouts = []
+        listener = lambda dbapi_conn, record, proxy: checkouts.append(id(dbapi_conn))
+        event.listen(engine.sync_engine.pool, "checkout", listener)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def list_users(i):
+                    token = create_access_token({"sub": f"pool{i}@example.com"})
+                    return await client.get("/users/", headers={"Authorization": f"Bearer {token}"})
+                responses = await asyncio.gather(*(list_users(i) for i in range(PARALLEL)))
+        finally:
+            event.remove(engine.sync_engine.pool, "checkout", listener)
+
+        for response in responses:
+            assert response.status_code == 200
+            assert len(response.json()["data"]) == PARALLEL
+        # 每个请求一个会话，认证和查询共用该会话的同一连接，请求结束后全部归还
+        assert len(checkouts) == PARALLEL
+        assert engine.sync_engine.pool.checkedout() == 0
+        await _teardown()
+
+    asyncio.run(scenario())
+
+
+def test_request_scopes_hold_independent_connections():
+    async def scenario():
+        await _setup_users()
+        injector = app.state.injector
+        barrier = asyncio.Barrier(PARALLEL)
+        peak = []
+
+        async def handle(i):
+            async with request_scope():
+                user_crud = injector.get(UserCRUD)
+                assert injector.get(UserCRUD) is user_crud
+                user = await user_crud.get_user_by_email(f"pool{i}@example.com")
+                assert user.email == f"pool{i}@example.com"
+                await barrier.wait()
+                peak.append(engine.sync_engine.pool.checkedout())
+                await barrier.wait()
+                return id(user_crud.db)
+
+        session_ids = await asyncio.gather(*(handle(i) for i in range(PARALLEL)))
+
+        assert len(set(session_ids)) == PARALLEL
+        assert max(peak) == PARALLEL
+        assert engine.sync_engine.pool.checkedout() == 0
+        await _teardown()
+
+    asyncio.run(scenario())
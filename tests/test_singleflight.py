@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.core.common.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+
+    assert calls == 1
+    assert results == ["result"] * 5
+    assert flight.stats() == {"in_flight": 0, "waiters": 0, "executions": 1, "coalesced": 4}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        assert flight.stats()["waiters"] == 2
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert flight.stats()["waiters"] == 1
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_shared_work_is_cancelled_when_all_waiters_leave():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do("key", work))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        return flight
+
+    assert asyncio.run(scenario()).stats()["in_flight"] == 0
+
+
+def test_exceptions_are_shared_and_key_is_released():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        retry = await flight.do("key", lambda: asyncio.sleep(0, result="ok"))
+        return results, retry
+
+    results, retry = asyncio.run(scenario())
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retry == "ok"
+
+
+def test_caller_arriving_while_cancelled_work_winds_down_starts_fresh():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow_cleanup():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                await asyncio.sleep(0.01) # 取消后的清理跨越多轮事件循环
+
+        async def fresh():
+            return "fresh"
+
+        waiter = asyncio.create_task(flight.do("key", slow_cleanup))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert "key" not in flight
+        return await flight.do("key", fresh)
+
+    assert asyncio.run(scenario()) == "fresh"
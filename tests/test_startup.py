@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import text
+
+from app.core.common.logger import db_handler, setup_logging
+from app.core.database import (
+    SchemaVersionError, check_schema, create_engine_for, create_schema, init_schema, record_schema_version,
+    schema_fingerprint
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_does_not_load_heavy_clients():
+    code = "import sys, app.main; print(sorted(m for m in ('httpx', 'openai', 'passlib') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_setup_logging_adds_handlers_once():
+    root = logging.getLogger()
+    saved = root.handlers[:]
+    root.handlers = []
+    try:
+        setup_logging()
+        setup_logging()
+        assert root.handlers.count(db_handler) == 1
+        assert len(root.handlers) == 2
+    finally:
+        root.handlers = saved
+
+
+def test_schema_check_requires_recorded_matching_version(tmp_path):
+    engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+
+    async def scenario():
+        try:
+            with pytest.raises(SchemaVersionError, match="not recorded"):
+                await check_schema(engine)
+            await create_schema(engine)
+            await create_schema(engine) # 重复执行时只保留一行版本记录
+            await check_schema(engine)
+            async with engine.begin() as conn:
+                assert (await conn.execute(text("SELECT version FROM schema_version"))).scalars().all() == [
+                    schema_fingerprint(engine)
+                ]
+                await conn.execute(text("UPDATE schema_version SET version = 'outdated'"))
+            with pytest.raises(SchemaVersionError, match="does not match"):
+                await init_schema("check", engine)
+            await init_schema("skip", engine)
+            with pytest.raises(ValueError):
+                await init_schema("migrate", engine)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_create_mode_does_not_record_version_for_existing_tables(tmp_path):
+    engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+
+    async def scenario():
+        try:
+            async with engine.begin() as conn:
+                # 旧版本的 users 表，缺少 is_active 列，create_all 不会补上
+                await conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR, hashed_password VARCHAR)"))
+            await create_schema(engine)
+            with pytest.raises(SchemaVersionError, match="migrate"):
+                await check_schema(engine)
+            await record_schema_version(engine) # 迁移完成后记录版本
+            await check_schema(engine)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,160 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.core.clients import upstream_clients
+from app.core.common.security import get_current_user
+from app.main import app
+from app.schemas.llm import ChatMessage, ChatRequest
+from app.services.llm import LLMService
+from app.services.websummary import WebSummarizerService
+
+
+class FakeStream:
+    """
+    模拟 openai AsyncStream：逐个产出增量，记录是否被关闭。
+    """
+    def __init__(self, deltas, delay=0.0):
+        self.deltas = deltas
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for delta in self.deltas:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_client(stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_chat_stream_relays_deltas_and_closes_upstream_when_consumer_leaves():
+    async def scenario():
+        stream = FakeStream(["Hel", "lo", None, "!"])
+        service = LLMService(_fake_client(stream))
+        request = ChatRequest(messages=[ChatMessage(role="user", content="hi")], stream=True)
+        assert [delta async for delta in service.chat_stream(request)] == ["Hel", "lo", "!"]
+        assert stream.closed
+
+        stream = FakeStream(["a", "b", "c"], delay=0.01)
+        service.client = _fake_client(stream)
+        deltas = service.chat_stream(request)
+        assert await deltas.__anext__() == "a"
+        await deltas.aclose() # 模拟客户端断开
+        assert stream.closed
+
+    asyncio.run(scenario())
+
+
+def test_summarize_endpoint_streams_stage_and_token_events(monkeypatch):
+    async def fake_search(self, urls, query):
+        return ["https://a.test/1", "https://a.test/2"]
+
+    async def fake_extract(self, links):
+        return ["page one", "page two"]
+
+    async def fake_summarize_stream(self, combined_content, query):
+        for delta in ["Sum", "mary"]:
+            yield delta
+
+    monkeypatch.setattr(WebSummarizerService, "search_urls_for_query", fake_search)
+    monkeypatch.setattr(WebSummarizerService, "extract_content_from_links", fake_extract)
+    monkeypatch.setattr(WebSummarizerService, "summarize_combined_content_stream", fake_summarize_stream)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/summarize_urls_with_query",
+            json={"urls": ["https://a.test"], "query": "what", "stream": True},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == [
+        "event: stage", "event: stage", "event: stage", "event: stage", "event: token", "event: token", "event: done",
+    ]
+    assert events[0][1] == 'data: {"stage": "search", "links": 2}'
+    assert events[1][1] == 'data: {"stage": "extract", "pages": 2}'
+    assert events[2][1] == 'data: {"stage": "filter", "original_tokens": 4, "kept_tokens": 4}'
+    assert events[4][1] == 'data: {"content": "Sum"}'
+
+
+async def _stream_then_disconnect(path, payload, events_before_disconnect=2):
+    """
+    直接以 ASGI 调用流式接口，收到指定数量的数据块后发送 http.disconnect，模拟客户端断开。
+    返回断开前收到的数据块；接口必须在断开后及时结束。
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 12345), "server": ("test", 80),
+    }
+    disconnected = asyncio.Event()
+    requested = False
+    chunks = []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            if len(chunks) >= events_before_disconnect:
+                disconnected.set()
+
+    await asyncio.wait_for(app(scope, receive, send), timeout=2)
+    return chunks
+
+
+def test_client_disconnect_closes_upstream_chat_stream_through_middlewares(monkeypatch):
+    stream = FakeStream(["x"] * 1000, delay=0.01) # 不断开的话需要约10秒才能发送完
+    monkeypatch.setattr(upstream_clients, "_openai", _fake_client(stream))
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: SimpleNamespace(email="user@example.com"))
+
+    chunks = asyncio.run(_stream_then_disconnect(
+        "/llm/chat", {"messages": [{"role": "user", "content": "hi"}], "stream": True}
+    ))
+
+    assert chunks[0].startswith(b"event: token")
+    assert stream.closed
+
+
+def test_client_disconnect_closes_upstream_summarize_stream_through_middlewares(monkeypatch):
+    async def fake_search(self, urls, query):
+        return ["https://a.test/1"]
+
+    async def fake_extract(self, links):
+        return ["page one"]
+
+    stream = FakeStream(["x"] * 1000, delay=0.01)
+    monkeypatch.setattr(upstream_clients, "_openai", _fake_client(stream))
+    monkeypatch.setattr(WebSummarizerService, "search_urls_for_query", fake_search)
+    monkeypatch.setattr(WebSummarizerService, "extract_content_from_links", fake_extract)
+
+    chunks = asyncio.run(_stream_then_disconnect(
+        "/llm/summarize_urls_with_query", {"urls": ["https://a.test"], "query": "what", "stream": True},
+        events_before_disconnect=6,
+    ))
+
+    assert b"event: token" in chunks[-1]
+    assert stream.closed
@@ -0,0 +1,33 @@
+from app.core.common import tokens
+from app.core.common.tokens import estimate_tokens, split_into_chunks
+
+
+def test_estimate_tokens_counts_cjk_characters_individually(monkeypatch):
+    # 精确计数随 tiktoken 是否安装而变化，这里只验证未安装时的估算规则
+    monkeypatch.setattr(tokens, "_encoding", lambda: None)
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("中文内容") == 4
+
+
+def test_split_into_chunks_keeps_short_text_whole():
+    text = "first paragraph\n\nsecond paragraph"
+    assert split_into_chunks(text, max_tokens=100) == ["first paragraph\n\nsecond paragraph"]
+
+
+def test_split_into_chunks_respects_budget_and_overlap():
+    paragraphs = [f"paragraph {i} " + "x" * 36 for i in range(10)]  # 每段约 12 token
+    chunks = split_into_chunks("\n\n".join(paragraphs), max_tokens=40, overlap_tokens=12)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split("\n\n")[-1] == current.split("\n\n")[0]
+    assert all(any(p in chunk for chunk in chunks) for p in paragraphs)
+
+
+def test_split_into_chunks_hard_splits_oversized_sentences():
+    chunks = split_into_chunks("y" * 1000, max_tokens=50)
+
+    assert "".join(chunks) == "y" * 1000
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import tracemalloc
+
+import httpx
+import pytest
+
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.common.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.core.common.security import create_access_token
+from app.models.user import User
+
+
+async def _setup_users(count):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all([User(email=f"user{i}@example.com", hashed_password="x") for i in range(count)])
+        await db.commit()
+
+
+async def _teardown():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def _client():
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0@example.com'})}"}
+    return httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(42)) == 42
+    for bad in ["", "not-a-cursor", encode_cursor(1)[:-2], "eyJ2IjoyLCJhZnRlciI6MX0"]:
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(bad)
+
+
+def test_list_users_follows_cursors_across_pages():
+    async def scenario():
+        await _setup_users(25)
+        pages = []
+        async with _client() as client:
+            params = {"limit": 10}
+            while True:
+                response = await client.get("/users/", params=params)
+                assert response.status_code == 200
+                pages.append([user["email"] for user in response.json()["data"]])
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+                params = {"limit": 10, "cursor": cursor}
+            invalid = await client.get("/users/", params={"cursor": "garbage"})
+        await _teardown()
+        return pages, invalid
+
+    pages, invalid = asyncio.run(scenario())
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"user{i}@example.com" for i in range(25)]
+    assert invalid.status_code == 400
+
+
+async def _export_via_asgi(token):
+    """
+    直接以 ASGI 调用导出接口，发送的数据块只计数不保留（httpx.ASGITransport 会在客户端缓存整个响应体）。
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/users/export", "raw_path": b"/users/export",
+        "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 12345), "server": ("test", 80),
+    }
+    state = {"status": None, "content_type": None, "lines": 0, "last": b"", "peak": 0}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait() # 客户端保持连接，直到响应结束后被取消
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+            state["content_type"] = dict(message["headers"])[b"content-type"]
+        elif message.get("body"):
+            body = message["body"]
+            state["lines"] += body.count(b"\n")
+            state["last"] = body.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            state["peak"] = max(state["peak"], tracemalloc.get_traced_memory()[0])
+
+    await app(scope, receive, send)
+    return state
+
+
+def test_export_streams_all_users_as_ndjson_in_constant_memory(monkeypatch):
+    from app.core.config import settings
+    from app.crud.user import UserCRUD
+
+    monkeypatch.setattr(settings, "USER_EXPORT_CHUNK_SIZE", 100)
+    token = create_access_token({"sub": "user0@example.com"})
+    partitions = []
+    original_stream = UserCRUD.stream_users
+
+    async def recording_stream(self, chunk_size):
+        async for partition in original_stream(self, chunk_size):
+            partitions.append(len(partition))
+            yield partition
+
+    monkeypatch.setattr(UserCRUD, "stream_users", recording_stream)
+
+    async def scenario():
+        results = {}
+        for count in (1000, 5000):
+            await _setup_users(count)
+            partitions.clear()
+            tracemalloc.start()
+            try:
+                results[count] = await _export_via_asgi(token)
+                results[count]["partitions"] = partitions[:]
+            finally:
+                tracemalloc.stop()
+        await _teardown()
+        return results
+
+    results = asyncio.run(scenario())
+
+    small, large = results[1000], results[5000]
+    assert small["status"] == 200
+    assert small["content_type"] == b"application/x-ndjson"
+    assert small["lines"] == 1000
+    assert json.loads(small["last"]) == {"id": 1000, "email": "user999@example.com", "is_active": True}
+    assert large["lines"] == 5000
+    # 行按 yield_per 分批从游标读取，而不是一次性加载
+    assert large["partitions"] == [100] * 50
+    # 行数增加 5 倍，峰值内存不应随之成倍增长；留出余量以免受分配器和 GC 时机影响
+    assert large["peak"] < small["peak"] * 3
+
+
+def test_bulk_create_reports_created_and_conflicting_items(monkeypatch):
+    from app.crud.user import UserCRUD
+
+    monkeypatch.setattr("app.services.user.get_password_hash", lambda password: f"hashed-{password}")
+    lookups = []
+    original_lookup = UserCRUD.get_existing_emails
+
+    async def counting_lookup(self, emails):
+        lookups.append(list(emails))
+        return await original_lookup(self, emails)
+
+    monkeypatch.setattr(UserCRUD, "get_existing_emails", counting_lookup)
+
+    async def scenario():
+        await _setup_users(2)
+        async with _client() as client:
+            response = await client.post("/users/bulk", json=[
+                {"email": "new1@example.com", "password": "a"},
+                {"email": "user1@example.com", "password": "b"},
+                {"email": "new2@example.com", "password": "c"},
+                {"email": "new1@example.com", "password": "d"},
+            ])
+        async with AsyncSessionLocal() as db:
+            stored = {user.email: user.hashed_password for user in (await db.execute(User.__table__.select())).all()}
+        await _teardown()
+        return response, stored
+
+    response, stored = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert (data["created"], data["conflicts"]) == (2, 2)
+    assert [(item["index"], item["status"]) for item in data["results"]] == [
+        (0, "created"), (1, "conflict"), (2, "created"), (3, "conflict"),
+    ]
+    assert data["results"][0]["user"]["email"] == "new1@example.com"
+    assert data["results"][2]["user"]["id"] == data["results"][0]["user"]["id"] + 1
+    assert stored["new1@example.com"] == "hashed-a"
+    assert lookups == [["new1@example.com", "user1@example.com", "new2@example.com"]]
+
+
+def test_bulk_create_retries_after_concurrent_registration(monkeypatch):
+    from app.crud.user import UserCRUD
+
+    monkeypatch.setattr("app.services.user.get_password_hash", lambda password: "hashed")
+    original_lookup = UserCRUD.get_existing_emails
+    calls = 0
+
+    async def stale_first_lookup(self, emails):
+        nonlocal calls
+        calls += 1
+        # 第一次检查时另一个请求尚未提交，模拟检查与插入之间的竞争
+        return set() if calls == 1 else await original_lookup(self, emails)
+
+    monkeypatch.setattr(UserCRUD, "get_existing_emails", stale_first_lookup)
+
+    async def scenario():
+        await _setup_users(1)
+        async with _client() as client:
+            response = await client.post("/users/bulk", json=[
+                {"email": "user0@example.com", "password": "a"},
+                {"email": "fresh@example.com", "password": "b"},
+            ])
+        await _teardown()
+        return response
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["data"]["results"]] == ["conflict", "created"]
@@ -0,0 +1,362 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import httpx
+import pytest
+
+from app.core.common.cache import TTLCache
+from app.core.common.content_cache import ContentCache
+from app.services.websummary import WebSummarizerService
+
+
+class FakeJinaReader(BaseHTTPRequestHandler):
+    """
+    本地 JinaAI Reader 替身：路径形如 /https://host/<behaviour>-<n>。
+    slow-* 延迟后返回内容，fail-* 始终 500，flaky-* 首次 500 之后成功，hang-* 长时间不响应。
+    """
+    latency = 0.3
+    lock = threading.Lock()
+    attempts = defaultdict(int)
+    active = defaultdict(int)
+    peak = defaultdict(int)
+
+    def do_GET(self):
+        target = urlparse(self.path[1:])
+        behaviour = target.path.strip("/")
+        with self.lock:
+            self.attempts[behaviour] += 1
+            attempt = self.attempts[behaviour]
+            for key in (target.netloc, "*"): # "*" 统计所有站点合计的并发请求数
+                self.active[key] += 1
+                self.peak[key] = max(self.peak[key], self.active[key])
+        try:
+            if behaviour.startswith("hang"):
+                time.sleep(2)
+            else:
+                time.sleep(self.latency)
+            if behaviour.startswith("fail") or (behaviour.startswith("flaky") and attempt == 1):
+                self._reply(500, "upstream error")
+            else:
+                self._reply(200, f"content of {target.netloc}/{behaviour}")
+        finally:
+            with self.lock:
+                self.active[target.netloc] -= 1
+                self.active["*"] -= 1
+
+    def _reply(self, status, body):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def jina_server():
+    FakeJinaReader.attempts.clear()
+    FakeJinaReader.active.clear()
+    FakeJinaReader.peak.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeJinaReader)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _make_service(base_url, **overrides):
+    service = WebSummarizerService(httpx.AsyncClient(), azure_openai_client=None)
+    service.jinaai_base_url = base_url
+    service.extract_retry_delay_seconds = 0.05
+    service.extract_timeout_seconds = 1.0
+    service.content_cache = ContentCache(path="", ttl=60, max_memory_bytes=1024 * 1024, max_disk_bytes=0)
+    for key, value in overrides.items():
+        setattr(service, key, value)
+    return service
+
+
+def test_extract_content_runs_concurrently_and_keeps_order(jina_server):
+    links = [
+        "https://a.test/slow-1",
+        "https://b.test/hang-1",
+        "https://a.test/slow-2",
+        "https://b.test/fail-1",
+        "https://b.test/slow-3",
+        "https://a.test/flaky-1",
+        "https://b.test/slow-4",
+        "https://a.test/slow-5",
+    ]
+
+    async def scenario():
+        service = _make_service(jina_server, extract_per_host_concurrency=3)
+        contents = await service.extract_content_from_links(links)
+        await service.http_client.aclose()
+        return contents
+
+    contents = asyncio.run(scenario())
+
+    assert contents == [
+        "content of a.test/slow-1",
+        "content of a.test/slow-2",
+        "content of b.test/slow-3",
+        "content of a.test/flaky-1",
+        "content of b.test/slow-4",
+        "content of a.test/slow-5",
+    ]
+    assert FakeJinaReader.attempts["fail-1"] == 3
+    # 每个站点 4 个链接，受单站点并发上限约束；两个站点的请求同时进行
+    assert FakeJinaReader.peak["a.test"] == FakeJinaReader.peak["b.test"] == 3
+    assert FakeJinaReader.peak["*"] == 6
+
+
+def test_extract_content_respects_per_host_limit(jina_server):
+    links = [f"https://a.test/slow-{i}" for i in range(6)]
+
+    async def scenario():
+        service = _make_service(jina_server, extract_per_host_concurrency=2, extract_timeout_seconds=5.0)
+        contents = await service.extract_content_from_links(links)
+        await service.http_client.aclose()
+        return contents
+
+    contents = asyncio.run(scenario())
+
+    assert len(contents) == 6
+    assert FakeJinaReader.peak["a.test"] == 2
+
+
+def test_extract_content_serves_repeated_links_from_cache(jina_server):
+    links = ["https://a.test/slow-1", "https://a.test/fail-1"]
+
+    async def scenario():
+        service = _make_service(jina_server)
+        first = await service.extract_content_from_links(links)
+        second = await service.extract_content_from_links(["https://A.test/slow-1/#intro"])
+        await service.http_client.aclose()
+        return service, first, second
+
+    service, first, second = asyncio.run(scenario())
+
+    assert first == second == ["content of a.test/slow-1"]
+    assert FakeJinaReader.attempts["slow-1"] == 1
+    assert service.content_cache.stats()["memory_hits"] == 1
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_search_service(results):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["q"])
+        links = results.pop(0)
+        return httpx.Response(200, json={"organic_results": [{"link": link} for link in links]} if links else {})
+
+    service = WebSummarizerService(httpx.AsyncClient(transport=httpx.MockTransport(handler)), azure_openai_client=None)
+    service.search_cache = TTLCache(maxsize=16, ttl=60, timer=FakeTimer())
+    service.search_cache_fresh_seconds = 10
+    service.search_cache_stale_seconds = 100
+    service.search_cache_negative_seconds = 5
+    return service, calls
+
+
+def test_search_normalizes_query_and_caches_result():
+    async def scenario():
+        service, calls = _make_search_service([["https://docs.a.test/1"]])
+        first = await service.search_urls_for_query(["https://docs.a.test/x", "https://b.test/"], "How  To Install")
+        second = await service.search_urls_for_query(["https://B.test/y", "https://docs.a.test/z", "https://b.test/"], " how to\tinstall ")
+        return calls, first, second
+
+    calls, first, second = asyncio.run(scenario())
+
+    assert first == second == ["https://docs.a.test/1"]
+    assert calls == ["how to install site:b.test OR site:docs.a.test"]
+
+
+def test_search_serves_stale_result_and_refreshes_in_background():
+    async def scenario():
+        service, calls = _make_search_service([["https://a.test/old"], ["https://a.test/new"]])
+        await service.search_urls_for_query(["https://a.test"], "q")
+        service.search_cache.timer.now = 50
+        stale = await service.search_urls_for_query(["https://a.test"], "q")
+        await asyncio.sleep(0.05)
+        refreshed = await service.search_urls_for_query(["https://a.test"], "q")
+        return calls, stale, refreshed
+
+    calls, stale, refreshed = asyncio.run(scenario())
+
+    assert stale == ["https://a.test/old"]
+    assert refreshed == ["https://a.test/new"]
+    assert len(calls) == 2
+
+
+def test_search_caches_empty_results_briefly():
+    async def scenario():
+        service, calls = _make_search_service([[], ["https://a.test/found"]])
+        assert await service.search_urls_for_query(["https://a.test"], "q") == []
+        assert await service.search_urls_for_query(["https://a.test"], "q") == []
+        service.search_cache.timer.now = 6
+        found = await service.search_urls_for_query(["https://a.test"], "q")
+        return calls, found
+
+    calls, found = asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert found == ["https://a.test/found"]
+
+
+def test_identical_summarize_requests_are_coalesced(monkeypatch):
+    from app.services import websummary
+
+    monkeypatch.setattr(websummary, "summarize_flight", websummary.SingleFlight())
+    runs = 0
+
+    async def fake_pipeline(self, urls, query):
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return f"summary of {query}"
+
+    monkeypatch.setattr(WebSummarizerService, "_run_pipeline", fake_pipeline)
+
+    async def scenario():
+        services = [WebSummarizerService(http_client=None, azure_openai_client=None) for _ in range(4)]
+        return await asyncio.gather(
+            services[0].process_request(["https://a.test"], "What is X"),
+            services[1].process_request(["https://a.test/"], "what  is x"),
+            services[2].process_request(["https://a.test"], "What is X"),
+            services[3].process_request(["https://b.test"], "What is X"),
+        )
+
+    results = asyncio.run(scenario())
+
+    assert runs == 2
+    assert results[0] == results[1] == results[2] == "summary of What is X"
+    assert websummary.summarize_flight.stats()["coalesced"] == 2
+
+
+def test_services_share_process_wide_upstream_clients():
+    from injector import Injector
+
+    from app.core.clients import UpstreamClients
+    from app.core.modules import ApplicationModule
+    from app.core.scopes import request_scope
+    from app.services.llm import LLMService
+
+    async def scenario():
+        injector = Injector([ApplicationModule()])
+        clients = injector.get(UpstreamClients)
+        async with request_scope():
+            first = injector.get(WebSummarizerService)
+        async with request_scope():
+            second = injector.get(WebSummarizerService)
+            llm = injector.get(LLMService)
+        shared = (first.http_client, first.azure_openai_client)
+        await clients.close()
+        return clients, first, second, llm, shared
+
+    clients, first, second, llm, shared = asyncio.run(scenario())
+
+    assert first is not second
+    assert second.http_client is shared[0]
+    assert second.azure_openai_client is llm.client is shared[1]
+    assert clients.stats()["http"]["connections"] == 0
+
+
+class FakeCompletions:
+    """
+    记录调用次数和最大并发数的 chat.completions 替身，返回消息长度作为摘要。
+    """
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            content = f"note {self.calls}"
+        finally:
+            self.active -= 1
+        from types import SimpleNamespace
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _make_summary_service(**overrides):
+    from types import SimpleNamespace
+
+    completions = FakeCompletions()
+    service = WebSummarizerService(http_client=None, azure_openai_client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    for key, value in overrides.items():
+        setattr(service, key, value)
+    return service, completions
+
+
+def test_condense_documents_keeps_small_input_as_single_call():
+    service, completions = _make_summary_service(summary_context_budget_tokens=1000)
+
+    content, calls = asyncio.run(service.condense_documents(["page one", "page two"], "q"))
+
+    assert content == "page one\n\n---\n\npage two"
+    assert calls == 0
+    assert completions.calls == 0
+
+
+def test_condense_documents_maps_chunks_with_bounded_parallelism():
+    service, completions = _make_summary_service(
+        summary_context_budget_tokens=200,
+        summary_chunk_tokens=50,
+        summary_chunk_overlap_tokens=0,
+        summary_map_concurrency=3,
+    )
+    documents = ["\n\n".join("z" * 100 for _ in range(5)) for _ in range(4)]  # 每篇 5 段、每段约 25 token
+
+    content, calls = asyncio.run(service.condense_documents(documents, "q"))
+
+    assert calls == completions.calls == 12
+    assert completions.peak == 3
+    assert content.count("note") == 12
+
+
+def test_condense_documents_estimates_tokens_off_the_event_loop(monkeypatch):
+    from app.services import websummary
+
+    loop_thread = threading.get_ident()
+    on_loop = []
+    original_estimate = websummary.estimate_tokens
+
+    def recording_estimate(text):
+        if threading.get_ident() == loop_thread:
+            on_loop.append(len(text))
+        return original_estimate(text)
+
+    monkeypatch.setattr(websummary, "estimate_tokens", recording_estimate)
+    service, completions = _make_summary_service(
+        summary_context_budget_tokens=200,
+        summary_chunk_tokens=50,
+        summary_chunk_overlap_tokens=0,
+    )
+    documents = ["\n\n".join("z" * 100 for _ in range(5)) for _ in range(4)]
+
+    content, calls = asyncio.run(service.condense_documents(documents, "q"))
+
+    assert calls == 12
+    # 事件循环线程上只估算分隔符，文档和要点都在线程中估算
+    assert all(length < 16 for length in on_loop)